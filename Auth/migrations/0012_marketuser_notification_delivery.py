@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketuser',
+            name='notification_delivery',
+            field=models.CharField(choices=[('immediate', 'Immediate'), ('digest', 'Digest')], default='immediate', max_length=10),
+        ),
+    ]
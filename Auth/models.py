@@ -10,6 +10,10 @@ class MarketUser(models.Model):
         ('facebook', 'Facebook'),
         ('apple', 'Apple ID'),
     ]
+    NOTIFICATION_DELIVERY = [
+        ('immediate', 'Immediate'),
+        ('digest', 'Digest'),
+    ]
 
     profile = models.OneToOneField(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=50)
@@ -20,6 +24,9 @@ class MarketUser(models.Model):
     is_verified = models.BooleanField(default=False)
     created = models.DateField(auto_now=True, null=True)
     registration_method = models.CharField(max_length=10, choices=REGISTRATION_METHODS, null=True, blank=True)
+    # Bursts of similar notifications (bids on one auction) sent one by one, or folded into summaries;
+    # one by one unless the user opts in, as before this setting existed
+    notification_delivery = models.CharField(max_length=10, choices=NOTIFICATION_DELIVERY, default='immediate')
 
     def __str__(self):
         return self.profile.username
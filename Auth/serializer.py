@@ -67,18 +67,19 @@ class MarketUserSerializer(serializers.ModelSerializer):
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = MarketUser
-        fields = ['id', 'name', 'phone', 'email', 'profile_picture', 'is_verified', 'is_banned']
+        fields = ['id', 'name', 'phone', 'email', 'profile_picture', 'is_verified', 'is_banned', 'notification_delivery']
 
 
 class UpdateUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = MarketUser
-        fields = ['name', 'phone', 'email', 'profile_picture']
+        fields = ['name', 'phone', 'email', 'profile_picture', 'notification_delivery']
         extra_kwargs = {
             'phone': {'required': False, 'error_messages': {"invalid": "رقم الهاتف غير صالح."}},
             'email': {'required': False, 'error_messages': {"invalid": "يرجى إدخال بريد إلكتروني صالح."}},
             'name': {'required': False, 'error_messages': {"invalid": "يرجى إدخال اسم صالح."}},
             'profile_picture': {'required': False, 'error_messages': {"invalid": "رابط الصورة غير صالح."}},
+            'notification_delivery': {'required': False, 'error_messages': {"invalid_choice": "طريقة إرسال الإشعارات يجب أن تكون immediate أو digest."}},
         }
 
     def update(self, instance, validated_data):
@@ -86,6 +87,7 @@ class UpdateUserSerializer(serializers.ModelSerializer):
         instance.phone = validated_data.get('phone', instance.phone)
         instance.email = validated_data.get('email', instance.email)
         instance.profile_picture = validated_data.get('profile_picture', instance.profile_picture)
+        instance.notification_delivery = validated_data.get('notification_delivery', instance.notification_delivery)
         instance.profile.username = instance.email
         instance.profile.save() 
         instance.save() 
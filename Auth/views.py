@@ -14,7 +14,7 @@ from django.contrib.auth.models import Group
 from django.contrib.auth.decorators import login_required
 import re
 from rest_framework_simplejwt.views import TokenObtainPairView
-from Product.utils import send_real_time_notification
+from Product.utils import admin_users, send_real_time_notifications
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
@@ -410,12 +410,8 @@ def confirm_account_deletion(request):
 
     if request.data.get("confirm") is True:
         # 🔔 Notify admins that this user has deleted their account
-        admin_users = MarketUser.objects.filter(profile__groups__name="Admin")
-        for admin in admin_users:
-            send_real_time_notification(
-                admin, 
-                f"⚠️ تم حذف حساب المستخدم '{market_user.name}' ({user.username})"
-            )
+        message = f"⚠️ تم حذف حساب المستخدم '{market_user.name}' ({user.username})"
+        send_real_time_notifications((admin, message) for admin in admin_users())
         DeletedAccounts.objects.create(email = market_user.email)
         user.delete()
         return Response({"message": "تم حذف حسابك بنجاح."}, status=status.HTTP_200_OK)
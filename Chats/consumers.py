@@ -14,6 +14,8 @@ from django.conf import settings
 import redis
 import os
 from Product.models import Product
+from Product import unread
+from django.db import transaction
 from django.utils.timezone import now
 import base64
 import uuid
@@ -297,6 +299,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             return
 
         self.user_id = user.id
+        # Notifications belong to the MarketUser, not the auth user
+        self.market_user_id = await self.get_market_user_id()
 
         # Register user for real-time notifications
         if self.user_id not in active_notification_connections:
@@ -306,8 +310,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         await self.accept()
         print(f"🔔 WebSocket connected for user {self.user_id}")
 
-        # Send unread chat notifications immediately upon connection
-        await self.send_unread_chat_notifications()
+        # Only the badge numbers: the notifications themselves are listed over REST
+        await self.send_unread_counts()
 
     async def disconnect(self, close_code):
         """Handles WebSocket disconnection and removes user from tracking."""
@@ -318,33 +322,29 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         logger.info(f"🔕 WebSocket disconnected (User ID: {self.user_id})")
 
-    @sync_to_async
-    def get_unread_chat_notifications(self):
-        """Fetches unread chat notifications (new messages) ONLY for the logged-in user."""
-        notifications = Notification.objects.filter(
-            user_id=self.user_id, is_read=False, message__isnull=False  # ✅ Only messages
-        ).select_related("message", "message__sender__profile") \
-         .values("id", "message__content", "message__sender__profile__username", "message__timestamp")
-
-        # Convert datetime to string
-        for notification in notifications:
-            notification["message__timestamp"] = notification["message__timestamp"].strftime("%Y-%m-%d %H:%M:%S")  # ✅ Fix
+    @database_sync_to_async
+    def get_market_user_id(self):
+        return MarketUser.objects.filter(profile_id=self.user_id).values_list("id", flat=True).first()
 
-        return list(notifications)
+    @database_sync_to_async
+    def get_unread_counts(self):
+        return unread.unread_counts(self.market_user_id) if self.market_user_id else None
 
-    async def send_unread_chat_notifications(self):
-        """Fetches and sends unread chat notifications to the user."""
+    async def send_unread_counts(self):
+        """Sends the user's unread badge counts."""
         try:
-            notifications = await self.get_unread_chat_notifications()
-            await self.send(json.dumps({"action": "chat_notifications", "notifications": notifications}))
+            counts = await self.get_unread_counts()
+            await self.send(json.dumps({"action": "unread_counts", "counts": counts}))
         except Exception as e:
-            logger.error(f"❌ Error sending unread chat notifications: {e}")
-            await self.send(json.dumps({"error": "Failed to load chat notifications"}))
+            logger.error(f"❌ Error sending unread counts: {e}")
+            await self.send(json.dumps({"error": "Failed to load notification counts"}))
 
-    @sync_to_async
+    @database_sync_to_async
     def mark_chat_notifications_as_read(self):
         """Marks chat notifications as read when the user enters the conversation."""
-        Notification.objects.filter(user_id=self.user_id, is_read=False, message__isnull=False).update(is_read=True)
+        with transaction.atomic():
+            rows = Notification.objects.filter(user_id=self.market_user_id, is_read=False, message__isnull=False).update(is_read=True)
+            unread.marked_read("chat", self.market_user_id, rows)
 
     async def receive(self, text_data):
         """Handles incoming WebSocket messages."""
@@ -355,6 +355,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             if action == "mark_as_read":
                 await self.mark_chat_notifications_as_read()
                 await self.send(json.dumps({"action": "chat_notifications_marked_as_read"}))
+                await self.send_unread_counts()
         except json.JSONDecodeError:
             logger.warning("⚠️ Invalid JSON received")
 
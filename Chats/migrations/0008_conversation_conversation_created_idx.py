@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+        ('Chats', '0007_message_recipient'),
+        ('Product', '0026_bid_buyer_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['created_at'], name='conversation_created_idx'),
+        ),
+    ]
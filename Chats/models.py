@@ -10,6 +10,10 @@ class Conversation(models.Model):
 
     class Meta:
         unique_together = ('seller', 'buyer', 'product')  # Ensure unique conversations
+        indexes = [
+            # New conversations since the seller-stats watermark (Product/rollups.py)
+            models.Index(fields=['created_at'], name='conversation_created_idx'),
+        ]
 
     def __str__(self):
         return f"Conversation between {self.seller.profile.username} (Seller) and {self.buyer.profile.username} (Buyer)"
@@ -32,6 +36,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False) 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # The notification inbox pages and the ranged mark-read UPDATE (Product/inbox.py)
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_inbox_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.profile.username} about message {self.message.id}"
     
@@ -32,4 +32,18 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ['id', 'message', 'is_read', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+class InboxNotificationSerializer(serializers.Serializer):
+    """One row of the notification inbox: a bid notification or a chat notification."""
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    message = serializers.SerializerMethodField()
+    is_read = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
+    bid_id = serializers.IntegerField(required=False, allow_null=True)
+    conversation_id = serializers.IntegerField(source='message.conversation_id', required=False)
+    sender_id = serializers.IntegerField(source='message.sender_id', required=False)
+
+    def get_message(self, obj):
+        return obj.message.content if obj.kind == 'chat' else obj.message
@@ -7,5 +7,8 @@ urlpatterns = [
     path('start_conversation/<int:product_id>/', views.start_conversation, name='start_conversation'),
     path('conversations/<int:conversation_id>/mark_seen/', views.mark_messages_as_seen, name='mark_messages_as_seen'),
     path('notifications/', views.list_notifications, name='list_notifications'),
+    path('notifications/counts/', views.notification_counts, name='notification_counts'),
+    path('notifications/inbox/', views.notification_inbox, name='notification_inbox'),
+    path('notifications/mark_read/', views.mark_notifications_read, name='mark_notifications_read'),
 
 ]   
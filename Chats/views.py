@@ -3,12 +3,17 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Conversation, Message, Notification
-from .serializer import ConversationSerializer, MessageSerializer, NotificationSerializer
+from .models import Conversation, Message, Notification, ChatNotification
+from .serializer import ConversationSerializer, MessageSerializer, NotificationSerializer, InboxNotificationSerializer
 from Product.models import Product
+from Product import inbox, unread
 from rest_framework import status
 from decorators import verified_user_required , not_banned_user_required
+from pagination import KeysetPagination
+from django.db import transaction
 from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
 
 @swagger_auto_schema(
     method="post",
@@ -32,6 +37,12 @@ def mark_messages_as_seen(request, conversation_id):
         conversation__seller=user 
     ).update(seen=True)
 
+    with transaction.atomic():
+        rows = ChatNotification.objects.filter(
+            conversation_id=conversation_id, recipient=user, seen=False
+        ).update(seen=True)
+        unread.marked_read("messages", user.id, rows)
+
     return Response({"message": "Messages marked as seen"}, status=status.HTTP_200_OK)
 
 
@@ -112,6 +123,9 @@ def list_messages(request, conversation_id):
 @swagger_auto_schema(
     method="get",
     operation_description="Retrieve a list of unread notifications for the authenticated user.",
+    manual_parameters=[
+        openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to 'cursor' for keyset pagination (follow the returned 'next' link)", type=openapi.TYPE_STRING),
+    ],
     responses={200: NotificationSerializer(many=True)}
 )
 @api_view(['GET'])
@@ -121,10 +135,106 @@ def list_messages(request, conversation_id):
 def list_notifications(request):
     user = request.user.marketuser
     notifications = Notification.objects.filter(user=user)  # Fetch unread notifications
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(notifications, request)
+        return paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
     serializer = NotificationSerializer(notifications, many=True)
     return Response(serializer.data)
 
 
+@swagger_auto_schema(
+    method="get",
+    operation_description="Unread badge counts of the authenticated user: bid notifications, chat notifications and unseen messages.",
+    responses={200: openapi.Response("Unread counts", schema=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            kind: openapi.Schema(type=openapi.TYPE_INTEGER)
+            for kind in (*unread.KINDS, 'total')
+        },
+    ))}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def notification_counts(request):
+    return Response(unread.unread_counts(request.user.marketuser.id))
+
+
+def _inbox_kinds(value):
+    """A comma-separated string or a list; all kinds when empty. Returns (kinds, unknown)."""
+    if isinstance(value, str):
+        value = value.split(',')
+    kinds = [kind for kind in value or () if kind] or list(inbox.INBOX_KINDS)
+    return kinds, [kind for kind in kinds if kind not in inbox.INBOX_KINDS]
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_description="Bid and chat notifications of the authenticated user as one list, newest first, with cursor pagination (follow `next`).",
+    manual_parameters=[
+        openapi.Parameter('kinds', openapi.IN_QUERY, description="Comma-separated subset of: bids, chat", type=openapi.TYPE_STRING),
+        openapi.Parameter('unread', openapi.IN_QUERY, description="Set to 'true' for unread notifications only", type=openapi.TYPE_STRING),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor from the previous `next` link", type=openapi.TYPE_STRING),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="Notifications per page (at most 100)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: InboxNotificationSerializer(many=True)}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def notification_inbox(request):
+    kinds, unknown = _inbox_kinds(request.query_params.get('kinds'))
+    if unknown:
+        return Response({"error": f"Unknown notification kinds: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    unread_only = request.query_params.get('unread', '').lower() in ('1', 'true')
+    paginator = inbox.inbox_paginator()
+    notifications = paginator.paginate_queryset(
+        inbox.inbox_querysets(request.user.marketuser, kinds, unread_only), request,
+    )
+    return paginator.get_paginated_response(InboxNotificationSerializer(notifications, many=True).data)
+
+
+@swagger_auto_schema(
+    method="post",
+    operation_description="Mark every notification created up to `up_to` (default: now) as read, with one ranged update per table.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'up_to': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description="Usually the `created_at` of the newest notification shown"),
+            'kinds': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description="Subset of: bids, chat"),
+        },
+    ),
+    responses={200: openapi.Response("Rows marked as read per kind, and the new unread counts")}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def mark_notifications_read(request):
+    user = request.user.marketuser
+    kinds, unknown = _inbox_kinds(request.data.get('kinds'))
+    if unknown:
+        return Response({"error": f"Unknown notification kinds: {', '.join(map(str, unknown))}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    up_to = None
+    if request.data.get('up_to'):
+        try:
+            up_to = parse_datetime(str(request.data['up_to']))
+        except ValueError:
+            up_to = None
+        if up_to is None:
+            return Response({"error": "up_to must be an ISO 8601 datetime"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(up_to):
+            up_to = timezone.make_aware(up_to)
+
+    marked = inbox.mark_read(user, up_to, kinds)
+    return Response({"marked": marked, "counts": unread.unread_counts(user.id)}, status=status.HTTP_200_OK)
+
+
 @swagger_auto_schema(
     method="post",
     operation_description="Start a conversation between the authenticated buyer and a product's seller.",
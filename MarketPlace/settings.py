@@ -85,6 +85,21 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache (catalogue responses, OTP codes); per-process memory only when Redis isn't configured
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=90),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=90),
@@ -212,6 +227,11 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = ''
 MEDIA_ROOT = os.path.join(BASE_DIR,'upload/')
+# Uploads are stored once per distinct content under upload/blobs/ (see MarketPlace/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "MarketPlace.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
 INSTALLED_APPS.insert(1, "whitenoise.runserver_nostatic")
 
 MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
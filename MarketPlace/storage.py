@@ -0,0 +1,167 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+BLOB_ROOT = 'blobs'
+
+
+def blob_name(digest, extension):
+    """`blobs/ab/cd/abcd...<sha256>.jpg`: two levels of 256 directories keep every directory small."""
+    return f"{BLOB_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f"{BLOB_ROOT}/")
+
+
+def _extension(name):
+    extension = os.path.splitext(name or '')[1].lower()
+    return extension if 1 < len(extension) <= 10 and extension[1:].isalnum() else ''
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that names files by the SHA-256 of their content.
+
+    Saving a file whose bytes are already stored writes nothing and only bumps
+    the `StoredFile.refcount` of the existing blob. `delete()` drops one
+    reference and removes the file when the last one goes. Files saved before
+    this backend (any name outside `blobs/`) are still read and deleted as
+    plain files until `manage.py migrate_media_storage` moves them over.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name  # The name is replaced by the content hash in _save
+
+    def _save(self, name, content):
+        from Product.models import StoredFile
+
+        digest = hashlib.sha256()
+        size = 0
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        name = blob_name(digest.hexdigest(), _extension(name))
+
+        with transaction.atomic():
+            blob, created = StoredFile.objects.select_for_update().get_or_create(name=name, defaults={'size': size})
+            if not created:
+                StoredFile.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+            if created or not self.exists(name):
+                self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        """Write to a temporary file and rename it, so a blob is never seen half written."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                content.seek(0)
+                for chunk in content.chunks():
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def retain(self, name, count=1):
+        """Record `count` more references to an already stored blob."""
+        from Product.models import StoredFile
+
+        if is_blob(name) and count:
+            StoredFile.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+    def delete(self, name):
+        if not is_blob(name):
+            return super().delete(name)
+
+        from Product.models import StoredFile
+
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name, refcount__gt=1).update(refcount=F('refcount') - 1):
+                return  # Still used elsewhere
+            deleted, _ = StoredFile.objects.filter(name=name).delete()
+            if deleted:
+                super().delete(name)
+
+
+def _name(value):
+    return getattr(value, 'name', value) or None
+
+
+def release_after_commit(storage, name):
+    """Drop one reference to a blob once the current transaction commits."""
+    if is_blob(name):
+        transaction.on_commit(lambda: storage.delete(name), robust=True)
+
+
+def track_references(model, *field_names):
+    """
+    Give back the blob references held by `model`'s file fields: the old file when
+    a save replaces it (a new upload or another name), every file when the row is
+    deleted. Names are remembered as loaded, so a save costs no extra query unless
+    a deferred file field was assigned. Updates through querysets send no signals;
+    code using them releases by hand.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    uid = f'storage-references:{model._meta.label}'
+
+    def remember(instance):
+        instance._stored_names = {
+            field.attname: _name(instance.__dict__[field.attname])
+            for field in fields if field.attname in instance.__dict__
+        }
+
+    def loaded(sender, instance, **kwargs):
+        remember(instance)
+
+    def replacing(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or instance._state.adding:
+            return
+        stored = getattr(instance, '_stored_names', {})
+        released = []
+        for field in fields:
+            if field.attname not in instance.__dict__ or (update_fields is not None and field.name not in update_fields):
+                continue  # not written by this save
+            if field.attname in stored:
+                previous = stored[field.attname]
+            else:
+                previous = model._base_manager.filter(pk=instance.pk).values_list(field.attname, flat=True).first()
+            current = getattr(instance, field.attname)
+            if previous and (current.name != previous or (current and not current._committed)):
+                released.append((field.storage, previous))
+        instance._released_names = released
+
+    def saved(sender, instance, raw=False, **kwargs):
+        for storage, name in instance.__dict__.pop('_released_names', ()):
+            release_after_commit(storage, name)
+        remember(instance)
+
+    def deleted(sender, instance, **kwargs):
+        for field in fields:
+            if field.attname in instance.__dict__:
+                release_after_commit(field.storage, _name(instance.__dict__[field.attname]))
+
+    post_init.connect(loaded, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(replacing, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,101 @@
+import heapq
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .cache import ALL_SCOPE, bump_catalog_versions, category_scope, product_scope
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DELAY = timedelta(days=1)  # closed auctions stay on the seller's active list this long
+
+
+class AuctionCloser:
+    """
+    Keeps the next-to-expire auctions in a heap ordered by bid_end_time and
+    closes them in batches once their deadline passes.
+    """
+
+    def __init__(self, batch_size=100, horizon=300):
+        self.batch_size = batch_size
+        self.horizon = timedelta(seconds=horizon)
+        self._queue = []  # (bid_end_time, product_id)
+        self._queued = set()
+
+    def refresh(self):
+        """Queue every open auction that ends before now + horizon."""
+        upcoming = Product.objects.filter(
+            sale_type="مزاد",
+            closed=False,
+            bid_end_time__lte=timezone.now() + self.horizon,
+        ).order_by('bid_end_time').values_list('bid_end_time', 'id')
+
+        for end_time, product_id in upcoming:
+            if product_id not in self._queued:
+                heapq.heappush(self._queue, (end_time, product_id))
+                self._queued.add(product_id)
+
+    def seconds_until_next(self):
+        if not self._queue:
+            return None
+        return max((self._queue[0][0] - timezone.now()).total_seconds(), 0)
+
+    def close_due(self):
+        """Close every queued auction whose deadline has passed. Returns how many were closed."""
+        now = timezone.now()
+        due_ids = []
+        while self._queue and self._queue[0][0] <= now:
+            _, product_id = heapq.heappop(self._queue)
+            self._queued.discard(product_id)
+            due_ids.append(product_id)
+
+        closed = 0
+        for start in range(0, len(due_ids), self.batch_size):
+            batch = Product.objects.filter(
+                pk__in=due_ids[start:start + self.batch_size], closed=False
+            ).select_related('seller')
+            for product in batch:
+                # The deadline may have moved since it was queued
+                if product.bid_end_time and product.bid_end_time > now:
+                    heapq.heappush(self._queue, (product.bid_end_time, product.pk))
+                    self._queued.add(product.pk)
+                    continue
+                try:
+                    product.close_bidding()
+                    closed += 1
+                except Exception:
+                    logger.exception("❌ Failed to close auction %s", product.pk)
+        return closed
+
+
+def close_expired_auctions(batch_size=100):
+    """One-shot sweep: close every auction whose bid_end_time has already passed."""
+    closer = AuctionCloser(batch_size=batch_size, horizon=0)
+    closer.refresh()
+    return closer.close_due()
+
+
+def archive_closed_auctions(now=None):
+    """
+    Move every auction closed for longer than HISTORY_DELAY into history with one
+    UPDATE. Returns how many were moved.
+    """
+    now = now or timezone.now()
+    due = Product.objects.filter(
+        sale_type="مزاد", closed=True, is_in_history=False, closed_at__lte=now - HISTORY_DELAY,
+    )
+    with transaction.atomic():
+        moved = list(due.values_list('pk', 'category_id'))
+        if not moved:
+            return 0
+        archived = due.filter(pk__in=[pk for pk, _ in moved]).update(is_in_history=True, updated_at=now)
+
+        # update() sends no post_save: refresh the cached catalogue responses these products are in
+        scopes = [ALL_SCOPE]
+        for pk, category_id in moved:
+            scopes.append(product_scope(pk))
+            if category_id:
+                scopes.append(category_scope(category_id))
+        transaction.on_commit(lambda: bump_catalog_versions(*scopes))
+    return archived
@@ -0,0 +1,105 @@
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import DecimalField, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from rest_framework import status
+from .models import Product, Bid
+from .utils import admin_users, send_real_time_notifications
+from . import digests
+
+AUCTION = 'مزاد'
+MAX_BID_AMOUNT = Decimal('99999999.99')  # Bid.amount is DecimalField(max_digits=10, decimal_places=2)
+
+
+class BidRejected(Exception):
+    """A bid that can't be recorded; `message` is shown to the bidder."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def parse_bid_amount(raw):
+    """Parse a bid amount exactly (no float round-trip); at most two decimal places."""
+    if raw is None or raw == '':
+        raise BidRejected("يجب تحديد قيمة المزايدة.")
+    try:
+        amount = Decimal(str(raw).strip())
+    except InvalidOperation:
+        raise BidRejected("قيمة المزايدة يجب أن تكون رقمًا.")
+    if not amount.is_finite() or amount <= 0 or amount > MAX_BID_AMOUNT:
+        raise BidRejected("قيمة المزايدة غير صالحة.")
+    if amount.as_tuple().exponent < -2:
+        raise BidRejected("قيمة المزايدة لا يمكن أن تحتوي على أكثر من منزلتين عشريتين.")
+    return amount.quantize(Decimal('0.01'))
+
+
+def place_bid(product_id, buyer, amount):
+    """
+    Validate and record a bid with a single conditional UPDATE on the auction row.
+
+    The UPDATE only matches an open, approved auction of another seller whose
+    highest accepted bid (`highest_bid`, else the starting price) is below
+    `amount`. Pending bids do not raise the bar: until an admin accepts one it
+    is only an offer, so an inflated bid nobody reviewed yet can't lock the
+    others out. The same statement raises `current_bid` (the best standing
+    offer, shown to bidders) and `updated_at`. Concurrent bidders are serialized
+    on that row, and a bid racing an accept is checked against the accepted
+    amount. All notifications and dashboard updates run after the transaction commits.
+    """
+    amount = parse_bid_amount(amount)
+    now = timezone.now()
+    offer = Value(amount, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+    with transaction.atomic():
+        claimed = (
+            Product.objects.filter(pk=product_id, sale_type=AUCTION, is_approved=True, closed=False)
+            .filter(Q(bid_end_time__isnull=True) | Q(bid_end_time__gt=now))
+            .filter(
+                Q(highest_bid__lt=amount)
+                | (Q(highest_bid__isnull=True) & (Q(starting_price__isnull=True) | Q(starting_price__lt=amount)))
+            )
+            .exclude(seller=buyer)
+            .update(
+                current_bid=Greatest(Coalesce('current_bid', offer), offer),
+                updated_at=now,
+            )
+        )
+        if not claimed:
+            raise _rejection(product_id, buyer, now)
+
+        bid = Bid.objects.create(product_id=product_id, buyer=buyer, amount=amount, status="pending")
+        transaction.on_commit(lambda: announce_bid(bid), robust=True)
+
+    return bid
+
+
+def _rejection(product_id, buyer, now):
+    """Explain why the conditional UPDATE matched nothing."""
+    product = Product.objects.filter(pk=product_id, sale_type=AUCTION, is_approved=True).first()
+    if not product:
+        return BidRejected("المنتج غير متاح للمزايدة.", status.HTTP_404_NOT_FOUND)
+    if product.seller_id == buyer.pk:
+        return BidRejected("لا يمكنك المزايدة على منتجك الخاص.")
+    if product.closed or (product.bid_end_time and now >= product.bid_end_time):
+        # Closing is left to the close_auctions worker
+        return BidRejected("انتهت فترة المزايدة على هذا المنتج.")
+    floor = product.highest_bid or product.starting_price
+    return BidRejected(f"يجب أن تكون المزايدة أعلى من {floor} {product.currency}.")
+
+
+def announce_bid(bid):
+    """Post-commit fan-out: confirm to the bidder and ask the admins to review."""
+    product = bid.product
+    admin_message = f"تم تقديم مزايدة جديدة بقيمة {bid.amount} {product.currency} على '{product.title}'. يرجى مراجعتها والموافقة عليها."
+    # A busy auction would send every admin one of these per bid: bursts are summed up
+    admin_summary = f"تم تقديم {{count}} مزايدات جديدة على '{product.title}' خلال الدقيقة الأخيرة. يرجى مراجعتها والموافقة عليها."
+    with transaction.atomic():
+        send_real_time_notifications([
+            (bid.buyer, f"تم تقديم مزايدتك بقيمة {bid.amount} {product.currency} على '{product.title}' وهي قيد المراجعة من قبل الإدارة."),
+        ])
+        digests.notify(
+            (admin, f"bid_review:{product.pk}", admin_message, admin_summary) for admin in admin_users()
+        )
@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import CatalogTimestamp, Category, Product
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TIMEOUT = 300  # seconds; versions make invalidation explicit, this only bounds memory
+CATALOG_ENDPOINTS = (
+    'list_products', 'list_auction_products', 'get_product', 'get_all_categories', 'catalog_facets',
+    'similar_products',
+)
+
+ALL_SCOPE = 'all'
+CATEGORIES_SCOPE = 'categories'
+SIMILAR_SCOPE = 'similar'  # every similar-products list; bumped by a full rebuild
+CATEGORIES_DELETED = 'categories_deleted'  # CatalogTimestamp name
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def similar_scope(product_id):
+    """The stored similar-products list of one product (the listings in it depend on ALL_SCOPE)."""
+    return f'similar:{product_id}'
+
+
+def _version_key(scope):
+    return f'catalog:version:{scope}'
+
+
+def catalog_version(scope):
+    """Current version counter of a catalogue scope (created on first use)."""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so an evicted counter never reuses old keys
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_catalog_versions(*scopes):
+    """O(1) invalidation: every cached response built on these scopes becomes unreachable."""
+    for scope in set(scopes):
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), None)
+
+
+def invalidate_product(product_id, category_id=None):
+    """Bump the scopes a product appears in, once the current transaction commits."""
+    scopes = [ALL_SCOPE, product_scope(product_id)]
+    if category_id:
+        scopes.append(category_scope(category_id))
+    transaction.on_commit(lambda: _safe_bump(scopes))
+
+
+def invalidate_new_products(category_ids):
+    """Rows added with bulk_create: only the listings and their categories' pages change."""
+    scopes = [ALL_SCOPE] + [category_scope(category_id) for category_id in category_ids if category_id]
+    transaction.on_commit(lambda: _safe_bump(scopes))
+
+
+def invalidate_categories(category_id=None):
+    scopes = [ALL_SCOPE, CATEGORIES_SCOPE]
+    if category_id:
+        scopes.append(category_scope(category_id))
+    transaction.on_commit(lambda: _safe_bump(scopes))
+
+
+def _safe_bump(scopes):
+    try:
+        bump_catalog_versions(*scopes)
+    except Exception:
+        logger.exception("❌ Could not bump catalog versions %s", scopes)
+
+
+def _count(endpoint, outcome):
+    key = f'catalog:stats:{endpoint}:{outcome}'
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key)
+    except Exception:
+        logger.warning("⚠️ Could not record catalog cache %s for %s", outcome, endpoint)
+
+
+def cache_stats():
+    """Hit/miss counters per endpoint."""
+    stats = {}
+    for endpoint in CATALOG_ENDPOINTS:
+        hits = cache.get(f'catalog:stats:{endpoint}:hit') or 0
+        misses = cache.get(f'catalog:stats:{endpoint}:miss') or 0
+        stats[endpoint] = {'hits': hits, 'misses': misses}
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([
+        f'catalog:stats:{endpoint}:{outcome}' for endpoint in CATALOG_ENDPOINTS for outcome in ('hit', 'miss')
+    ])
+
+
+def _response_key(endpoint, request, scopes, kwargs):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+        if value != ''
+    )
+    versions = [f'{scope}={catalog_version(scope)}' for scope in scopes]
+    raw = '|'.join([request.get_host(), urlencode(sorted(kwargs.items())), urlencode(params), *versions])
+    return f'catalog:response:{endpoint}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cached_catalog_response(endpoint, scopes):
+    """
+    Cache successful GET responses of a public catalogue view in the shared cache.
+
+    `scopes(request, **kwargs)` names the version counters the response depends
+    on; the key combines them with the normalized query parameters, so a bump
+    in any of them is enough to invalidate.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            try:
+                key = _response_key(endpoint, request, scopes(request, **kwargs), kwargs)
+                data = cache.get(key)
+            except Exception:
+                logger.warning("⚠️ Catalog cache unavailable, serving %s uncached", endpoint, exc_info=True)
+                return view_func(request, *args, **kwargs)
+
+            if data is not None:
+                _count(endpoint, 'hit')
+                return Response(data, status=status.HTTP_200_OK)
+
+            _count(endpoint, 'miss')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                try:
+                    cache.set(key, response.data, CATALOG_CACHE_TIMEOUT)
+                except Exception:
+                    logger.warning("⚠️ Could not store %s in the catalog cache", endpoint, exc_info=True)
+            return response
+        return _wrapped_view
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET validators (ETag from version counters, Last-Modified from timestamps)
+# ---------------------------------------------------------------------------
+
+def _safe_version(scope):
+    try:
+        return catalog_version(scope)
+    except Exception:
+        return None
+
+
+def product_etag(request, product_id):
+    product_version = _safe_version(product_scope(product_id))
+    categories_version = _safe_version(CATEGORIES_SCOPE)
+    if product_version is None or categories_version is None:
+        return None
+    return f'"product-{product_id}-{product_version}-{categories_version}"'
+
+
+def product_last_modified(request, product_id):
+    # Bid and photo changes advance Product.updated_at (place_bid's UPDATE, the bid
+    # summary, the photo worker), so no bid rows are read here
+    row = (
+        Product.objects.filter(pk=product_id, is_approved=True, sold=False)
+        .values_list('updated_at', 'category__updated_at')
+        .first()
+    )
+    if not row:
+        return None
+    return max(stamp for stamp in row if stamp)
+
+
+def categories_etag(request):
+    version = _safe_version(CATEGORIES_SCOPE)
+    return f'"categories-{version}"' if version is not None else None
+
+
+def categories_deleted():
+    """
+    A deleted category leaves no row to carry the new Last-Modified: it is stored
+    in the database, in the deleting transaction, so it survives cache evictions
+    and is the same for every process.
+    """
+    CatalogTimestamp.objects.update_or_create(name=CATEGORIES_DELETED, defaults={'changed_at': timezone.now()})
+
+
+def categories_last_modified(request):
+    # One query: the newest category change, or the last deletion if that came later
+    updated = Max('updated_at')
+    deleted = Subquery(CatalogTimestamp.objects.filter(name=CATEGORIES_DELETED).values('changed_at')[:1])
+    return Category.objects.aggregate(
+        last=Greatest(Coalesce(updated, deleted), Coalesce(deleted, updated)),
+    )['last']
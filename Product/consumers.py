@@ -2,7 +2,9 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.shortcuts import get_object_or_404
-from .models import Notificationbid
+from .models import Product
+from .live import auction_group, auction_message
+from .unread import unread_counts
 from Auth.models import MarketUser
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -19,9 +21,9 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 await self.channel_layer.group_add(self.group_name, self.channel_name)
                 await self.accept()
 
-                # Send unread notifications to the user upon connection
-                unread_notifications = await self.get_unread_notifications()
-                await self.send(text_data=json.dumps({"notifications": unread_notifications}))
+                # Only the badge numbers: the notifications themselves are paged over REST
+                counts = await self.get_unread_counts()
+                await self.send(text_data=json.dumps({"type": "unread_counts", "counts": counts}))
             else:
                 await self.close()
         else:
@@ -50,13 +52,51 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         return get_object_or_404(MarketUser, profile_id=user_id)  # ✅ Use profile_id correctly
 
     @database_sync_to_async
-    def get_unread_notifications(self):
-        """Fetch unread notifications for the authenticated user."""
-        return [
-            {
-                "id": notification["id"],
-                "message": notification["message"],
-                "created_at": notification["created_at"].strftime("%Y-%m-%d %H:%M:%S")  # ✅ Convert datetime to string
-            }
-            for notification in Notificationbid.objects.filter(recipient=self.user, is_read=False).values("id", "message", "created_at")
-        ]
+    def get_unread_counts(self):
+        return unread_counts(self.user.id)
+
+
+class AuctionConsumer(AsyncWebsocketConsumer):
+    """
+    Live view of one auction: a snapshot on connect, then compact deltas
+    (bid / price / extended / closed) published by `Product.live`.
+    """
+
+    async def connect(self):
+        self.product_id = self.scope["url_route"]["kwargs"]["product_id"]
+        snapshot = await self.get_snapshot()
+        if snapshot is None:
+            await self.close()
+            return
+
+        self.group_name = auction_group(self.product_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send(text_data=json.dumps(snapshot["delta"]))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data):
+        """Viewers only listen."""
+        pass
+
+    async def auction_delta(self, event):
+        await self.send(text_data=json.dumps(event["delta"]))
+
+    @database_sync_to_async
+    def get_snapshot(self):
+        product = Product.objects.filter(
+            id=self.product_id, sale_type="مزاد", is_approved=True
+        ).only("id", "highest_bid", "bid_count", "last_bid_at", "bid_end_time", "closed").first()
+        if not product:
+            return None
+        return auction_message(
+            product.pk, "snapshot",
+            highest_bid=product.highest_bid,
+            bid_count=product.bid_count,
+            last_bid_at=product.last_bid_at,
+            bid_end_time=product.bid_end_time,
+            closed=product.closed,
+        )
@@ -0,0 +1,96 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import NotificationDigest
+from .utils import send_real_time_notifications
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW = timedelta(minutes=1)
+DIGEST_MAX = 20  # a window holding this many is flushed without waiting for its end
+FLUSH_BATCH = 500
+
+
+def _summary(digest):
+    return (digest.recipient, digest.summary.replace('{count}', str(digest.pending)))
+
+
+def notify(items, now=None):
+    """
+    Send (user, topic, message, summary) notifications, coalescing bursts on a topic.
+
+    The first notification on a topic goes out at once and opens a DIGEST_WINDOW
+    for its recipient; the ones that follow inside the window are only counted and
+    sent as one summary ("{count}" replaced by their number) when the window ends
+    (flush_due, run by the flush_notification_digests worker) or fills up to
+    DIGEST_MAX. Users who chose immediate delivery get every notification as is.
+    Everything is part of the caller's transaction.
+    """
+    now = now or timezone.now()
+    immediate, grouped = [], defaultdict(list)
+    for user, topic, message, summary in items:
+        if user.notification_delivery == 'immediate':
+            immediate.append((user, message))
+        else:
+            grouped[user.pk, topic].append((user, message, summary))
+
+    with transaction.atomic():
+        if grouped:
+            # Windows nobody has opened yet start out already over, then every key is locked
+            NotificationDigest.objects.bulk_create(
+                [NotificationDigest(recipient_id=user_id, topic=topic, window_ends=now) for user_id, topic in grouped],
+                ignore_conflicts=True,
+            )
+            digests = {
+                (digest.recipient_id, digest.topic): digest
+                for digest in NotificationDigest.objects.select_for_update()
+                .filter(recipient_id__in={user_id for user_id, _ in grouped}, topic__in={topic for _, topic in grouped})
+                .order_by('pk')
+            }
+
+            fresh = []
+            for key, events in grouped.items():
+                digest = digests.get(key)
+                if digest is None:
+                    # Flushed by the worker between the INSERT and the lock
+                    digest = NotificationDigest(recipient_id=key[0], topic=key[1], window_ends=now)
+                    fresh.append(digest)
+                digest.recipient = events[0][0]
+                if digest.window_ends <= now:
+                    # The last window is over: what it still holds goes out first, then this one
+                    if digest.pending:
+                        immediate.append(_summary(digest))
+                    user, message, _ = events.pop(0)
+                    immediate.append((user, message))
+                    digest.window_ends = now + DIGEST_WINDOW
+                    digest.pending = 0
+                if events:
+                    digest.pending += len(events)
+                    digest.summary = events[-1][2]
+                if digest.pending >= DIGEST_MAX:
+                    immediate.append(_summary(digest))
+                    digest.pending = 0
+                    digest.window_ends = now + DIGEST_WINDOW
+
+            NotificationDigest.objects.bulk_update(digests.values(), ['window_ends', 'pending', 'summary'])
+            NotificationDigest.objects.bulk_create(fresh, ignore_conflicts=True)
+
+        send_real_time_notifications(immediate)
+
+
+def flush_due(now=None):
+    """Send the summaries of the windows that have ended and close them. Returns the number sent."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = list(
+            NotificationDigest.objects.select_for_update()
+            .filter(window_ends__lte=now).select_related('recipient').order_by('pk')[:FLUSH_BATCH]
+        )
+        summaries = [_summary(digest) for digest in due if digest.pending]
+        send_real_time_notifications(summaries)
+        NotificationDigest.objects.filter(pk__in=[digest.pk for digest in due]).delete()
+    if summaries:
+        logger.info("📨 Sent %s notification digest(s)", len(summaries))
+    return len(summaries)
@@ -0,0 +1,99 @@
+from decimal import Decimal, InvalidOperation
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+from .models import Product
+from .search import search_products
+
+# Upper bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (50, 100, 250, 500, 1000, 5000, 10000)
+
+
+def _decimal(value):
+    try:
+        return Decimal(value) if value not in (None, '') else None
+    except InvalidOperation:
+        return None
+
+
+def _price_bucket():
+    whens = [When(effective_price__lt=edge, then=Value(index)) for index, edge in enumerate(PRICE_BUCKET_EDGES)]
+    return Case(*whens, default=Value(len(PRICE_BUCKET_EDGES)), output_field=IntegerField())
+
+
+def _price_buckets():
+    lows = (0,) + PRICE_BUCKET_EDGES
+    highs = PRICE_BUCKET_EDGES + (None,)
+    return [{"min": low, "max": high} for low, high in zip(lows, highs)]
+
+
+def catalog_facets(params):
+    """
+    Facet counts for the public catalogue, taking the same filters as `list_products`.
+
+    Everything comes from one GROUP BY over (category, condition, sale_type,
+    price bucket, price-range match); the facets are folded from those rows in
+    Python. Each facet ignores its own filter and applies the others, so the
+    client can show how many items every alternative would return.
+    """
+    sale_type = params.get('sale_type') or None
+    category_id = params.get('category') or None
+    min_price = _decimal(params.get('min_price'))
+    max_price = _decimal(params.get('max_price'))
+    title = params.get('title')
+
+    products = Product.objects.filter(is_approved=True, sold=False)
+    if title:
+        products = search_products(products, title, ranked=False)
+
+    price_range = Q()
+    if min_price is not None:
+        price_range &= Q(effective_price__gte=min_price)
+    if max_price is not None:
+        price_range &= Q(effective_price__lte=max_price)
+
+    rows = (
+        products.order_by()
+        .annotate(
+            price_bucket=_price_bucket(),
+            in_price_range=Case(When(price_range, then=Value(True)), default=Value(False), output_field=BooleanField())
+            if price_range else Value(True, output_field=BooleanField()),
+        )
+        .values('category_id', 'category__name', 'condition', 'sale_type', 'price_bucket', 'in_price_range')
+        .annotate(count=Count('id'))
+    )
+
+    total = 0
+    categories = {}
+    conditions = {value: 0 for value, _ in Product.CONDITION_CHOICES}
+    sale_types = {value: 0 for value, _ in Product.SALE_TYPE_CHOICES}
+    prices = _price_buckets()
+    for bucket in prices:
+        bucket["count"] = 0
+
+    for row in rows:
+        matches_category = category_id is None or str(row['category_id']) == str(category_id)
+        matches_sale_type = sale_type is None or row['sale_type'] == sale_type
+        matches_price = row['in_price_range']
+        count = row['count']
+
+        if matches_sale_type and matches_price:
+            entry = categories.setdefault(row['category_id'], {
+                "id": row['category_id'],
+                "name": row['category__name'] or "No Category",
+                "count": 0,
+            })
+            entry["count"] += count
+        if matches_category and matches_price:
+            sale_types[row['sale_type']] = sale_types.get(row['sale_type'], 0) + count
+        if matches_category and matches_sale_type:
+            prices[row['price_bucket']]["count"] += count
+            if matches_price:
+                total += count
+                conditions[row['condition']] = conditions.get(row['condition'], 0) + count
+
+    return {
+        "total": total,
+        "category": sorted(categories.values(), key=lambda entry: (-entry["count"], entry["name"])),
+        "condition": [{"value": value, "count": count} for value, count in conditions.items()],
+        "sale_type": [{"value": value, "count": count} for value, count in sale_types.items()],
+        "price": prices,
+    }
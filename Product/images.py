@@ -0,0 +1,158 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .cache import invalidate_product
+from .models import Product, ProductPhoto
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; smaller originals are never upscaled
+VARIANT_SIZES = {
+    'thumb': 200,
+    'card': 600,
+    'full': 1600,
+}
+DEFAULT_VARIANT = 'card'
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def save_product_photos(product, uploads):
+    """Store the original uploads in one INSERT; rendering is left to the worker."""
+    photos = ProductPhoto.objects.bulk_create(ProductPhoto(product=product, photo=upload) for upload in uploads)
+    invalidate_product(product.pk, product.category_id)  # bulk_create skips the cache signals
+    return photos
+
+
+def variant_name(photo_id, size, extension):
+    return f'product_photos/variants/{photo_id}/{size}.{extension}'
+
+
+def _load(photo):
+    with photo.photo.open('rb') as handle:
+        image = Image.open(handle)
+        image.load()
+    # Apply the EXIF orientation, then work on plain pixels so no metadata is written back
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, options):
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def render_variants(photo):
+    """Write every size/format of `photo` to storage and return the `variants` mapping."""
+    original = _load(photo)
+    variants = {}
+    try:
+        for size, edge in VARIANT_SIZES.items():
+            image = original.copy()
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            variants[size] = entry = {'width': image.width, 'height': image.height}
+            for extension, options in FORMATS.items():
+                name = variant_name(photo.pk, size, extension)
+                entry[extension] = default_storage.save(name, ContentFile(_encode(image, options)))
+    except Exception:
+        _release(_variant_names(variants))  # give back what was stored before the failure
+        raise
+    return variants
+
+
+def _variant_names(variants):
+    return [entry[extension] for entry in variants.values() for extension in FORMATS if entry.get(extension)]
+
+
+def _release(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception:
+            logger.exception("❌ Could not release product photo file %s", name)
+
+
+def process_photo(photo_id):
+    """
+    Claim one pending photo, render its variants and replace the original upload
+    with the EXIF-free full-size JPEG. Returns True when the photo is ready.
+    """
+    if not ProductPhoto.objects.filter(pk=photo_id, image_status='pending').update(image_status='processing'):
+        return False  # Another worker has it
+
+    photo = ProductPhoto.objects.filter(pk=photo_id).first()
+    if photo is None:
+        return False  # Deleted since it was claimed
+    try:
+        variants = render_variants(photo)
+    except Exception:
+        logger.exception("❌ Could not process product photo %s", photo_id)
+        ProductPhoto.objects.filter(pk=photo_id).update(image_status='failed')
+        return False
+
+    previous = _variant_names(photo.variants)
+    photo.variants = variants
+    photo.photo.name = variants['full']['jpeg']
+    default_storage.retain(photo.photo.name)  # the field and variants['full'] are two references
+    photo.image_status = 'ready'
+    try:
+        with transaction.atomic():  # a savepoint, so a failed save leaves the connection usable
+            photo.save(update_fields=['variants', 'photo', 'image_status'])  # post_save refreshes the catalogue cache
+    except Exception:
+        # Usually the row was deleted while rendering; nothing points at the new files then
+        logger.exception("❌ Could not save product photo %s", photo_id)
+        _release(_variant_names(variants) + [photo.photo.name])
+        ProductPhoto.objects.filter(pk=photo_id).update(image_status='failed')
+        return False
+    Product.objects.filter(pk=photo.product_id).update(updated_at=timezone.now())  # its Last-Modified
+    # The save gave back the original (keeps EXIF/GPS out of the served files); drop any
+    # earlier renditions too. Each is one reference, so shared blobs stay until their last user lets go.
+    _release(previous)
+    return True
+
+class PhotoProcessor:
+    """Renders pending photos on a pool of threads (Pillow releases the GIL while resizing and encoding)."""
+
+    def __init__(self, workers=4, batch_size=20):
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def pending_ids(self):
+        return list(
+            ProductPhoto.objects.filter(image_status='pending').order_by('id').values_list('id', flat=True)[:self.batch_size]
+        )
+
+    def run_batch(self):
+        """Process one batch of pending photos; returns (ready, failed or skipped)."""
+        ids = self.pending_ids()
+        results = list(self.pool.map(_process_in_thread, ids))
+        ready = sum(results)
+        return ready, len(results) - ready
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+
+def _process_in_thread(photo_id):
+    try:
+        return process_photo(photo_id)
+    finally:
+        connection.close()
+
+
+def requeue(statuses):
+    """Hand photos back to the queue, e.g. 'processing' left by a crashed worker or 'failed' ones."""
+    return ProductPhoto.objects.filter(image_status__in=statuses).update(image_status='pending')
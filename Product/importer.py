@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from .models import Product, ProductPhoto
+from .serializer import ProductSerializer
+from .signals import products_imported
+
+IMPORT_BATCH_SIZE = 200
+MAX_IMPORT_ROWS = 5000
+MAX_PHOTOS_PER_PRODUCT = 5  # same limit as the create_product views
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+FORMATS = ('csv', 'ndjson')
+PHOTO_SEPARATOR = '|'  # CSV: "front.jpg|back.jpg"
+
+
+class ImportFileError(Exception):
+    """The file as a whole can't be read (as opposed to a bad row)."""
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        if requested not in FORMATS:
+            raise ImportFileError(f"صيغة غير مدعومة: {requested}. الصيغ المدعومة: csv أو ndjson.")
+        return requested
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise ImportFileError("تعذر تحديد صيغة الملف، استخدم ملف csv أو ndjson.")
+
+
+def read_rows(handle, fmt):
+    """
+    Yield (row_number, data, error) from a binary file handle; `data` is None and
+    `error` set for a record that can't be read. Row numbers start at 1 with the
+    first record (the CSV header isn't counted).
+    """
+    text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+    number = 0
+    try:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, {key.strip(): value for key, value in row.items() if key and value not in (None, '')}, None
+            return
+
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, None, "⚠️ سطر JSON غير صالح."
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "⚠️ كل سطر يجب أن يكون كائن JSON."
+                continue
+            yield number, {key: value for key, value in row.items() if value not in (None, '')}, None
+    except (UnicodeDecodeError, csv.Error):
+        yield number + 1, None, "⚠️ تعذرت قراءة الملف من هذا السطر، يجب أن يكون بترميز UTF-8."
+
+
+class PhotoArchive:
+    """Photos referenced by import rows, looked up by their path or file name inside a zip."""
+
+    def __init__(self, source):
+        try:
+            self.zip = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            raise ImportFileError("أرشيف الصور يجب أن يكون ملف zip صالحًا.")
+        self.members = {}
+        for info in self.zip.infolist():
+            if info.is_dir():
+                continue
+            self.members.setdefault(info.filename, info)
+            self.members.setdefault(os.path.basename(info.filename), info)
+
+    def error(self, name):
+        info = self.members.get(name)
+        if info is None:
+            return f"⚠️ الصورة غير موجودة في الأرشيف: {name}"
+        if info.file_size > MAX_PHOTO_BYTES:
+            return f"⚠️ حجم الصورة أكبر من المسموح: {name}"
+        return None
+
+    def read(self, name):
+        info = self.members[name]
+        return ContentFile(self.zip.read(info), name=os.path.basename(info.filename))
+
+    def close(self):
+        self.zip.close()
+
+
+def _photo_names(data):
+    photos = data.pop('photos', [])
+    if isinstance(photos, str):
+        photos = photos.split(PHOTO_SEPARATOR)
+    if not isinstance(photos, list):
+        return None
+    return [str(name).strip() for name in photos if str(name).strip()]
+
+
+def _photo_errors(photos, archive):
+    """The photo checks the create_product views make; the other fields are the serializer's."""
+    errors = {}
+    if photos is None:
+        errors['photos'] = {"error": "⚠️ قائمة الصور غير صالحة."}
+    elif not photos:
+        errors['photos'] = {"error": "يجب تحميل صورة واحدة على الأقل."}
+    elif len(photos) > MAX_PHOTOS_PER_PRODUCT:
+        errors['photos'] = {"error": f"يمكنك تحميل {MAX_PHOTOS_PER_PRODUCT} صور كحد أقصى."}
+    elif archive is None:
+        errors['photos'] = {"error": "⚠️ لم يتم رفع أرشيف الصور."}
+    else:
+        missing = [message for message in map(archive.error, photos) if message]
+        if missing:
+            errors['photos'] = {"error": missing}
+    return errors
+
+
+def _validate(seller, number, data, archive):
+    """Return (Product, photo names) for a valid row, or an error report entry."""
+    data.setdefault('sale_type', 'عادي')
+    photos = _photo_names(data)
+    errors = _photo_errors(photos, archive)
+
+    serializer = ProductSerializer(data=data)
+    if not serializer.is_valid():
+        errors = {**serializer.errors, **errors}
+    if errors:
+        return None, {"row": number, "errors": errors}
+
+    product = Product(seller=seller, **serializer.validated_data)
+    if product.sale_type == 'مزاد' and product.duration:
+        product.bid_end_time = timezone.now() + timedelta(hours=product.duration)
+    product.set_derived_fields()
+    return (product, photos), None
+
+
+def _insert_batch(valid, archive):
+    """One transaction per batch: a bulk INSERT for the products, one for their photos."""
+    with transaction.atomic():
+        products = Product.objects.bulk_create([product for product, _ in valid])
+        ProductPhoto.objects.bulk_create(
+            ProductPhoto(product=product, photo=archive.read(name))  # stored as pending for process_photos
+            for product, (_, photos) in zip(products, valid)
+            for name in photos
+        )
+        products_imported.send(sender=Product, products=products)
+    return products
+
+
+def import_products(seller, rows, archive=None, batch_size=IMPORT_BATCH_SIZE, max_rows=MAX_IMPORT_ROWS):
+    """
+    Validate `rows` (from read_rows) with the ProductSerializer rules and insert the
+    valid ones in batches. Invalid rows are reported and skipped; they never
+    hold back the rest of the file.
+
+    Returns {"created": n, "failed": n, "product_ids": [...], "errors": [{"row": n, "errors": {...}}]}.
+    """
+    report = {"created": 0, "failed": 0, "product_ids": [], "errors": []}
+    valid = []
+
+    def flush():
+        if valid:
+            products = _insert_batch(valid, archive)
+            report["created"] += len(products)
+            report["product_ids"].extend(product.pk for product in products)
+            valid.clear()
+
+    for count, (number, data, error) in enumerate(rows, start=1):
+        if count > max_rows:
+            report["errors"].append({"row": number, "errors": {"file": {"error": f"⚠️ الحد الأقصى {max_rows} منتج في الملف الواحد."}}})
+            report["failed"] += 1
+            break
+        if error:
+            entry, failure = None, {"row": number, "errors": {"row": {"error": error}}}
+        else:
+            entry, failure = _validate(seller, number, data, archive)
+        if failure:
+            report["errors"].append(failure)
+            report["failed"] += 1
+            continue
+        valid.append(entry)
+        if len(valid) >= batch_size:
+            flush()
+    flush()
+    return report
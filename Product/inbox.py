@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.utils import timezone
+from Chats.models import Notification
+from pagination import MergedKeysetPagination
+from . import unread
+from .models import Notificationbid
+
+# Inbox kinds, named like the unread badges they feed
+INBOX_KINDS = ('bids', 'chat')
+
+
+def _sources(user):
+    return {
+        'bids': Notificationbid.objects.filter(recipient=user),
+        'chat': Notification.objects.filter(user=user).select_related('message'),
+    }
+
+
+def inbox_querysets(user, kinds=INBOX_KINDS, unread_only=False):
+    """
+    One queryset per kind, each walking its (recipient, is_read, created_at) index
+    and tagged with its kind so the two tables page as a single list.
+    """
+    querysets = []
+    for kind, queryset in _sources(user).items():
+        if kind not in kinds:
+            continue
+        if unread_only:
+            queryset = queryset.filter(is_read=False)
+        querysets.append(queryset.annotate(kind=Value(kind, output_field=CharField())))
+    return querysets
+
+
+def inbox_paginator():
+    paginator = MergedKeysetPagination(ordering=('-created_at', 'kind', '-id'))
+    paginator.page_size = 20
+    return paginator
+
+
+def mark_read(user, up_to=None, kinds=INBOX_KINDS):
+    """
+    Mark every unread notification created up to `up_to` (default: now) as read:
+    one ranged UPDATE per table over the inbox index. Returns {kind: rows}.
+    """
+    up_to = up_to or timezone.now()
+    marked = {}
+    with transaction.atomic():
+        for kind, queryset in _sources(user).items():
+            if kind not in kinds:
+                continue
+            marked[kind] = queryset.filter(is_read=False, created_at__lte=up_to).update(is_read=True)
+            unread.marked_read(kind, user.id, marked[kind])
+    return marked
@@ -0,0 +1,63 @@
+from datetime import datetime
+from decimal import Decimal
+
+# Delta kinds pushed to `ws/auction/<product_id>/` viewers
+BID = 'bid'            # a bid was accepted
+PRICE = 'price'        # highest price/bid count changed without a new bid (reject, delete)
+EXTENDED = 'extended'  # bid_end_time moved later
+CLOSED = 'closed'      # auction over, with the winner if any
+
+
+def auction_group(product_id):
+    return f"auction_{product_id}"
+
+
+def _plain(value):
+    """Channel layer messages are msgpack: send Decimals and datetimes as strings."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def auction_message(product_id, event, **fields):
+    delta = {"event": event, "product_id": product_id}
+    delta.update({key: _plain(value) for key, value in fields.items()})
+    return {"type": "auction.delta", "delta": delta}
+
+
+def publish_auction_delta(product_id, event, **fields):
+    """Queue a delta for everyone watching the auction; sent once the current transaction commits."""
+    from . import outbox  # models imports this module
+    outbox.publish(auction_group(product_id), auction_message(product_id, event, **fields))
+
+
+def publish_bid_accepted(product, bid):
+    publish_auction_delta(
+        product.pk, BID,
+        amount=bid.amount,
+        highest_bid=product.highest_bid,
+        bid_count=product.bid_count,
+        last_bid_at=product.last_bid_at,
+    )
+
+
+def publish_price(product):
+    publish_auction_delta(product.pk, PRICE, highest_bid=product.highest_bid, bid_count=product.bid_count)
+
+
+def publish_extended(product):
+    publish_auction_delta(product.pk, EXTENDED, bid_end_time=product.bid_end_time)
+
+
+def publish_closed(product, winning_bid=None):
+    winner = None
+    if winning_bid is not None:
+        winner = {
+            "bid_id": winning_bid.pk,
+            "buyer_id": winning_bid.buyer_id,
+            "buyer_name": winning_bid.buyer.name,
+            "amount": str(winning_bid.amount),
+        }
+    publish_auction_delta(product.pk, CLOSED, closed_at=product.closed_at, sold=product.sold, winner=winner)
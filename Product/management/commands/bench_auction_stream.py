@@ -0,0 +1,112 @@
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from Auth.models import MarketUser
+from Chats.routing import websocket_routes
+from Product import live
+from Product.models import Product
+
+PREFIX = 'bench_stream_'
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 1000}}}
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Connect many viewers to ws/auction/<id>/, publish auction deltas and report the "
+        "fan-out latency until every viewer has received each delta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000)
+        parser.add_argument('--deltas', type=int, default=20)
+        parser.add_argument('--connect-batch', type=int, default=100, help="Viewers connected concurrently")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Seconds to wait for one delta")
+        parser.add_argument(
+            '--use-redis', action='store_true',
+            help="Use the configured (Redis) channel layer and cache instead of in-process ones",
+        )
+
+    def handle(self, *args, **options):
+        if options['use_redis']:
+            self._bench(options)
+        else:
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES):
+                self._bench(options)
+
+    def _bench(self, options):
+        auction = self._fixtures()
+        try:
+            latencies = asyncio.run(self._run(auction.pk, options))
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+        self._report(latencies, options)
+
+    def _fixtures(self):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username=f'{PREFIX}seller'), name='bench seller')
+        return Product.objects.create(
+            seller=seller, title='bench auction', description='bench', sale_type='مزاد',
+            starting_price=Decimal('100.00'), is_approved=True, location='bench',
+            bid_end_time=timezone.now() + timedelta(hours=1),
+        )
+
+    async def _run(self, product_id, options):
+        app = URLRouter(websocket_routes)
+        viewers = []
+        start = time.perf_counter()
+        for offset in range(0, options['subscribers'], options['connect_batch']):
+            batch = [
+                WebsocketCommunicator(app, f"/ws/auction/{product_id}/")
+                for _ in range(min(options['connect_batch'], options['subscribers'] - offset))
+            ]
+            connected = await asyncio.gather(*(viewer.connect() for viewer in batch))
+            if not all(ok for ok, _ in connected):
+                raise CommandError("A viewer was refused by the auction consumer")
+            await asyncio.gather(*(viewer.receive_json_from(options['timeout']) for viewer in batch))  # snapshot
+            viewers.extend(batch)
+        self.stdout.write(f"Connected {len(viewers)} viewers in {time.perf_counter() - start:.2f}s")
+
+        layer = get_channel_layer()
+        latencies = []  # per delta: seconds until each viewer had it
+        try:
+            for seq in range(options['deltas']):
+                message = live.auction_message(product_id, live.BID, amount=Decimal(101 + seq), bid_count=seq + 1)
+                sent = time.perf_counter()
+
+                async def arrival(viewer):
+                    delta = await viewer.receive_json_from(options['timeout'])
+                    if delta['bid_count'] != seq + 1:
+                        raise CommandError(f"Viewer received delta {delta} out of order")
+                    return time.perf_counter() - sent
+
+                await layer.group_send(live.auction_group(product_id), message)
+                latencies.append(await asyncio.gather(*(arrival(viewer) for viewer in viewers)))
+        finally:
+            await asyncio.gather(*(viewer.disconnect() for viewer in viewers), return_exceptions=True)
+        return latencies
+
+    def _report(self, latencies, options):
+        every = sorted(value * 1000 for per_delta in latencies for value in per_delta)
+        complete = [max(per_delta) * 1000 for per_delta in latencies]
+
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(len(values) * p))]
+
+        self.stdout.write(f"{options['deltas']} deltas to {options['subscribers']} viewers")
+        self.stdout.write(
+            f"per-viewer latency ms: p50 {percentile(every, 0.50):.1f}  p95 {percentile(every, 0.95):.1f}  "
+            f"p99 {percentile(every, 0.99):.1f}  max {every[-1]:.1f}"
+        )
+        self.stdout.write(
+            f"full fan-out ms (last viewer): median {statistics.median(complete):.1f}  max {max(complete):.1f}"
+        )
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.test.utils import override_settings
+from django.utils import timezone
+from Auth.models import MarketUser
+from Product.bidding import BidRejected, place_bid
+from Product.models import Product, Bid
+
+PREFIX = 'bench_bids_'
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent bids at one auction through the bid engine, check the auction "
+        "invariants and report throughput. Fixtures are committed and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=500, help="Bid attempts in total")
+        parser.add_argument('--workers', type=int, default=16, help="Concurrent bidders (threads)")
+        parser.add_argument('--bidders', type=int, default=50, help="Distinct buyer accounts")
+        parser.add_argument('--max-increment', type=int, default=5)
+        parser.add_argument(
+            '--use-redis', action='store_true',
+            help="Use the configured channel layer and cache instead of in-process ones",
+        )
+
+    def handle(self, *args, **options):
+        if options['use_redis']:
+            self._bench(options)
+        else:
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES):
+                self._bench(options)
+
+    def _bench(self, options):
+        buyers, auction = self._fixtures(options['bidders'])
+        try:
+            outcome = self._fire(auction.pk, buyers, options['bids'], options['workers'], options['max_increment'])
+            self._report(auction, outcome)
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _fixtures(self, bidders):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username=f'{PREFIX}seller'), name='bench seller')
+        buyers = [
+            MarketUser.objects.create(profile=User.objects.create_user(username=f'{PREFIX}buyer{i}'), name=f'bench buyer {i}')
+            for i in range(bidders)
+        ]
+        auction = Product.objects.create(
+            seller=seller, title='bench auction', description='bench', sale_type='مزاد',
+            starting_price=Decimal('100.00'), is_approved=True, location='bench',
+            bid_end_time=timezone.now() + timedelta(hours=1),
+        )
+        return buyers, auction
+
+    def _fire(self, auction_id, buyers, attempts, workers, max_increment):
+        local = threading.local()
+        counts = {'recorded': 0, 'outbid': 0, 'accepts': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def attempt(i):
+            # Every bidder reads the standing bid and tops it; every tenth attempt is an
+            # admin accepting the best pending bid instead, which raises the bar bids must beat
+            rng = getattr(local, 'rng', None) or random.Random(i)
+            local.rng = rng
+            try:
+                if i % 10 == 9:
+                    best = Bid.objects.filter(product_id=auction_id, status="pending").order_by('-amount').first()
+                    if best:
+                        Product.objects.get(pk=auction_id).apply_accepted_bid(best)
+                    outcome = 'accepts'
+                else:
+                    floor = Product.objects.filter(pk=auction_id).values_list('current_bid', 'starting_price').get()
+                    amount = (floor[0] or floor[1]) + rng.randint(1, max_increment)
+                    place_bid(auction_id, buyers[i % len(buyers)], amount)
+                    outcome = 'recorded'
+            except BidRejected:
+                outcome = 'outbid'
+            except OperationalError:
+                outcome = 'errors'
+            with lock:
+                counts[outcome] += 1
+
+        def run(i):
+            try:
+                attempt(i)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, range(attempts)))
+        counts['elapsed'] = time.perf_counter() - start
+        return counts
+
+    def _report(self, auction, outcome):
+        auction.refresh_from_db()
+        bids = list(Bid.objects.filter(product=auction).order_by('id').values_list('amount', 'status'))
+        amounts = [amount for amount, _ in bids]
+        accepted = [amount for amount, bid_status in bids if bid_status == "accepted"]
+
+        problems = []
+        if len(amounts) != outcome['recorded']:
+            problems.append(f"{outcome['recorded']} bids reported recorded but {len(amounts)} rows exist")
+        if amounts and auction.current_bid != max(amounts):
+            problems.append(f"current_bid {auction.current_bid} != highest bid {max(amounts)}")
+        if accepted and auction.highest_bid != max(accepted):
+            problems.append(f"highest_bid {auction.highest_bid} != highest accepted bid {max(accepted)}")
+        if len(accepted) != auction.bid_count:
+            problems.append(f"bid_count {auction.bid_count} != {len(accepted)} accepted bids")
+        if amounts and min(amounts) <= auction.starting_price:
+            problems.append("a bid did not beat the starting price")
+
+        elapsed = outcome['elapsed']
+        attempts = outcome['recorded'] + outcome['outbid'] + outcome['errors']
+        self.stdout.write(
+            f"{attempts} bid attempts and {outcome['accepts']} accepts in {elapsed:.2f}s: "
+            f"{outcome['recorded']} recorded, {outcome['outbid']} outbid, {outcome['errors']} database errors"
+        )
+        self.stdout.write(
+            f"{attempts / elapsed:.0f} attempts/s, {outcome['recorded'] / elapsed:.0f} recorded bids/s, "
+            f"best offer {auction.current_bid}, highest accepted {auction.highest_bid}"
+        )
+        if problems:
+            raise CommandError("Invariant violations:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Invariants hold: every bid recorded, the auction summary matches the bid rows"))
@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from Auth.models import MarketUser
+from Product.models import Product
+from Product.search import rebuild_index, search_products
+
+WORDS = [
+    'سيارة', 'تويوتا', 'هاتف', 'آيفون', 'حاسوب', 'محمول', 'ساعة', 'أثاث', 'كرسي', 'طاولة',
+    'دراجة', 'ثلاجة', 'غسالة', 'تلفاز', 'شاشة', 'كاميرا', 'حقيبة', 'حذاء', 'مكيف', 'سجادة',
+    'samsung', 'iphone', 'laptop', 'camera', 'bike', 'watch', 'sofa', 'table', 'phone', 'screen',
+]
+QUERIES = ['سيارة', 'ايفون', 'حاسوب محمول', 'ساعه', 'samsung', 'ثلاج', 'cam']
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare full-text search latency with title__icontains on a generated catalogue (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['products'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count, repeat):
+        rng = random.Random(42)
+        # A large filler vocabulary keeps the real query terms at realistic selectivity
+        filler = [''.join(rng.choices(LETTERS, k=rng.randint(3, 7))) for _ in range(5000)]
+        user = User.objects.create_user(username='bench_search_seller')
+        seller = MarketUser.objects.create(profile=user, name='bench')
+
+        start = time.perf_counter()
+        Product.objects.bulk_create(
+            (
+                Product(
+                    seller=seller,
+                    title=' '.join([rng.choice(WORDS)] + rng.choices(filler, k=2)),
+                    description=' '.join(rng.choices(filler, k=20) + rng.choices(WORDS, k=1)),
+                    price=rng.randint(1, 5000),
+                    is_approved=True,
+                )
+                for _ in range(count)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(f"Inserted {count} products in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rebuild_index()
+        self.stdout.write(f"Indexed {count} products in {time.perf_counter() - start:.1f}s")
+
+        # Each sample mirrors a paginated listing request: COUNT(*) plus the first page
+        base = Product.objects.filter(is_approved=True, sold=False)
+        self.stdout.write(f"{'query':<16}{'icontains ms':>14}{'search ms':>12}{'icontains hits':>16}{'search hits':>13}")
+        for query in QUERIES:
+            icontains_qs = base.filter(Q(title__icontains=query) | Q(description__icontains=query)).order_by('-id')
+            search_qs = search_products(base, query)
+            icontains = self._time(lambda: (icontains_qs.count(), list(icontains_qs[:10])), repeat)
+            fts = self._time(lambda: (search_qs.count(), list(search_qs[:10])), repeat)
+            self.stdout.write(
+                f"{query:<16}{icontains:>14.2f}{fts:>12.2f}{icontains_qs.count():>16}{search_qs.count():>13}"
+            )
+
+    @staticmethod
+    def _time(run, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
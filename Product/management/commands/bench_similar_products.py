@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from Auth.models import MarketUser
+from Product import similar
+from Product.models import Category, Product, SimilarProduct
+
+PREFIX = 'bench_similar_'
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+LOCATIONS = ['بيروت', 'طرابلس', 'صيدا', 'صور', 'جونيه', 'زحلة', 'بعلبك', 'النبطية', 'جبيل', 'عاليه']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a full similar-products rebuild and incremental updates on a synthetic catalogue. "
+        "Everything runs in one transaction that is rolled back, so the database is left as it was."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--vocabulary', type=int, default=3000, help="Distinct title words")
+        parser.add_argument('--samples', type=int, default=100, help="Products unlisted and relisted for the incremental timings")
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=LOCAL_CACHES), transaction.atomic():
+            self._bench(options, random.Random(options['seed']))
+            transaction.set_rollback(True)
+
+    def _bench(self, options, rng):
+        start = time.perf_counter()
+        products = self._fixtures(options, rng)
+        self.stdout.write(f"Created {len(products)} products in {options['categories']} categories in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        indexed, rows = similar.rebuild_all()
+        rebuild = time.perf_counter() - start
+        self.stdout.write(
+            f"Full rebuild: {indexed} products, {rows} rows in {rebuild:.1f}s "
+            f"({indexed / rebuild:.0f} products/s)"
+        )
+
+        # One queued change per worker pass: the latency a lone approval or sale sees
+        unlisted, listed = [], []
+        for product_id, category_id in rng.sample(products, min(options['samples'], len(products))):
+            Product.objects.filter(pk=product_id).update(is_approved=False)
+            similar.queue_refresh(product_id, category_id)
+            start = time.perf_counter()
+            similar.refresh_queued()
+            unlisted.append(time.perf_counter() - start)
+
+            Product.objects.filter(pk=product_id).update(is_approved=True)
+            similar.queue_refresh(product_id, category_id)
+            start = time.perf_counter()
+            similar.refresh_queued()
+            listed.append(time.perf_counter() - start)
+
+        for label, timings in (("approved (listed)", listed), ("sold/closed (unlisted)", unlisted)):
+            timings = sorted(value * 1000 for value in timings)
+            self.stdout.write(
+                f"Incremental {label}: p50 {statistics.median(timings):.0f} ms  "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.0f} ms  max {timings[-1]:.0f} ms"
+            )
+
+        # A burst queued before the worker wakes: one index load per category for the whole batch
+        burst = rng.sample(products, min(similar.REFRESH_BATCH_SIZE, len(products)))
+        for product_id, category_id in burst:
+            similar.queue_refresh(product_id, category_id)
+        start = time.perf_counter()
+        applied = similar.refresh_queued()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Queued burst: {applied} changes in one pass in {elapsed * 1000:.0f} ms")
+
+        sample = products[0][0]
+        start = time.perf_counter()
+        served = list(similar.similar_products(sample))
+        self.stdout.write(f"Serving one list: {len(served)} products in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self.stdout.write(f"Table size: {SimilarProduct.objects.count()} rows")
+
+    def _fixtures(self, options, rng):
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username=f'{PREFIX}seller'), name='bench seller')
+        categories = Category.objects.bulk_create(
+            Category(name=f'{PREFIX}{index}') for index in range(options['categories'])
+        )
+        words = [f'w{index}' for index in range(options['vocabulary'])]
+        # Zipf-like word frequencies so a few words are everywhere and most are rare
+        weights = [1 / (rank + 1) for rank in range(len(words))]
+
+        batch = []
+        for _ in range(options['products']):
+            category = rng.choice(categories)
+            price = Decimal(round(rng.lognormvariate(5, 1.2), 2))
+            batch.append(Product(
+                seller=seller, category=category, title=' '.join(rng.choices(words, weights, k=rng.randint(2, 5))),
+                description='bench', price=price, effective_price=price, location=rng.choice(LOCATIONS),
+                is_approved=True,
+            ))
+        created = Product.objects.bulk_create(batch, batch_size=2000)
+        return [(product.pk, product.category_id) for product in created]
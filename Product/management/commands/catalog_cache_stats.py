@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from Product.cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the catalogue response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'endpoint':<24}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for endpoint, counts in cache_stats().items():
+            total = counts['hits'] + counts['misses']
+            rate = f"{counts['hits'] / total:.1%}" if total else '-'
+            self.stdout.write(f"{endpoint:<24}{counts['hits']:>10}{counts['misses']:>10}{rate:>10}")
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write("Counters reset.")
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+from Product.auctions import AuctionCloser, archive_closed_auctions, close_expired_auctions
+from Product.management.worker import run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Close auctions within seconds of their bid_end_time and periodically move auctions "
+        "closed for a day into history (runs as a worker process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Close the auctions that are already due and exit.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Auctions loaded per query when closing.")
+        parser.add_argument('--horizon', type=int, default=300, help="Seconds ahead of now to keep queued.")
+        parser.add_argument('--refresh-interval', type=float, default=30, help="Seconds between queue refreshes.")
+        parser.add_argument('--max-sleep', type=float, default=5, help="Longest idle sleep between checks.")
+        parser.add_argument('--history-interval', type=float, default=300, help="Seconds between history sweeps.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            closed = close_expired_auctions(batch_size=options['batch_size'])
+            archived = archive_closed_auctions()
+            self.stdout.write(self.style.SUCCESS(f"Closed {closed} auction(s), moved {archived} to history."))
+            return
+
+        closer = AuctionCloser(batch_size=options['batch_size'], horizon=options['horizon'])
+        next_refresh = 0
+        next_archive = 0
+
+        def close_due():
+            nonlocal next_refresh, next_archive
+            if time.monotonic() >= next_refresh:
+                closer.refresh()
+                next_refresh = time.monotonic() + options['refresh_interval']
+
+            closed = closer.close_due()
+            if closed:
+                self.stdout.write(f"Closed {closed} auction(s).")
+
+            if time.monotonic() >= next_archive:
+                archived = archive_closed_auctions()
+                if archived:
+                    self.stdout.write(f"Moved {archived} auction(s) to history.")
+                next_archive = time.monotonic() + options['history_interval']
+
+        def until_next():
+            wait = closer.seconds_until_next()
+            if wait is None or wait > options['max_sleep']:
+                wait = options['max_sleep']
+            return max(min(wait, next_refresh - time.monotonic()), 0.1)
+
+        self.stdout.write("⏱️ Auction closer started.")
+        run_worker(close_due, until_next, "Auction closer")
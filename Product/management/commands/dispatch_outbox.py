@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from Product.management.worker import run_worker
+from Product.outbox import BATCH_SIZE, OutboxDispatcher, outbox_stats, requeue_dead
+
+
+class Command(BaseCommand):
+    help = "Send the WebSocket events queued in the outbox to the channel layer (runs as a worker process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain what is queued and exit.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Events claimed per round.")
+        parser.add_argument('--poll-interval', type=float, default=0.2, help="Idle sleep between checks.")
+        parser.add_argument('--stats-interval', type=float, default=60, help="Seconds between lag reports.")
+        parser.add_argument('--retry-dead', action='store_true', help="Requeue events that ran out of attempts.")
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            self.stdout.write(f"Requeued {requeue_dead()} event(s).")
+
+        dispatcher = OutboxDispatcher(batch_size=options['batch_size'])
+        next_report = time.monotonic() + options['stats_interval']
+
+        def dispatch():
+            nonlocal next_report
+            sent, failed = dispatcher.run_batch()
+            if failed:
+                self.stdout.write(self.style.WARNING(f"Sent {sent} event(s), {failed} waiting for a retry."))
+
+            if time.monotonic() >= next_report:
+                stats = outbox_stats()
+                self.stdout.write(
+                    f"Outbox: {stats['pending']} pending, oldest {stats['oldest_pending_seconds']}s, "
+                    f"last batch lag {stats['last_batch_lag_seconds']}s, {stats['dead']} dead."
+                )
+                next_report = time.monotonic() + options['stats_interval']
+            return sent or failed
+
+        if options['once']:
+            while dispatch():
+                pass
+            return
+
+        self.stdout.write("📮 Outbox dispatcher started.")
+        run_worker(dispatch, options['poll_interval'], "Outbox dispatch")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from Product.digests import flush_due
+from Product.management.worker import run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the summaries of notification bursts whose coalescing window has ended "
+        "(runs as a worker process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Flush once and exit.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between flushes.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(f"Sent {flush_due()} digest(s)."))
+            return
+
+        self.stdout.write("📨 Notification digest flusher started.")
+        def flush():
+            flush_due()  # windows end on the clock, so every pass waits the interval
+
+        run_worker(flush, options['interval'], "Digest flush")
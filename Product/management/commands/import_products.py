@@ -0,0 +1,62 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from Auth.models import MarketUser
+from Product import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import products for one seller from a CSV or NDJSON file plus a zip of photos. "
+        "Valid rows are inserted in batches; photos are left for the process_photos worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="CSV or NDJSON file, one product per row.")
+        parser.add_argument('--seller', required=True, help="Seller's username or MarketUser id.")
+        parser.add_argument('--photos', help="Zip archive with the photos named in the rows.")
+        parser.add_argument('--format', choices=importer.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=importer.IMPORT_BATCH_SIZE)
+        parser.add_argument('--max-rows', type=int, default=None, help="No limit unless given.")
+        parser.add_argument('--report', help="Write the full per-row report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        lookup = Q(profile__username=options['seller'])
+        if options['seller'].isdigit():
+            lookup |= Q(pk=int(options['seller']))
+        seller = MarketUser.objects.filter(lookup).first()
+        if seller is None:
+            raise CommandError(f"No seller matches {options['seller']!r}")
+
+        archive = None
+        start = time.perf_counter()
+        try:
+            fmt = importer.detect_format(options['file'], options['format'])
+            if options['photos']:
+                archive = importer.PhotoArchive(options['photos'])
+            with open(options['file'], 'rb') as handle:
+                report = importer.import_products(
+                    seller, importer.read_rows(handle, fmt), archive,
+                    batch_size=options['batch_size'], max_rows=options['max_rows'] or float('inf'),
+                )
+        except (importer.ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+        finally:
+            if archive:
+                archive.close()
+        elapsed = time.perf_counter() - start
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        for failure in report['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"row {failure['row']}: {json.dumps(failure['errors'], ensure_ascii=False)}"))
+        if len(report['errors']) > 20:
+            self.stdout.write(self.style.WARNING(f"... {len(report['errors']) - 20} more failed row(s)"))
+
+        rate = report['created'] / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} product(s), {report['failed']} row(s) rejected "
+            f"in {elapsed:.1f}s ({rate:.0f} products/min)."
+        ))
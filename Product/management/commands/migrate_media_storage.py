@@ -0,0 +1,130 @@
+import hashlib
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from MarketPlace.storage import ContentAddressedStorage, is_blob
+from Product.cache import ALL_SCOPE, CATEGORIES_SCOPE, bump_catalog_versions
+from Product.images import FORMATS
+from Product.models import ProductPhoto
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media saved under the old per-field directories into content-addressed storage: "
+        "identical files collapse into one blob and every file/image field is repointed at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report how much would be deduplicated.")
+        parser.add_argument('--keep-originals', action='store_true', help="Leave the old files on disk after repointing.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("STORAGES['default'] is not MarketPlace.storage.ContentAddressedStorage")
+
+        references = list(self._legacy_references())
+        if options['dry_run']:
+            self._report_plan(references)
+            return
+
+        self.moved = {}  # legacy name -> blob name
+        missing = set()
+        repointed = 0
+        for model, field, legacy in references:
+            blob = self._claim(legacy, missing)
+            if blob is None:
+                continue
+            with transaction.atomic():
+                rows = model.objects.filter(**{field.name: legacy}).update(**{field.name: blob})
+                default_storage.retain(blob, rows - 1)  # _claim already counted one
+            repointed += rows
+        repointed += self._migrate_variants(missing)
+
+        deleted = 0
+        if not options['keep_originals']:
+            for legacy in self.moved:
+                default_storage.delete(legacy)  # names outside blobs/ are plain files
+                deleted += 1
+
+        bump_catalog_versions(ALL_SCOPE, CATEGORIES_SCOPE)
+        blobs = len(set(self.moved.values()))
+        self.stdout.write(
+            f"Repointed {repointed} reference(s): {len(self.moved)} file(s) stored as {blobs} blob(s), "
+            f"{deleted} old file(s) removed, {len(missing)} missing on disk."
+        )
+        for legacy in sorted(missing):
+            self.stdout.write(self.style.WARNING(f"missing: {legacy}"))
+
+    def _legacy_references(self):
+        """(model, field, name) for every distinct file name still outside blob storage."""
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.FileField):
+                    continue
+                default = field.default if isinstance(field.default, str) else None
+                names = (
+                    model.objects.exclude(**{f'{field.name}__isnull': True})
+                    .exclude(**{field.name: ''})
+                    .exclude(**{f'{field.name}__startswith': 'blobs/'})
+                    .values_list(field.name, flat=True)
+                    .distinct()
+                )
+                for name in names:
+                    if name != default:  # new rows still get the default file, keep it as is
+                        yield model, field, name
+
+    def _claim(self, legacy, missing):
+        """Blob for a legacy file, holding one new reference to it (None when the file is gone)."""
+        blob = self.moved.get(legacy)
+        if blob is not None:
+            default_storage.retain(blob)
+            return blob
+        if not default_storage.exists(legacy):
+            missing.add(legacy)
+            return None
+        with default_storage.open(legacy, 'rb') as handle:
+            blob = default_storage.save(legacy, File(handle))
+        self.moved[legacy] = blob
+        return blob
+
+    def _migrate_variants(self, missing):
+        """Renditions written by `process_photos` are referenced from ProductPhoto.variants."""
+        updated = 0
+        for photo in ProductPhoto.objects.exclude(variants={}).only('id', 'variants').iterator():
+            changed = False
+            for entry in photo.variants.values():
+                for extension in FORMATS:
+                    name = entry.get(extension)
+                    if name and not is_blob(name):
+                        blob = self._claim(name, missing)
+                        if blob is not None:
+                            entry[extension] = blob
+                            changed = True
+            if changed:
+                ProductPhoto.objects.filter(pk=photo.pk).update(variants=photo.variants)
+                updated += 1
+        return updated
+
+    def _report_plan(self, references):
+        names = {name for _, _, name in references}
+        digests = {}
+        total = missing = 0
+        for name in names:
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            digest = hashlib.sha256()
+            with default_storage.open(name, 'rb') as handle:
+                for chunk in handle.chunks():
+                    digest.update(chunk)
+            size = default_storage.size(name)
+            digests[digest.hexdigest()] = size
+            total += size
+        kept = sum(digests.values())
+        self.stdout.write(
+            f"{len(references)} field reference(s) to {len(names)} file(s), {missing} missing on disk; "
+            f"{len(digests)} distinct content(s). {total} bytes would become {kept} "
+            f"({total - kept} bytes reclaimed)."
+        )
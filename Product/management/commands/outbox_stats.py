@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from Product.outbox import outbox_stats, reset_outbox_stats
+
+
+class Command(BaseCommand):
+    help = "Show the outbox backlog, dispatch lag and the dispatcher's counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        for name, value in outbox_stats().items():
+            self.stdout.write(f"{name:<24}{value if value is not None else '-':>12}")
+
+        if options['reset']:
+            reset_outbox_stats()
+            self.stdout.write("Counters reset.")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from Product.images import PhotoProcessor, requeue
+from Product.management.worker import run_worker
+
+
+class Command(BaseCommand):
+    help = "Render resized WebP/JPEG variants of uploaded product photos (runs as a worker process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process everything pending and exit.")
+        parser.add_argument('--workers', type=int, default=4, help="Photos rendered in parallel.")
+        parser.add_argument('--batch-size', type=int, default=20, help="Photos claimed per round.")
+        parser.add_argument('--poll-interval', type=float, default=2, help="Idle sleep between checks.")
+        parser.add_argument('--requeue-stale', action='store_true', help="Requeue photos left 'processing' by a crashed worker.")
+        parser.add_argument('--retry-failed', action='store_true', help="Requeue photos that failed before.")
+
+    def handle(self, *args, **options):
+        statuses = []
+        if options['requeue_stale']:
+            statuses.append('processing')
+        if options['retry_failed']:
+            statuses.append('failed')
+        if statuses:
+            self.stdout.write(f"Requeued {requeue(statuses)} photo(s).")
+
+        processor = PhotoProcessor(workers=options['workers'], batch_size=options['batch_size'])
+        def process():
+            ready, failed = processor.run_batch()
+            if ready or failed:
+                self.stdout.write(f"Processed {ready} photo(s), {failed} failed or skipped.")
+            return ready or failed
+
+        try:
+            if options['once']:
+                while process():
+                    pass
+                return
+            self.stdout.write("🖼️ Photo processor started.")
+            run_worker(process, options['poll_interval'], "Photo processing")
+        finally:
+            processor.shutdown()
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from Product.similar import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar-products lists of every recommendable product. Approvals, "
+        "sales and closings keep them current in between (refresh_similar_products); run "
+        "this nightly or after bulk changes."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        products, rows = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {products} product(s), {rows} similar entries in {time.perf_counter() - start:.1f}s."
+        ))
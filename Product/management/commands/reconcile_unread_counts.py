@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from Product.management.worker import run_worker
+from Product.unread import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the cached unread-notification counters against the database and fix "
+        "the ones that drifted (runs as a worker process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run one pass and exit.")
+        parser.add_argument('--interval', type=float, default=600, help="Seconds between passes.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {reconcile()} unread counter(s)."))
+            return
+
+        self.stdout.write("🔔 Unread counter reconciliation started.")
+        def reconcile_pass():
+            fixed = reconcile()
+            if fixed:
+                self.stdout.write(f"Fixed {fixed} unread counter(s).")
+
+        run_worker(reconcile_pass, options['interval'], "Unread counter reconciliation")
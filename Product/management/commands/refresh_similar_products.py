@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from Product.management.worker import run_worker
+from Product.similar import REFRESH_BATCH_SIZE, refresh_queued
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar-products lists around products that were approved, sold, closed "
+        "or deleted, as queued by those changes (runs as a worker process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Apply what is queued now and exit.")
+        parser.add_argument('--batch-size', type=int, default=REFRESH_BATCH_SIZE, help="Queued changes per pass.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            applied = 0
+            while True:
+                done = refresh_queued(options['batch_size'])
+                if not done:
+                    break
+                applied += done
+            self.stdout.write(self.style.SUCCESS(f"Applied {applied} queued change(s)."))
+            return
+
+        def refresh():
+            applied = refresh_queued(options['batch_size'])
+            if applied:
+                self.stdout.write(f"Applied {applied} queued change(s).")
+            return applied
+
+        self.stdout.write("🔁 Similar-products refresher started.")
+        run_worker(refresh, options['interval'], "Similar-products refresh")
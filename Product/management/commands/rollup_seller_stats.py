@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from Product.management.worker import run_worker
+from Product.rollups import rebuild_seller_stats, update_seller_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep the per-seller daily stats behind the seller dashboard up to date, folding in "
+        "what changed since the last run (runs as a worker process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run one update and exit.")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute every day from scratch first.")
+        parser.add_argument('--interval', type=float, default=300, help="Seconds between updates.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            start = time.perf_counter()
+            rows = rebuild_seller_stats()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} seller-day row(s) in {time.perf_counter() - start:.1f}s."))
+            if options['once']:
+                return
+
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(f"Rewrote {update_seller_stats()} seller-day cell(s)."))
+            return
+
+        self.stdout.write("📊 Seller stats rollup started.")
+        def update():
+            rewritten = update_seller_stats()
+            if rewritten:
+                self.stdout.write(f"Rewrote {rewritten} seller-day cell(s).")
+
+        run_worker(update, options['interval'], "Seller stats rollup")
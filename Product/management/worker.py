@@ -0,0 +1,23 @@
+import logging
+import time
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(step, idle, name):
+    """
+    The loop of the commands that run as worker processes: call `step()` again at
+    once while it reports work done, otherwise sleep `idle` seconds (a number, or a
+    callable returning one). A failed pass is logged and retried after the sleep
+    instead of ending the process.
+    """
+    while True:
+        # A connection the database dropped while we slept is replaced, not reused
+        close_old_connections()
+        try:
+            if step():
+                continue
+        except Exception:
+            logger.exception("❌ %s pass failed, retrying", name)
+        time.sleep(idle() if callable(idle) else idle)
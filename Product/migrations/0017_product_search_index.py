@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    """Create the full-text table for the active backend and index the existing catalogue."""
+    from Product.search import normalize_arabic
+
+    vendor = schema_editor.connection.vendor
+    Product = apps.get_model('Product', 'Product')
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_search "
+            "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert = "INSERT INTO product_search(rowid, title, description) VALUES (%s, %s, %s)"
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS product_search ('
+            'product_id bigint PRIMARY KEY REFERENCES "Product_product"(id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS product_search_document_idx ON product_search USING GIN (document)"
+        )
+        insert = (
+            "INSERT INTO product_search(product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))"
+        )
+    else:
+        return
+
+    rows = [
+        (pk, normalize_arabic(title), normalize_arabic(description))
+        for pk, title, description in Product.objects.values_list('pk', 'title', 'description').iterator()
+    ]
+    if rows:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(insert, rows)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0016_product_closed_at_product_is_in_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:51
+
+from django.db import migrations, models
+from django.db.models import DecimalField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_effective_price(apps, schema_editor):
+    Product = apps.get_model('Product', 'Product')
+    Bid = apps.get_model('Product', 'Bid')
+    zero = Value(0, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+    Product.objects.exclude(sale_type='مزاد').update(effective_price=Coalesce('price', zero))
+
+    best_bid = Bid.objects.filter(product=OuterRef('pk'), status='accepted').values('product').annotate(
+        best=Max('amount')
+    ).values('best')
+    Product.objects.filter(sale_type='مزاد').update(
+        effective_price=Greatest(Coalesce('starting_price', zero), Coalesce(Subquery(best_bid), zero))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+        ('Product', '0017_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_approved', True), ('sold', False)), fields=['sale_type', 'category', 'effective_price'], name='product_listing_filter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_approved', True), ('sold', False)), fields=['effective_price'], name='product_listing_price_idx'),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+    ]
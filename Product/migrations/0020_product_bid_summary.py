@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:58
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_summary(apps, schema_editor):
+    Product = apps.get_model('Product', 'Product')
+    Bid = apps.get_model('Product', 'Bid')
+
+    accepted = Bid.objects.filter(product=OuterRef('pk'), status='accepted').order_by().values('product')
+    Product.objects.filter(sale_type='مزاد').update(
+        highest_bid=Subquery(accepted.annotate(best=Max('amount')).values('best')),
+        bid_count=Coalesce(Subquery(accepted.annotate(total=Count('id')).values('total')), Value(0)),
+        last_bid_at=Subquery(accepted.annotate(last=Max('created_at')).values('last')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0019_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='highest_bid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_bid_summary, migrations.RunPython.noop),
+    ]
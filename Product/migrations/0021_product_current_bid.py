@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:02
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_current_bid(apps, schema_editor):
+    Product = apps.get_model('Product', 'Product')
+    Bid = apps.get_model('Product', 'Bid')
+
+    standing = Bid.objects.filter(product=OuterRef('pk'), status__in=['pending', 'accepted']).order_by().values('product')
+    Product.objects.filter(sale_type='مزاد').update(
+        current_bid=Subquery(standing.annotate(best=Max('amount')).values('best')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0020_product_bid_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='current_bid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_current_bid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+        ('Product', '0021_product_current_bid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['status', 'created_at'], name='bid_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['product', 'amount'], name='bid_product_amount_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0022_bid_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productphoto',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='productphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
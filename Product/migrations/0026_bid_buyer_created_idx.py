@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+        ('Product', '0025_similarproduct'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['buyer', 'created_at'], name='bid_buyer_created_idx'),
+        ),
+    ]
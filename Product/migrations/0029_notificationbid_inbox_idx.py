@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0011_marketuser_registration_method'),
+        ('Product', '0028_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationbid',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='notifbid_inbox_idx'),
+        ),
+    ]
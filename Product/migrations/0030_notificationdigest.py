@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auth', '0012_marketuser_notification_delivery'),
+        ('Product', '0029_notificationbid_inbox_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('window_ends', models.DateTimeField()),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('summary', models.TextField(blank=True)),
+                ('recipient', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='notification_digests', to='Auth.marketuser')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window_ends'], name='notification_digest_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipient', 'topic'), name='notification_digest_uniq')],
+            },
+        ),
+    ]
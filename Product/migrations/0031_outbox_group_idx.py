@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0030_notificationdigest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('dead', False)), fields=['group', 'id'], name='outbox_group_idx'),
+        ),
+    ]
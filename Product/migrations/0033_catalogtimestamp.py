@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Product', '0032_similarrefresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTimestamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
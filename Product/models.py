@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from Auth.models import MarketUser
 from django.utils import timezone
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from datetime import timedelta
+from . import live
 
 # Create your models here.
 
@@ -11,6 +14,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.CharField(max_length=100,null=True)
     image = models.ImageField(upload_to='Category_pictures/',null = True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -57,47 +61,178 @@ class Product(models.Model):
     location = models.CharField(max_length=50, null=True)
     sold = models.BooleanField(default=False)
 
+    # Price used for filtering/sorting: `price` for simple products, the higher of
+    # `starting_price` and the best accepted bid for auctions
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Auction summary over accepted bids, maintained by apply_accepted_bid/refresh_bid_summary
+    highest_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    last_bid_at = models.DateTimeField(null=True, blank=True)
+    # Highest standing (pending or accepted) bid, shown to bidders; a new bid only has to beat highest_bid
+    current_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        # Partial on the public catalogue (is_approved AND NOT sold): Django renders boolean
+        # filters as bare column predicates, which can only use an index through its condition
+        indexes = [
+            models.Index(
+                fields=['sale_type', 'category', 'effective_price'],
+                condition=models.Q(is_approved=True, sold=False),
+                name='product_listing_filter_idx',
+            ),
+            models.Index(
+                fields=['effective_price'],
+                condition=models.Q(is_approved=True, sold=False),
+                name='product_listing_price_idx',
+            ),
+            # Changes since the seller-stats watermark (rollups.py)
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
+
+    BID_SUMMARY_FIELDS = ('highest_bid', 'bid_count', 'last_bid_at', 'current_bid')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell viewers when an auction is extended
+        instance._loaded_bid_end_time = instance.__dict__.get('bid_end_time')
+        # ...and the similar-products index when the product enters or leaves the catalogue
+        if {'is_approved', 'sold', 'closed'} <= instance.__dict__.keys():
+            instance._loaded_recommendable = instance.is_approved and not instance.sold and not instance.closed
+        return instance
+
+    def set_derived_fields(self):
+        """bid_end_time and effective_price; also used for rows written with bulk_create."""
+        if self.sale_type == 'مزاد' and self.duration:
+            if not self.bid_end_time:
+                self.bid_end_time = self.upload_date + timedelta(hours=self.duration)
+
+        if self.sale_type == 'مزاد':
+            self.effective_price = max(self.starting_price or 0, self.highest_bid or 0)
+        else:
+            self.effective_price = self.price or 0
+
     def save(self, *args, **kwargs):
         """Automatically sets bid_end_time and schedules closing."""
         is_new = self.pk is None  # Check if the product is new
 
-        if self.sale_type == 'مزاد' and self.duration:
-            if not self.bid_end_time:
-                self.bid_end_time = self.upload_date + timedelta(hours=self.duration)
+        self.set_derived_fields()
+
+        # The bid summary is only written by conditional updates; a full save of a
+        # stale instance must not roll it back under concurrent bidding
+        if not is_new and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BID_SUMMARY_FIELDS
+            ]
+            # ...nor the price derived from it: taken from the row's highest bid, not ours
+            if self.sale_type == 'مزاد':
+                money = models.DecimalField(max_digits=10, decimal_places=2)
+                self.effective_price = Greatest(
+                    Value(self.starting_price or 0, output_field=money), Coalesce('highest_bid', Value(0, output_field=money)),
+                )
 
         super().save(*args, **kwargs)  # Save the product first
+        if isinstance(self.effective_price, models.Expression):
+            self.refresh_from_db(fields=['effective_price'])
+
+        loaded_end = getattr(self, '_loaded_bid_end_time', None)
+        if not is_new and not self.closed and loaded_end and self.bid_end_time and self.bid_end_time > loaded_end:
+            live.publish_extended(self)
+        self._loaded_bid_end_time = self.bid_end_time
 
         # Automatically close bid if the time has passed
         if self.sale_type == 'مزاد' and self.bid_end_time and timezone.now() >= self.bid_end_time:
             self.close_bidding()
 
     def close_bidding(self):
-        from .utils import start_conversation,send_real_time_notification
+        from .utils import start_conversation,send_real_time_notification,send_real_time_notifications
         """Closes the bid, selects a winner, and schedules history move."""
         if self.closed:
             return  # Already closed
 
+        # Claim the auction atomically so two closers never pick/notify twice
+        closed_at = timezone.now()
+        if not Product.objects.filter(pk=self.pk, closed=False).update(closed=True, closed_at=closed_at, updated_at=closed_at):
+            self.closed = True
+            return
+
         self.closed = True
-        self.closed_at = timezone.now()
+        self.closed_at = closed_at
         self.save()
 
-        highest_bid = Bid.objects.filter(product=self, status="pending").order_by('-amount').first()
+        highest_bid = Bid.objects.filter(product=self, status="accepted").order_by('-amount').first()
 
         if highest_bid:
             highest_bid.winner = True
             highest_bid.save()
 
-            send_real_time_notification(self.seller, f"المزاد على {self.title} قد انتهى! الفائز هو {highest_bid.buyer.name}.")
-            send_real_time_notification(highest_bid.buyer, f"لقد فزت بالمزاد على {self.title} بمبلغ {highest_bid.amount} {self.currency}.")
+            send_real_time_notifications([
+                (self.seller, f"المزاد على {self.title} قد انتهى! الفائز هو {highest_bid.buyer.name}."),
+                (highest_bid.buyer, f"لقد فزت بالمزاد على {self.title} بمبلغ {highest_bid.amount} {self.currency}."),
+            ])
             
             start_conversation(self.seller, highest_bid.buyer, self)
         else:
             send_real_time_notification(self.seller, f"المزاد على {self.title} قد انتهى بدون عروض.")
 
+        live.publish_closed(self, highest_bid)
+
         # Schedule moving to history after 24 hours
         self.move_to_history_time = timezone.now() + timedelta(days=1)
         self.save()
 
+    def apply_accepted_bid(self, bid):
+        """
+        Accept `bid` and fold it into the auction summary in the same transaction.
+        Returns False (and changes nothing) if the bid was already accepted.
+        """
+        now = timezone.now()
+        amount = Value(bid.amount, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+        placed_at = Value(bid.created_at, output_field=models.DateTimeField())
+
+        with transaction.atomic():
+            # Lock the bid row so a repeated or concurrent accept is counted once
+            if Bid.objects.select_for_update().values_list('status', flat=True).get(pk=bid.pk) == "accepted":
+                return False
+            bid.status = "accepted"
+            bid.save(update_fields=['status', 'updated_at'])
+            Product.objects.filter(pk=self.pk).update(
+                highest_bid=Greatest(Coalesce('highest_bid', amount), amount),
+                bid_count=F('bid_count') + 1,
+                last_bid_at=Greatest(Coalesce('last_bid_at', placed_at), placed_at),
+                effective_price=Greatest('effective_price', amount),
+                updated_at=now,
+            )
+
+        self.refresh_from_db(fields=['highest_bid', 'bid_count', 'last_bid_at', 'effective_price', 'updated_at'])
+        live.publish_bid_accepted(self, bid)
+        return True
+
+    def refresh_bid_summary(self, publish=True):
+        """
+        Recompute the auction summary from the accepted bids (after a reject or delete).
+        Live viewers get a price delta unless the caller publishes its own.
+        """
+        accepted = Bid.objects.filter(product=OuterRef('pk'), status="accepted").order_by().values('product')
+        standing = Bid.objects.filter(product=OuterRef('pk'), status__in=["pending", "accepted"]).order_by().values('product')
+        best = Subquery(accepted.annotate(best=Max('amount')).values('best'))
+        zero = Value(0, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+        Product.objects.filter(pk=self.pk).update(
+            highest_bid=best,
+            current_bid=Subquery(standing.annotate(best=Max('amount')).values('best')),
+            bid_count=Coalesce(Subquery(accepted.annotate(total=Count('id')).values('total')), 0),
+            last_bid_at=Subquery(accepted.annotate(last=Max('created_at')).values('last')),
+            effective_price=Greatest(Coalesce('starting_price', zero), Coalesce(best, zero)),
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['highest_bid', 'bid_count', 'last_bid_at', 'current_bid', 'effective_price', 'updated_at'])
+        if publish:
+            live.publish_price(self)
+
     def check_and_move_to_history(self):
         """Moves the product to history after 24 hours of closing."""
         if self.closed and not self.is_in_history:
@@ -113,11 +248,63 @@ class Product(models.Model):
     
 
 class ProductPhoto(models.Model):
+    IMAGE_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='photos')
     photo = models.ImageField(upload_to='product_photos/')  
+    # Resized, EXIF-free renditions written by the `process_photos` worker:
+    # {"thumb"|"card"|"full": {"webp": name, "jpeg": name, "width": px, "height": px}}
+    variants = models.JSONField(default=dict, blank=True)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default='pending', db_index=True)
+
     def __str__(self):
         return f"Photo for {self.product.title}"
 
+class SimilarProduct(models.Model):
+    """One entry of a product's precomputed "similar items" list (see similar.py); rank 0 is the closest."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_products', db_index=False)
+    similar = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also the index the detail screen reads a list through, in rank order
+            models.UniqueConstraint(fields=['product', 'rank'], name='similar_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.similar_id} (#{self.rank})"
+
+class SimilarRefresh(models.Model):
+    """
+    A product that entered or left the catalogue, queued in the same transaction
+    for the refresh_similar_products worker to recompute the lists around it.
+    Plain ids: a deleted product's row outlives it.
+    """
+    product_id = models.BigIntegerField()
+    category_id = models.BigIntegerField(null=True)
+    affected = models.JSONField(default=list, blank=True)  # lists it appeared in, collected before a delete
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"refresh around {self.product_id}"
+
+class StoredFile(models.Model):
+    """A content-addressed media file and the number of file fields that point at it."""
+    name = models.CharField(max_length=255, unique=True)  # blobs/ab/cd/<sha256>.<ext>
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
 class Bid(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     buyer = models.ForeignKey(MarketUser, on_delete=models.CASCADE, related_name="bids")  # Updated to MarketUser
@@ -128,8 +315,19 @@ class Bid(models.Model):
         default="pending"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     winner = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Admin bid browser: pending-first, newest-first pages
+            models.Index(fields=['status', 'created_at'], name='bid_status_created_idx'),
+            # Highest bid per auction and the per-product bid history
+            models.Index(fields=['product', 'amount'], name='bid_product_amount_idx'),
+            # A buyer's own bids, newest first (History)
+            models.Index(fields=['buyer', 'created_at'], name='bid_buyer_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.buyer.name} bid {self.amount} on {self.product.title}"
 
@@ -139,11 +337,103 @@ class Listing(models.Model):
     purchase_date = models.DateTimeField(default=timezone.now) 
     quantity = models.PositiveIntegerField(default=1)
     is_payed = models.BooleanField(default=False)
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)  # when the seller confirmed payment
 
     def __str__(self):
         return f"{self.buyer.profile.username} purchased {self.product.title} on {self.purchase_date}"
     
 
+class SellerDailyStats(models.Model):
+    """
+    One seller's activity on one day in one currency, kept up to date by rollups.py
+    so the seller dashboard reads a few rows instead of scanning products and bids.
+    """
+    seller = models.ForeignKey(MarketUser, on_delete=models.CASCADE, related_name='daily_stats', db_index=False)
+    day = models.DateField()
+    currency = models.CharField(max_length=23, choices=Product.CURRENCY_CHOICES)
+    listed = models.PositiveIntegerField(default=0)           # products uploaded
+    sold = models.PositiveIntegerField(default=0)             # paid purchases and auctions closed with a winner
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    auctions_closed = models.PositiveIntegerField(default=0)
+    auction_bids = models.PositiveIntegerField(default=0)     # accepted bids on the auctions closed that day
+    conversations = models.PositiveIntegerField(default=0)    # opened by buyers before the sale
+    converted = models.PositiveIntegerField(default=0)        # ...whose buyer went on to buy the product
+
+    class Meta:
+        constraints = [
+            # Also the index a dashboard range is summed through
+            models.UniqueConstraint(fields=['seller', 'day', 'currency'], name='seller_daily_stats_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} on {self.day} ({self.currency})"
+
+class CatalogTimestamp(models.Model):
+    """A Last-Modified with no row of its own to carry it, like the last time a category was deleted."""
+    name = models.CharField(max_length=50, unique=True)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.changed_at}"
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup job has folded in its source tables."""
+    name = models.CharField(max_length=50, unique=True)
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.processed_until}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A channel-layer message saved in the same transaction as the change it
+    announces; the dispatch_outbox worker sends it once that has committed.
+    """
+    group = models.CharField(max_length=150)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)  # not before: retry backoff, or a dispatcher's lease
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    dead = models.BooleanField(default=False)  # gave up after outbox.MAX_ATTEMPTS
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at', 'id'], condition=models.Q(dead=False), name='outbox_pending_idx'),
+            models.Index(fields=['group', 'id'], condition=models.Q(dead=False), name='outbox_group_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.group}: {self.payload.get('type')} ({self.attempts} attempts)"
+
+
+class NotificationDigest(models.Model):
+    """
+    An open coalescing window of one recipient and topic: notifications on the
+    topic that arrive before `window_ends` wait here, counted, and go out as one
+    summary (Product/digests.py). The row is deleted when the window is flushed.
+    """
+    recipient = models.ForeignKey(MarketUser, on_delete=models.CASCADE, related_name='notification_digests', db_index=False)
+    topic = models.CharField(max_length=100)
+    window_ends = models.DateTimeField()
+    pending = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)  # sent for the pending ones, "{count}" replaced by their number
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'topic'], name='notification_digest_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['window_ends'], name='notification_digest_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} for {self.recipient_id}: {self.pending} pending"
+
+
 class Notificationbid(models.Model):
     recipient = models.ForeignKey(
         MarketUser,
@@ -161,29 +451,38 @@ class Notificationbid(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     timestamp = models.DateTimeField(default=timezone.now,null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # The notification inbox pages and the ranged mark-read UPDATE (Product/inbox.py)
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notifbid_inbox_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.recipient.profile.username}: {self.message}"
 
 @receiver(post_save, sender=Bid)
 def create_bid_notification(sender, instance, created, **kwargs):
+    # Written after commit so it never holds the auction row's lock
     if created:
-        product = instance.product
-        seller = product.seller  # The seller of the product
-        buyer = instance.buyer  # The buyer who placed the bid
-
-        # # Notify the Seller (New Bid Placed)
-        # seller_message = f"A new bid of {instance.amount} has been placed on your product '{product.title}'."
-        # Notificationbid.objects.create(
-        #     recipient=seller,
-        #     message=seller_message,
-        #     bid=instance
-        # )
-
-        # Notify the Buyer (Bid Under Review)
-        buyer_message = f"Your bid of {instance.amount} on '{product.title}' is under review."
-        Notificationbid.objects.create(
-            recipient=buyer,
-            message=buyer_message,
-            bid=instance
-        )
-        
\ No newline at end of file
+        transaction.on_commit(lambda: _notify_bid_under_review(instance), robust=True)
+
+
+def _notify_bid_under_review(instance):
+    product = instance.product
+    buyer = instance.buyer  # The buyer who placed the bid
+
+    # # Notify the Seller (New Bid Placed)
+    # seller_message = f"A new bid of {instance.amount} has been placed on your product '{product.title}'."
+    # Notificationbid.objects.create(
+    #     recipient=product.seller,
+    #     message=seller_message,
+    #     bid=instance
+    # )
+
+    # Notify the Buyer (Bid Under Review)
+    buyer_message = f"Your bid of {instance.amount} on '{product.title}' is under review."
+    Notificationbid.objects.create(
+        recipient=buyer,
+        message=buyer_message,
+        bid=instance
+    )
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+LEASE = timedelta(seconds=60)  # a claimed batch its dispatcher never finished is picked up again after this
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = 300  # seconds between retries, at most
+
+_builders = {}
+
+
+def publish(group, message):
+    """
+    Queue `message` for the channel-layer `group`. The row is part of the caller's
+    transaction: if that rolls back, nothing is sent.
+    """
+    OutboxEvent.objects.create(group=group, payload=message)
+
+
+def publish_many(events):
+    """Queue (group, message) pairs with one INSERT."""
+    OutboxEvent.objects.bulk_create(OutboxEvent(group=group, payload=message) for group, message in events)
+
+
+def register_builder(message_type, build):
+    """
+    Messages of `message_type` are completed when they are sent: `build()` returns
+    the fields to add. Copies queued for one group in the same batch go out once.
+    """
+    _builders[message_type] = build
+
+
+class OutboxDispatcher:
+    """
+    Drains the outbox into the channel layer. Each group's events are sent in
+    order, the groups of a batch concurrently; a failed event is retried with
+    backoff and holds back every event queued after it for the same group, in
+    this batch or any later one, until it is sent or given up.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def claim(self, now):
+        # Leased with a fresh token, so several dispatchers never send the same rows twice
+        token = uuid.uuid4().hex
+        # An event waits while an earlier one of its group is backing off or leased to
+        # another dispatcher; taking them in id order keeps a batch from skipping ahead of one.
+        unblocked = ~Exists(
+            OutboxEvent.objects.filter(group=OuterRef('group'), pk__lt=OuterRef('pk'), dead=False, available_at__gt=now)
+            .exclude(claimed_by=token)
+        )
+        ids = list(
+            OutboxEvent.objects.filter(unblocked, dead=False, available_at__lte=now)
+            .order_by('id').values_list('pk', flat=True)[:self.batch_size]
+        )
+        if not ids:
+            return []
+        OutboxEvent.objects.filter(unblocked, pk__in=ids, dead=False, available_at__lte=now).update(
+            available_at=now + LEASE, claimed_by=token,
+        )
+        return list(OutboxEvent.objects.filter(pk__in=ids, claimed_by=token).order_by('pk'))
+
+    def _plan(self, events):
+        """{group: [(event, payload)]}; payload None for a copy folded into an earlier one."""
+        plan = defaultdict(list)
+        built, seen = {}, set()
+        for event in events:
+            payload = event.payload
+            build = _builders.get(payload.get('type'))
+            if build is not None:
+                key = (event.group, payload['type'])
+                if key in seen:
+                    plan[event.group].append((event, None))
+                    continue
+                seen.add(key)
+                if payload['type'] not in built:
+                    try:
+                        built[payload['type']] = build()
+                    except Exception as e:
+                        built[payload['type']] = e
+                extra = built[payload['type']]
+                payload = extra if isinstance(extra, Exception) else {**payload, **extra}
+            plan[event.group].append((event, payload))
+        return plan
+
+    @staticmethod
+    async def _send(layer, plan):
+        async def send_group(group, items):
+            for index, (event, payload) in enumerate(items):
+                if payload is None:
+                    continue
+                try:
+                    if isinstance(payload, Exception):
+                        raise payload
+                    await layer.group_send(group, payload)
+                except Exception as e:
+                    return index, e
+            return len(items), None
+
+        return await asyncio.gather(*(send_group(group, items) for group, items in plan.items()))
+
+    def run_batch(self):
+        """Send one claimed batch. Returns (sent, failed)."""
+        now = timezone.now()
+        events = self.claim(now)
+        if not events:
+            return 0, 0
+
+        plan = self._plan(events)
+        try:
+            results = async_to_sync(self._send)(get_channel_layer(), plan)
+        except Exception as e:
+            results = [(0, e)] * len(plan)
+
+        sent, retry = [], []
+        for (group, items), (done, error) in zip(plan.items(), results):
+            sent.extend(event for event, _ in items[:done])
+            if error is None:
+                continue
+            head, *held = [event for event, _ in items[done:]]
+            head.attempts += 1
+            head.dead = head.attempts >= MAX_ATTEMPTS
+            head.available_at = now + timedelta(seconds=min(2 ** head.attempts, MAX_BACKOFF))
+            head.last_error = repr(error)[:1000]
+            logger.warning("⚠️ Outbox event %s to %s failed (attempt %s): %r", head.pk, group, head.attempts, error)
+            # Released with the failed one; claim() keeps them waiting until it has gone out
+            for event in held:
+                event.available_at = head.available_at
+            retry.extend([head, *held])
+
+        done_at = timezone.now()
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in sent]).delete()
+        for event in retry:
+            event.claimed_by = ''
+        OutboxEvent.objects.bulk_update(retry, ['attempts', 'dead', 'available_at', 'last_error', 'claimed_by'])
+
+        _record(sent, retry, done_at)
+        return len(sent), len(retry)
+
+
+def _incr(name, by):
+    key = f'outbox:stats:{name}'
+    try:
+        try:
+            cache.incr(key, by)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key, by)
+    except Exception:
+        logger.warning("⚠️ Could not record outbox %s", name)
+
+
+def _record(sent, retry, done_at):
+    if sent:
+        _incr('sent', len(sent))
+        lag = max((done_at - event.created_at).total_seconds() for event in sent)
+        try:
+            cache.set('outbox:stats:last_lag', round(lag, 3), None)
+        except Exception:
+            pass
+    if retry:
+        _incr('retried', len(retry))
+        dead = sum(1 for event in retry if event.dead)
+        if dead:
+            _incr('dead', dead)
+
+
+def outbox_stats(now=None):
+    """Backlog and lag of the outbox, plus the dispatcher's counters since they were last reset."""
+    now = now or timezone.now()
+    pending = OutboxEvent.objects.filter(dead=False)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    counters = cache.get_many([f'outbox:stats:{name}' for name in ('sent', 'retried', 'dead', 'last_lag')])
+    return {
+        'pending': pending.count(),
+        'dead': OutboxEvent.objects.filter(dead=True).count(),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0,
+        'last_batch_lag_seconds': counters.get('outbox:stats:last_lag'),
+        'sent_total': counters.get('outbox:stats:sent', 0),
+        'retried_total': counters.get('outbox:stats:retried', 0),
+        'dead_total': counters.get('outbox:stats:dead', 0),
+    }
+
+
+def reset_outbox_stats():
+    cache.delete_many([f'outbox:stats:{name}' for name in ('sent', 'retried', 'dead', 'last_lag')])
+
+
+def requeue_dead():
+    return OutboxEvent.objects.filter(dead=True).update(
+        dead=False, attempts=0, available_at=timezone.now(), claimed_by='', last_error='',
+    )
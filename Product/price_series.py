@@ -0,0 +1,113 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Func, IntegerField, Max, Min, Value
+from django.utils import timezone
+from .cache import CATALOG_CACHE_TIMEOUT, catalog_version, product_scope
+from .models import Bid
+
+logger = logging.getLogger(__name__)
+
+# Bucket widths a chart can ask for, in seconds
+RESOLUTIONS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400, '1w': 604800}
+AUTO_POINTS = 200  # `auto` picks the finest resolution that covers the auction in about this many buckets
+# A closed auction gets the long-lived entry only once this has passed, so bids still being
+# settled by the close (end_bid rejects the losing ones) never end up in it
+SETTLE_DELAY = timedelta(minutes=1)
+SETTLED_TIMEOUT = 24 * 3600
+
+
+class EpochSeconds(Func):
+    """Seconds since 1970-01-01 UTC of a datetime column."""
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Doubled twice: once for the template, once for the query's own parameter formatting
+        return super().as_sql(compiler, connection, template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='CAST(EXTRACT(EPOCH FROM %(expressions)s) AS BIGINT)', **extra_context)
+
+
+def auto_resolution(product, now=None):
+    """Name of the finest resolution that spans the auction in at most AUTO_POINTS buckets."""
+    end = product.closed_at or product.bid_end_time or now or timezone.now()
+    span = max((end - product.upload_date).total_seconds(), 0)
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= AUTO_POINTS:
+            return name
+    return list(RESOLUTIONS)[-1]
+
+
+def price_series(product_id, seconds):
+    """
+    OHLC points of the accepted bids, one per non-empty bucket of `seconds`, oldest
+    first. Buckets are aligned to the clock (an hourly bucket starts on the hour).
+    """
+    buckets = list(
+        Bid.objects.filter(product_id=product_id, status="accepted")
+        .annotate(bucket=EpochSeconds('created_at') / Value(seconds))
+        .order_by()
+        .values('bucket')
+        .annotate(low=Min('amount'), high=Max('amount'), bids=Count('pk'), first_id=Min('pk'), last_id=Max('pk'))
+        .order_by('bucket')
+    )
+    # Bids are numbered in arrival order: the bucket's first and last ids are its open and close
+    amounts = dict(
+        Bid.objects.filter(pk__in={row[key] for row in buckets for key in ('first_id', 'last_id')})
+        .values_list('pk', 'amount')
+    )
+    return [
+        {
+            'time': datetime.fromtimestamp(row['bucket'] * seconds, tz=dt_timezone.utc),
+            'open': amounts[row['first_id']],
+            'high': row['high'],
+            'low': row['low'],
+            'close': amounts[row['last_id']],
+            'bids': row['bids'],
+        }
+        for row in buckets
+    ]
+
+
+def _plain(points):
+    # Min/Max come back from some backends without the column's scale: print all four alike
+    cents = Decimal('0.01')
+    return [
+        {
+            **point,
+            'time': point['time'].isoformat(),
+            **{key: str(Decimal(point[key]).quantize(cents)) for key in ('open', 'high', 'low', 'close')},
+        }
+        for point in points
+    ]
+
+
+def cached_price_series(product, resolution, now=None):
+    """
+    The plain (JSON-ready) series of an auction, cached under the product's version
+    counter, which every bid change bumps (an admin can still reject or delete a
+    bid after the close). Settled auctions rarely change and are kept for a day.
+    """
+    now = now or timezone.now()
+    settled = product.closed and product.closed_at and product.closed_at <= now - SETTLE_DELAY
+    try:
+        version = catalog_version(product_scope(product.pk))
+        key = f'bid_series:{product.pk}:{resolution}:{version}'
+        timeout = SETTLED_TIMEOUT if settled else CATALOG_CACHE_TIMEOUT
+        points = cache.get(key)
+    except Exception:
+        logger.warning("⚠️ Cache unavailable, computing the price series of %s uncached", product.pk, exc_info=True)
+        return _plain(price_series(product.pk, RESOLUTIONS[resolution]))
+
+    if points is None:
+        points = _plain(price_series(product.pk, RESOLUTIONS[resolution]))
+        try:
+            cache.set(key, points, timeout)
+        except Exception:
+            logger.warning("⚠️ Could not cache the price series of %s", product.pk, exc_info=True)
+    return points
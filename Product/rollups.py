@@ -0,0 +1,230 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from Chats.models import Conversation
+from .models import Bid, Listing, Product, RollupWatermark, SellerDailyStats
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'seller_daily_stats'
+# Only changes older than this are folded in, so a transaction that commits a little
+# after its timestamps were taken still lands in the next run instead of being skipped
+ROLLUP_LAG = timedelta(minutes=1)
+CHUNK_SIZE = 500
+COUNTERS = ('listed', 'sold', 'revenue', 'auctions_closed', 'auction_bids', 'conversations', 'converted')
+
+# Dashboard ranges: days back from today (inclusive), None for everything
+DASHBOARD_RANGES = {'today': 1, '7d': 7, '30d': 30, '90d': 90, '365d': 365, 'all': None}
+DEFAULT_RANGES = ('7d', '30d', 'all')
+
+
+def _sources():
+    """
+    (queryset, seller, timestamp, currency, counters) for every table that feeds
+    the rollup; each row is counted on the day of its timestamp.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    bought = Q(Exists(Listing.objects.filter(product=OuterRef('product'), buyer=OuterRef('buyer'), is_payed=True))) | Q(
+        Exists(Bid.objects.filter(product=OuterRef('product'), buyer=OuterRef('buyer'), winner=True))
+    )
+    return [
+        (Product.objects.all(), 'seller_id', F('upload_date'), 'currency', {
+            'listed': Count('pk'),
+        }),
+        (Product.objects.filter(sale_type="مزاد", closed=True), 'seller_id', F('closed_at'), 'currency', {
+            'auctions_closed': Count('pk'),
+            'auction_bids': Sum('bid_count'),
+            'sold': Count('pk', filter=Q(highest_bid__isnull=False)),
+            'revenue': Sum('highest_bid'),
+        }),
+        (Listing.objects.filter(is_payed=True), 'product__seller_id', Coalesce('paid_at', 'purchase_date'), 'product__currency', {
+            'sold': Count('pk'),
+            'revenue': Sum(F('product__price') * F('quantity'), output_field=money),
+        }),
+        # Conversations the platform opens for an auction's winner come after the sale: not a lead
+        (Conversation.objects.filter(Q(product__closed_at__isnull=True) | Q(product__closed_at__gt=F('created_at'))),
+         'product__seller_id', F('created_at'), 'product__currency', {
+            'conversations': Count('pk'),
+            'converted': Count('pk', filter=bought),
+        }),
+    ]
+
+
+def _aggregate(start=None, end=None, sellers=None):
+    """{(seller_id, day, currency): counters} over [start, end), optionally for some sellers only."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for queryset, seller, timestamp, currency, counters in _sources():
+        queryset = queryset.annotate(stats_at=timestamp).filter(stats_at__isnull=False)
+        if start is not None:
+            queryset = queryset.filter(stats_at__gte=start, stats_at__lt=end)
+        if sellers is not None:
+            queryset = queryset.filter(**{f'{seller}__in': sellers})
+        rows = queryset.order_by().values(
+            stats_seller=F(seller), stats_day=TruncDate('stats_at'), stats_currency=F(currency),
+        ).annotate(**counters)
+        for row in rows:
+            cell = totals[row.pop('stats_seller'), row.pop('stats_day'), row.pop('stats_currency')]
+            for name, value in row.items():
+                cell[name] += value or 0
+    return totals
+
+
+def _stats_rows(totals):
+    return [
+        SellerDailyStats(seller_id=seller_id, day=day, currency=currency, **counters)
+        for (seller_id, day, currency), counters in totals.items()
+    ]
+
+
+def _chunks(values):
+    values = sorted(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def product_cells(product_ids):
+    """The (seller_id, day) cells the given products are counted in."""
+    cells = set()
+    for chunk in _chunks(product_ids):
+        for seller_id, uploaded, closed in Product.objects.filter(pk__in=chunk).values_list(
+            'seller_id', TruncDate('upload_date'), TruncDate('closed_at'),
+        ):
+            cells.add((seller_id, uploaded))
+            if closed:
+                cells.add((seller_id, closed))
+        cells.update(
+            Listing.objects.filter(product_id__in=chunk, is_payed=True)
+            .values_list('product__seller_id', TruncDate(Coalesce('paid_at', 'purchase_date')))
+        )
+        cells.update(
+            Conversation.objects.filter(product_id__in=chunk)
+            .values_list('product__seller_id', TruncDate('created_at'))
+        )
+    return cells
+
+
+def _touched_cells(since, until):
+    product_ids = set(Product.objects.filter(updated_at__gt=since, updated_at__lte=until).values_list('pk', flat=True))
+    product_ids.update(Listing.objects.filter(paid_at__gt=since, paid_at__lte=until).values_list('product_id', flat=True))
+    product_ids.update(Conversation.objects.filter(created_at__gt=since, created_at__lte=until).values_list('product_id', flat=True))
+    return product_cells(product_ids)
+
+
+def _rewrite_cells(cells):
+    """Recompute the given (seller_id, day) cells from the source tables, one day at a time."""
+    by_day = defaultdict(set)
+    for seller_id, day in cells:
+        by_day[day].add(seller_id)
+
+    for day, sellers in by_day.items():
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        for chunk in _chunks(sellers):
+            totals = _aggregate(start, start + timedelta(days=1), chunk)
+            SellerDailyStats.objects.filter(seller_id__in=chunk, day=day).delete()
+            SellerDailyStats.objects.bulk_create(_stats_rows(totals))
+    return len(cells)
+
+
+def _locked_watermark():
+    return RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+
+
+def rebuild_seller_stats(now=None):
+    """Recompute the whole rollup and reset the watermark; returns the rows written."""
+    until = (now or timezone.now()) - ROLLUP_LAG
+    with transaction.atomic():
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'processed_until': until})
+        _locked_watermark()
+        SellerDailyStats.objects.all().delete()
+        rows = SellerDailyStats.objects.bulk_create(_stats_rows(_aggregate()), batch_size=1000)
+    return len(rows)
+
+
+def update_seller_stats(now=None):
+    """
+    Fold in what changed since the watermark: every cell a touched product counts
+    in is recomputed, so a late change (a payment confirmed days after the purchase)
+    fixes the day it belongs to. The first run builds the rollup from scratch.
+    Returns the number of cells rewritten.
+    """
+    until = (now or timezone.now()) - ROLLUP_LAG
+    with transaction.atomic():
+        watermark = _locked_watermark()
+        if watermark is None:
+            return rebuild_seller_stats(now)
+        if until <= watermark.processed_until:
+            return 0
+        rewritten = _rewrite_cells(_touched_cells(watermark.processed_until, until))
+        watermark.processed_until = until
+        watermark.save(update_fields=['processed_until'])
+    return rewritten
+
+
+def refresh_cells_after_commit(cells):
+    """For deletions, which leave no timestamp behind for the watermark to find."""
+    def refresh():
+        try:
+            with transaction.atomic():
+                if _locked_watermark() is not None:
+                    _rewrite_cells(cells)
+        except Exception:
+            logger.exception("❌ Could not refresh seller stats for %s cell(s)", len(cells))
+    if cells:
+        transaction.on_commit(refresh, robust=True)
+
+
+def _summary(stats_rows):
+    summary = dict.fromkeys(COUNTERS, 0)
+    summary['revenue'] = {}
+    for row in stats_rows:
+        summary['revenue'][row['currency']] = str((row['total_revenue'] or Decimal(0)).quantize(Decimal('0.01')))
+        for name in COUNTERS:
+            if name != 'revenue':
+                summary[name] += row[f'total_{name}'] or 0
+    summary['average_bids_per_auction'] = (
+        round(summary.pop('auction_bids') / summary['auctions_closed'], 2) if summary['auctions_closed'] else 0
+    )
+    summary['conversion_rate'] = (
+        round(summary['converted'] / summary['conversations'], 4) if summary['conversations'] else 0
+    )
+    return summary
+
+
+def seller_dashboard(seller, ranges):
+    """
+    Totals for each requested range: {name: (first_day or None, last_day)}. One
+    query per range, summed per currency through the (seller, day, currency) index.
+    """
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).values_list('processed_until', flat=True).first()
+    sums = {f'total_{name}': Sum(name) for name in COUNTERS}
+
+    results = {}
+    for name, (first_day, last_day) in ranges.items():
+        stats = SellerDailyStats.objects.filter(seller=seller, day__lte=last_day)
+        if first_day is not None:
+            stats = stats.filter(day__gte=first_day)
+        results[name] = {
+            'from': first_day,
+            'to': last_day,
+            **_summary(stats.order_by().values('currency').annotate(**sums)),
+        }
+
+    return {
+        'updated_until': watermark,
+        # Current state rather than activity over a period: counted live
+        'active_auctions': Product.objects.filter(
+            seller=seller, sale_type="مزاد", is_approved=True, closed=False,
+        ).count(),
+        'ranges': results,
+    }
+
+
+def named_range(name, today=None):
+    today = today or timezone.localdate()
+    days = DASHBOARD_RANGES[name]
+    return (None if days is None else today - timedelta(days=days - 1), today)
@@ -0,0 +1,153 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from .models import Product
+
+SEARCH_TABLE = 'product_search'
+
+# Tashkeel (fathatan .. sukun), superscript alef and tatweel are dropped entirely
+_ARABIC_STRIP = re.compile('[\u064B-\u0652\u0670\u0640]')
+_ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و', 'ئ': 'ي', 'ى': 'ي',
+    'ة': 'ه',
+})
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_arabic(text):
+    """Fold alef/hamza variants, taa marbuta and alef maqsura, strip diacritics and tatweel."""
+    if not text:
+        return ''
+    return _ARABIC_STRIP.sub('', text).translate(_ARABIC_FOLD).lower()
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize_arabic(text))
+
+
+def search_backend():
+    """The full-text engine for the current database, or None to fall back to icontains."""
+    if connection.vendor == 'sqlite':
+        return 'fts5'
+    if connection.vendor == 'postgresql':
+        return 'tsvector'
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Indexing
+# ---------------------------------------------------------------------------
+
+def _write_rows(cursor, backend, rows):
+    """rows: iterable of (product_id, title, description), already normalized."""
+    rows = list(rows)
+    if not rows:
+        return
+    ids = [(row[0],) for row in rows]
+    if backend == 'fts5':
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", ids)
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (%s, %s, %s)", rows
+        )
+    elif backend == 'tsvector':
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE}(product_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+            f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+
+def index_products(products):
+    """Insert or refresh the search rows of the given products."""
+    backend = search_backend()
+    if not backend:
+        return
+    rows = (
+        (product.pk, normalize_arabic(product.title), normalize_arabic(product.description))
+        for product in products
+    )
+    with connection.cursor() as cursor:
+        _write_rows(cursor, backend, rows)
+
+
+def unindex_product(product_id):
+    backend = search_backend()
+    if not backend:
+        return
+    key = 'rowid' if backend == 'fts5' else 'product_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = %s", [product_id])
+
+
+def rebuild_index(batch_size=2000):
+    """Re-index the whole catalogue. Returns the number of indexed products."""
+    backend = search_backend()
+    if not backend:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'title', 'description')[:batch_size]
+        )
+        if not batch:
+            return total
+        with connection.cursor() as cursor:
+            _write_rows(cursor, backend, (
+                (pk, normalize_arabic(title), normalize_arabic(description))
+                for pk, title, description in batch
+            ))
+        total += len(batch)
+        last_id = batch[-1][0]
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+def search_products(products, query, ranked=True):
+    """
+    Restrict `products` to those matching `query` on title or description.
+    Every token is prefix-matched so results follow the user as they type.
+    With `ranked`, the queryset is ordered best match first (title hits weigh more).
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        # Nothing searchable (e.g. only punctuation) matches nothing, not everything
+        return products.none() if query and query.strip() else products
+
+    backend = search_backend()
+    product_table = connection.ops.quote_name(Product._meta.db_table)
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        products = products.extra(
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE}.rowid = {product_table}.id", f"{SEARCH_TABLE} MATCH %s"],
+            params=[match],
+            select={'search_rank': f"bm25({SEARCH_TABLE}, 10.0, 1.0)"},
+        )
+    elif backend == 'tsvector':
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        products = products.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f"{SEARCH_TABLE}.product_id = {product_table}.id",
+                f"{SEARCH_TABLE}.document @@ to_tsquery('simple', %s)",
+            ],
+            params=[tsquery],
+            select={'search_rank': f"-ts_rank({SEARCH_TABLE}.document, to_tsquery('simple', %s))"},
+            select_params=[tsquery],
+        )
+    else:
+        return products.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    if ranked:
+        products = products.order_by('search_rank', '-id')
+    return products
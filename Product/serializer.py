@@ -2,10 +2,40 @@ from django.utils import timezone
 from rest_framework import serializers
 from .models import Product, ProductPhoto, Bid,Category
 from rest_framework.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from .images import DEFAULT_VARIANT
 class ProductPhotoSerializer(serializers.ModelSerializer):
+    """
+    `photo` is the JPEG rendition at the size asked for through the serializer
+    context (`photo_size`: thumb, card or full; card by default), `photo_webp`
+    the matching WebP. Photos the worker hasn't processed yet fall back to the upload.
+    """
+    photo_webp = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductPhoto
-        fields = ['id', 'photo']
+        fields = ['id', 'photo', 'photo_webp']
+
+    def _variant(self, instance):
+        if instance.image_status != 'ready':
+            return None
+        return instance.variants.get(self.context.get('photo_size', DEFAULT_VARIANT))
+
+    def _url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_photo_webp(self, instance):
+        variant = self._variant(instance)
+        return self._url(variant['webp']) if variant else None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        variant = self._variant(instance)
+        if variant:
+            data['photo'] = self._url(variant['jpeg'])
+        return data
 
 
 
@@ -20,9 +50,12 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'price', 'starting_price', 'buy_now_price',
             'duration', 'bid_end_time', 'closed', 'currency', 'condition', 'location',
             'is_approved', 'sale_type', 'seller', 'seller_name', 'photos', 'category',
-            'is_in_history', 'closed_at'
+            'is_in_history', 'closed_at', 'effective_price', 'highest_bid', 'bid_count', 'last_bid_at'
+        ]
+        read_only_fields = [
+            'id', 'is_approved', 'seller', 'bid_end_time', 'closed', 'effective_price',
+            'highest_bid', 'bid_count', 'last_bid_at',
         ]
-        read_only_fields = ['id', 'is_approved', 'seller', 'bid_end_time', 'closed']
         extra_kwargs = {
             'price': {
                 'error_messages': {'invalid': '⚠️ السعر يجب أن يكون رقمًا صحيحًا أو عشريًا.'}
@@ -145,7 +178,7 @@ class ProductSerializer(serializers.ModelSerializer):
 class BidSerializer(serializers.ModelSerializer):
     buyer_name = serializers.CharField(source='buyer.name', read_only=True)
     product_name = serializers.CharField(source='product.title', read_only=True)
-    seller_name = serializers.CharField(source='product.seller.user.username', read_only=True)
+    seller_name = serializers.CharField(source='product.seller.name', read_only=True)
     
     class Meta:
         model = Bid
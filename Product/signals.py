@@ -0,0 +1,143 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import Signal, receiver
+from Auth.models import MarketUser
+from Chats.models import ChatNotification, Message as ChatMessage, Notification
+from MarketPlace.storage import release_after_commit, track_references
+from Tickets.models import Attachment, Message as TicketMessage
+from .models import Product, ProductPhoto, Bid, Category, SimilarProduct, Notificationbid
+from .images import FORMATS
+from .search import index_products, unindex_product
+from .cache import categories_deleted, invalidate_product, invalidate_categories, invalidate_new_products
+from . import rollups, similar, unread
+
+# Sent with `products` after a bulk import inserted them (bulk_create sends no post_save)
+products_imported = Signal()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index in step with the product's title and description."""
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    index_products([instance])
+
+
+@receiver(products_imported)
+def index_imported_products(sender, products, **kwargs):
+    index_products(products)
+    invalidate_new_products({product.category_id for product in products})
+
+
+@receiver(post_save, sender=Product)
+def refresh_similar_products(sender, instance, created, **kwargs):
+    """Queue a similar-products update when a product is approved, sold or closed."""
+    listed = similar.is_recommendable(instance)
+    was_listed = False if created else getattr(instance, '_loaded_recommendable', None)
+    if listed != was_listed:
+        similar.queue_refresh(instance.pk, instance.category_id)
+    instance._loaded_recommendable = listed
+
+
+@receiver(pre_delete, sender=Product)
+def refresh_similar_products_on_delete(sender, instance, **kwargs):
+    # The rows naming this product cascade away with it, so collect their owners first
+    affected = set(SimilarProduct.objects.filter(similar_id=instance.pk).values_list('product_id', flat=True))
+    if affected:
+        similar.queue_refresh(instance.pk, instance.category_id, affected)
+
+
+@receiver(pre_delete, sender=Product)
+def refresh_seller_stats_on_delete(sender, instance, **kwargs):
+    # A deleted product leaves nothing newer than the watermark behind, so its days are redone here
+    rollups.refresh_cells_after_commit(rollups.product_cells([instance.pk]))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+# Catalogue response cache: bump the version counters the cached responses depend on
+
+def _deleted_with_product(origin):
+    """post_delete of a row that goes because its product is being deleted (a cascade)."""
+    return isinstance(origin, Product) or (isinstance(origin, QuerySet) and origin.model is Product)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_product(instance.pk, instance.category_id)
+
+
+@receiver(post_save, sender=ProductPhoto)
+@receiver(post_delete, sender=ProductPhoto)
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+def invalidate_related_product_cache(sender, instance, signal, origin=None, **kwargs):
+    # Last-Modified is the product's updated_at, which the statements that change what
+    # the product shows (the bid engine, the bid summary, the photo worker) set themselves
+    if _deleted_with_product(origin):
+        return  # the product's own post_delete invalidates it
+    if sender._meta.get_field('product').is_cached(instance):
+        category_id = instance.product.category_id
+    else:
+        category_id = Product.objects.filter(pk=instance.product_id).values_list('category_id', flat=True).first()
+    invalidate_product(instance.product_id, category_id)
+
+
+@receiver(post_delete, sender=Bid)
+def refresh_bid_summary_after_delete(sender, instance, origin=None, **kwargs):
+    """Deleting a standing bid can lower the product's highest bid, count and best offer."""
+    if instance.status not in ("pending", "accepted") or _deleted_with_product(origin):
+        return
+    product = Product.objects.filter(pk=instance.product_id).first()
+    if product:
+        product.refresh_bid_summary()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, signal, **kwargs):
+    invalidate_categories(instance.pk)
+
+    if signal is post_delete:
+        categories_deleted()
+
+
+# Unread badges: rows saved one by one move the counters here; bulk inserts and
+# ranged mark-read UPDATEs send no signals and call Product.unread themselves
+
+@receiver(post_save, sender=Notificationbid)
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=ChatNotification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    unread.saved(instance, created)
+
+
+@receiver(post_delete, sender=Notificationbid)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=ChatNotification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    unread.deleted(instance)
+
+
+# Media: every file field holds one reference to its content-addressed blob (see
+# MarketPlace/storage.py); replacing or deleting the file gives it back
+
+track_references(ProductPhoto, 'photo')
+track_references(Category, 'image')
+track_references(MarketUser, 'profile_picture')
+track_references(ChatMessage, 'picture')
+track_references(TicketMessage, 'image')
+track_references(Attachment, 'image')
+
+
+@receiver(post_delete, sender=ProductPhoto)
+def release_photo_variants(sender, instance, **kwargs):
+    """The renditions in `variants` are references of their own, next to the `photo` field's."""
+    storage = ProductPhoto._meta.get_field('photo').storage
+    for entry in instance.variants.values():
+        for extension in FORMATS:
+            release_after_commit(storage, entry.get(extension))
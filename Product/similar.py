@@ -0,0 +1,211 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from django.db import connection, transaction
+from django.db.models import Q
+from .cache import SIMILAR_SCOPE, bump_catalog_versions, similar_scope
+from .models import Product, SimilarProduct, SimilarRefresh
+from .search import normalize_arabic, tokenize
+
+SIMILAR_COUNT = 12         # entries kept per product
+PRICE_NEIGHBOURS = 40      # candidates taken on each side of a product in price order
+MAX_TOKEN_POSTINGS = 100   # title words shared by more products than this say little; skipped
+WEIGHTS = {'title': 0.5, 'price': 0.3, 'location': 0.2}
+WRITE_BATCH_SIZE = 5000
+REFRESH_BATCH_SIZE = 500  # queued changes applied per worker pass
+
+# Products that can be recommended (and get a list of their own)
+RECOMMENDABLE = Q(is_approved=True, sold=False, closed=False)
+
+
+def is_recommendable(product):
+    return product.is_approved and not product.sold and not product.closed
+
+
+class CategoryIndex:
+    """
+    The recommendable products of one category, held in memory. Candidates for
+    a product are its neighbours by price plus the products sharing a title word,
+    so scoring stays linear in the category size instead of quadratic. Products
+    are addressed by their position in price order; `ids` maps back to pks.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (row[1] or 0, row[0]))
+        self.ids = [pk for pk, _, _, _ in rows]
+        self.position = {pk: index for index, pk in enumerate(self.ids)}
+        self.prices = [float(price or 0) for _, price, _, _ in rows]
+
+        places = {}
+        self.locations = [
+            places.setdefault(normalize_arabic(location).strip(), len(places)) if location else -1
+            for _, _, location, _ in rows
+        ]
+        words = {}
+        self.tokens = [
+            frozenset(words.setdefault(token, len(words)) for token in tokenize(title))
+            for _, _, _, title in rows
+        ]
+        postings = defaultdict(list)
+        for index, tokens in enumerate(self.tokens):
+            for token in tokens:
+                postings[token].append(index)
+        self.postings = {token: indexes for token, indexes in postings.items() if len(indexes) <= MAX_TOKEN_POSTINGS}
+
+    @classmethod
+    def load(cls, category_id):
+        rows = (
+            Product.objects.filter(RECOMMENDABLE, category_id=category_id)
+            .values_list('pk', 'effective_price', 'location', 'title')
+        )
+        return cls(rows)
+
+    def __contains__(self, product_id):
+        return product_id in self.position
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, index):
+        found = set(range(max(0, index - PRICE_NEIGHBOURS), min(len(self.ids), index + PRICE_NEIGHBOURS + 1)))
+        for token in self.tokens[index]:
+            found.update(self.postings.get(token, ()))
+        found.discard(index)
+        return found
+
+    def candidates(self, product_id):
+        return {self.ids[index] for index in self._candidates(self.position[product_id])}
+
+    def _top(self, index, count):
+        # Inlined score: WEIGHTS of title-word Jaccard, price ratio and same location
+        title_weight, price_weight, location_weight = WEIGHTS['title'], WEIGHTS['price'], WEIGHTS['location']
+        tokens, prices, locations, ids = self.tokens, self.prices, self.locations, self.ids
+        own_tokens, own_price, own_location = tokens[index], prices[index], locations[index]
+        own_size = len(own_tokens)
+
+        scored = []
+        for other in self._candidates(index):
+            shared = len(own_tokens & tokens[other])
+            union = own_size + len(tokens[other]) - shared
+            score = title_weight * shared / union if union else 0.0
+            price = prices[other]
+            if own_price > 0 and price > 0:
+                score += price_weight * (price / own_price if price < own_price else own_price / price)
+            if own_location >= 0 and locations[other] == own_location:
+                score += location_weight
+            if score > 0:
+                scored.append((score, -ids[other]))
+        return [(-negative_id, score) for score, negative_id in heapq.nlargest(count, scored)]
+
+    def top(self, product_id, count=SIMILAR_COUNT):
+        """[(similar_id, score)] best first; ties go to the older product."""
+        return self._top(self.position[product_id], count)
+
+    def rows(self, product_ids):
+        """(product_id, similar_id, rank, score) tuples for the products that are in this index."""
+        for product_id in product_ids:
+            index = self.position.get(product_id)
+            if index is not None:
+                for rank, (similar_id, score) in enumerate(self._top(index, SIMILAR_COUNT)):
+                    yield product_id, similar_id, rank, round(score, 4)
+
+
+def _insert(rows):
+    """Raw executemany: at rebuild sizes the ORM's per-instance overhead dominates the write."""
+    quote = connection.ops.quote_name
+    table = quote(SimilarProduct._meta.db_table)
+    columns = ', '.join(quote(column) for column in ('product_id', 'similar_id', 'rank', 'score'))
+    written = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, WRITE_BATCH_SIZE))
+            if not batch:
+                return written
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s)", batch
+            )
+            written += len(batch)
+
+
+def _category_ids():
+    return Product.objects.filter(RECOMMENDABLE).values_list('category_id', flat=True).distinct()
+
+
+def rebuild_all():
+    """Recompute every list in one transaction; returns (products indexed, rows written)."""
+    products = written = 0
+    with transaction.atomic():
+        # Whatever was queued so far is covered by the rebuild
+        SimilarRefresh.objects.all().delete()
+        SimilarProduct.objects.all().delete()
+        for category_id in list(_category_ids()):
+            index = CategoryIndex.load(category_id)
+            products += len(index)
+            written += _insert(index.rows(index.ids))
+        transaction.on_commit(lambda: bump_catalog_versions(SIMILAR_SCOPE))
+    return products, written
+
+
+def _rewrite(index, product_ids):
+    product_ids = set(product_ids)
+    SimilarProduct.objects.filter(product_id__in=product_ids).delete()
+    return _insert(index.rows(product_ids))
+
+
+def queue_refresh(product_id, category_id, affected=()):
+    """
+    Queue the lists around a product that entered or left the catalogue for the
+    refresh_similar_products worker. The row is part of the caller's transaction,
+    so the request (or the auction closer) never waits on the category scoring.
+    """
+    SimilarRefresh.objects.create(product_id=product_id, category_id=category_id, affected=sorted(affected))
+
+
+def _refresh_category(category_id, queued):
+    """
+    Apply the queued changes of one category against a single load of its index.
+    Each product is handled by where it stands now, not by what was queued: one
+    listed and unlisted again before the worker got to it is simply unlisted.
+    Returns the ids of the products whose lists changed.
+    """
+    index = CategoryIndex.load(category_id)
+    rewrite, dropped = set(), set()
+    for item in queued:
+        if item.product_id in index:
+            rewrite |= {item.product_id} | index.candidates(item.product_id)
+            continue
+        affected = set(item.affected)
+        affected.update(SimilarProduct.objects.filter(similar_id=item.product_id).values_list('product_id', flat=True))
+        SimilarProduct.objects.filter(Q(product_id=item.product_id) | Q(similar_id=item.product_id)).delete()
+        rewrite |= affected - {item.product_id}
+        dropped.add(item.product_id)
+    if rewrite:
+        _rewrite(index, rewrite)
+    return rewrite | dropped
+
+
+def refresh_queued(batch_size=REFRESH_BATCH_SIZE):
+    """Apply up to `batch_size` queued changes, category by category. Returns the number applied."""
+    with transaction.atomic():
+        queued = list(SimilarRefresh.objects.select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        if not queued:
+            return 0
+        by_category = defaultdict(list)
+        for item in queued:
+            by_category[item.category_id].append(item)
+        changed = set()
+        for category_id, items in by_category.items():
+            changed |= _refresh_category(category_id, items)
+        SimilarRefresh.objects.filter(pk__in=[item.pk for item in queued]).delete()
+        # Only the rewritten lists' cached responses go; the catalogue listings stay cached
+        scopes = [similar_scope(product_id) for product_id in changed]
+        transaction.on_commit(lambda: bump_catalog_versions(*scopes), robust=True)
+    return len(queued)
+
+
+def similar_products(product_id, limit=SIMILAR_COUNT):
+    """The stored list of a product, still-recommendable entries only, best first."""
+    return (
+        Product.objects.filter(RECOMMENDABLE, similar_of__product_id=product_id)
+        .order_by('similar_of__rank')[:limit]
+    )
@@ -1,3 +1,687 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from Auth.models import MarketUser
+from Chats.models import Conversation, Message, Notification
+from . import digests, images, unread
+from .bidding import BidRejected, place_bid
+from .cache import cache_stats, categories_last_modified, product_last_modified
+from .inbox import mark_read
+from .models import (
+    Bid, Category, NotificationDigest, Notificationbid, OutboxEvent, Product, ProductPhoto, StoredFile,
+)
+from .outbox import OutboxDispatcher, publish
+from .search import normalize_arabic, search_products, tokenize
 
-# Create your tests here.
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class ListingQueryPlanTests(TestCase):
+    """The price filters and sorts of the listing endpoints must be answered from an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        sellers = [
+            MarketUser.objects.create(profile=User.objects.create_user(username=f'seller{i}'), name=f'seller{i}')
+            for i in range(20)
+        ]
+        categories = [Category.objects.create(name=f'category {i}') for i in range(5)]
+        Product.objects.bulk_create([
+            Product(
+                seller=sellers[i % 20], title=f'item {i}', description='d', category=categories[i % 5],
+                is_approved=i % 7 != 0,
+                sale_type='عادي' if i % 2 else 'مزاد',
+                price=Decimal(i) if i % 2 else None,
+                starting_price=None if i % 2 else Decimal(i),
+                effective_price=Decimal(i),
+            )
+            for i in range(1, 500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+
+    def listing_plan(self, url):
+        """EXPLAIN the page query the view actually ran."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        page_query = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "Product_product"."id"'))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + page_query)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertIndexedPlan(self, plan, index):
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('SCAN Product_product', plan.replace(f'USING INDEX {index}', ''))
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_price_sort_uses_price_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan assertions are written for SQLite')
+        plan = self.listing_plan('/Products/list/?price_order=Min&min_price=10&max_price=50&pagination=cursor')
+        self.assertIndexedPlan(plan, 'product_listing_price_idx')
+
+    def test_filtered_price_sort_uses_filter_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan assertions are written for SQLite')
+        category = Category.objects.first()
+        plan = self.listing_plan(
+            f'/Products/list/?sale_type=عادي&category={category.pk}&price_order=Max&min_price=10&pagination=cursor'
+        )
+        self.assertIndexedPlan(plan, 'product_listing_filter_idx')
+
+
+class FlakyLayer:
+    """Records what is sent; the first send of each message listed in `fail` raises."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    async def group_send(self, group, message):
+        if message['n'] in self.fail:
+            self.fail.discard(message['n'])
+            raise ConnectionError('channel layer unavailable')
+        self.sent.append((group, message['n']))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class OutboxOrderingTests(TestCase):
+    def test_failed_event_holds_back_its_group_in_later_batches(self):
+        for group, n in [('a', 1), ('a', 2), ('a', 3), ('b', 1), ('a', 4)]:
+            publish(group, {'type': 'test', 'n': f'{group}{n}'})
+        layer = FlakyLayer(fail={'a1'})
+        dispatcher = OutboxDispatcher(batch_size=2)
+
+        with mock.patch('Product.outbox.get_channel_layer', return_value=layer):
+            self.assertEqual(dispatcher.run_batch(), (0, 2))  # a1 failed, a2 waits behind it
+            while dispatcher.run_batch() != (0, 0):
+                pass
+            # Nothing of group a got past the backing-off a1
+            self.assertEqual(layer.sent, [('b', 'b1')])
+            self.assertEqual(OutboxEvent.objects.count(), 4)
+
+            OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+            while dispatcher.run_batch() != (0, 0):
+                pass
+
+        self.assertEqual([n for group, n in layer.sent if group == 'a'], ['a1', 'a2', 'a3', 'a4'])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class MediaReferenceTests(TestCase):
+    """Rows give their blob references back when they are deleted or their file is replaced."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def refcount(self, name):
+        return StoredFile.objects.filter(name=name).values_list('refcount', flat=True).first()
+
+    def test_deleting_a_row_releases_its_file(self):
+        first = Category.objects.create(name='first', image=ContentFile(b'same bytes', name='a.jpg'))
+        second = Category.objects.create(name='second', image=ContentFile(b'same bytes', name='b.jpg'))
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(self.refcount(name), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.get(pk=second.pk).delete()
+        self.assertIsNone(self.refcount(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replacing_a_file_releases_the_old_one(self):
+        user = MarketUser.objects.create(
+            profile=User.objects.create_user(username='pictured'), name='pictured',
+            profile_picture=ContentFile(b'old picture', name='old.jpg'),
+        )
+        old = user.profile_picture.name
+
+        user = MarketUser.objects.get(pk=user.pk)
+        user.profile_picture = ContentFile(b'new picture', name='new.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertIsNone(self.refcount(old))
+        self.assertEqual(self.refcount(user.profile_picture.name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()  # nothing replaced
+        self.assertEqual(self.refcount(user.profile_picture.name), 1)
+
+
+    def pending_photo(self):
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username='photographer'), name='photographer')
+        product = Product.objects.create(seller=seller, title='photographed', description='d')
+        upload = io.BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(upload, format='PNG')
+        return ProductPhoto.objects.create(product=product, photo=ContentFile(upload.getvalue(), name='p.png'))
+
+    def test_a_photo_deleted_while_rendering_leaves_no_files_behind(self):
+        photo = self.pending_photo()
+        render = images.render_variants
+
+        def render_then_delete(claimed):
+            variants = render(claimed)
+            ProductPhoto.objects.get(pk=claimed.pk).delete()
+            return variants
+
+        with mock.patch.object(images, 'render_variants', render_then_delete), \
+                self.captureOnCommitCallbacks(execute=True), self.assertLogs(images.logger, 'ERROR'):
+            self.assertFalse(images.process_photo(photo.pk))
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(images.process_photo(photo.pk))  # already gone
+
+    def test_a_failed_render_releases_the_variants_it_stored(self):
+        photo = self.pending_photo()
+        with mock.patch.object(images, '_encode', side_effect=[b'thumb webp', b'thumb jpeg', OSError('disk full')]), \
+                self.assertLogs(images.logger, 'ERROR'):
+            self.assertFalse(images.process_photo(photo.pk))
+        photo.refresh_from_db()
+        self.assertEqual(photo.image_status, 'failed')
+        self.assertEqual(list(StoredFile.objects.values_list('name', flat=True)), [photo.photo.name])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class BidEngineTests(TestCase):
+    """A bid has to beat the highest accepted bid; pending offers only move current_bid."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller, *cls.buyers = [
+            MarketUser.objects.create(profile=User.objects.create_user(username=f'bidder{i}'), name=f'bidder{i}')
+            for i in range(4)
+        ]
+        cls.auction = Product.objects.create(
+            seller=seller, title='auction', description='d', sale_type='مزاد', starting_price=Decimal('100.00'),
+            is_approved=True, bid_end_time=timezone.now() + timedelta(hours=1),
+        )
+
+    def auction_state(self):
+        self.auction.refresh_from_db()
+        return self.auction.highest_bid, self.auction.current_bid, self.auction.bid_count
+
+    def test_a_bid_must_beat_the_starting_price(self):
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.buyers[0], '100')
+        place_bid(self.auction.pk, self.buyers[0], '100.01')
+        self.assertEqual(self.auction_state(), (None, Decimal('100.01'), 0))
+
+    def test_an_unreviewed_inflated_bid_does_not_block_bidding(self):
+        inflated = place_bid(self.auction.pk, self.buyers[0], '99999999')
+        place_bid(self.auction.pk, self.buyers[1], '150')
+        self.assertEqual(self.auction_state(), (None, Decimal('99999999.00'), 0))
+
+        inflated.status = "rejected"
+        inflated.save()
+        self.auction.refresh_bid_summary(publish=False)
+        self.assertEqual(self.auction_state(), (None, Decimal('150.00'), 0))
+
+    def test_outbid_by_an_accept_between_reading_and_bidding(self):
+        # Both bidders saw 100; the other one's 120 is accepted before this 110 arrives
+        self.auction.apply_accepted_bid(place_bid(self.auction.pk, self.buyers[0], '120'))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.buyers[1], '110')
+        self.assertEqual(Bid.objects.filter(product=self.auction).count(), 1)
+        self.assertEqual(self.auction_state(), (Decimal('120.00'), Decimal('120.00'), 1))
+
+    def test_equal_bids(self):
+        first = place_bid(self.auction.pk, self.buyers[0], '120')
+        second = place_bid(self.auction.pk, self.buyers[1], '120')  # equal offers may both wait for review
+        self.assertTrue(self.auction.apply_accepted_bid(first))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.buyers[2], '120')  # but not equal the accepted one
+
+        self.assertTrue(self.auction.apply_accepted_bid(second))
+        self.assertFalse(self.auction.apply_accepted_bid(second))  # counted once
+        self.assertEqual(self.auction_state(), (Decimal('120.00'), Decimal('120.00'), 2))
+        place_bid(self.auction.pk, self.buyers[2], '120.01')
+
+    def test_deleting_a_bid_refreshes_the_summary_but_a_product_cascade_does_not(self):
+        self.auction.apply_accepted_bid(place_bid(self.auction.pk, self.buyers[0], '120'))
+        top = place_bid(self.auction.pk, self.buyers[1], '130')
+        self.auction.apply_accepted_bid(top)
+        top.delete()
+        self.assertEqual(self.auction_state(), (Decimal('120.00'), Decimal('120.00'), 1))
+
+        place_bid(self.auction.pk, self.buyers[2], '140')
+        with CaptureQueriesContext(connection) as ctx:
+            self.auction.delete()
+        self.assertFalse(any('UPDATE "Product_product"' in query['sql'] for query in ctx.captured_queries))
+        self.assertFalse(Bid.objects.exists())
+
+    def test_sellers_and_closed_auctions_are_refused(self):
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.auction.seller, '500')
+        Product.objects.filter(pk=self.auction.pk).update(bid_end_time=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(BidRejected):
+            place_bid(self.auction.pk, self.buyers[0], '500')
+        self.assertFalse(Bid.objects.exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class CatalogCacheTests(TestCase):
+    """Cached catalogue responses are served until a write bumps one of their scopes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = MarketUser.objects.create(profile=User.objects.create_user(username='cached'), name='cached')
+        cls.books, cls.tools = Category.objects.create(name='books'), Category.objects.create(name='tools')
+        cls.novel = Product.objects.create(
+            seller=cls.seller, title='novel', description='d', category=cls.books, is_approved=True, price=Decimal('5'),
+        )
+        cls.hammer = Product.objects.create(
+            seller=cls.seller, title='hammer', description='d', category=cls.tools, is_approved=True, price=Decimal('9'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, params=None):
+        return [product['title'] for product in self.client.get('/Products/list/', params or {}).json()['results']]
+
+    def edit(self, product, **changes):
+        for field, value in changes.items():
+            setattr(product, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+    def test_a_repeated_listing_is_served_from_the_cache(self):
+        self.titles()
+        with self.assertNumQueries(0):
+            self.titles()
+        self.assertEqual(cache_stats()['list_products'], {'hits': 1, 'misses': 1})
+
+    def test_an_edit_invalidates_the_listings_it_appears_in_only(self):
+        self.titles()
+        self.titles({'category': self.tools.pk})
+        self.edit(self.novel, title='novella')
+
+        self.assertCountEqual(self.titles(), ['novella', 'hammer'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles({'category': self.tools.pk}), ['hammer'])
+
+    def test_unlisting_and_bids_reach_the_product_page(self):
+        url = f'/Products/Get_Product_Id/{self.hammer.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.edit(self.hammer, is_approved=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.titles(), ['novel'])
+
+        auction = Product.objects.create(
+            seller=self.seller, title='auction', description='d', sale_type='مزاد', starting_price=Decimal('10'),
+            is_approved=True, bid_end_time=timezone.now() + timedelta(hours=1),
+        )
+        url = f'/Products/Get_Product_Id/{auction.pk}/'
+        self.client.get(url)
+        buyer = MarketUser.objects.create(profile=User.objects.create_user(username='cache buyer'), name='b')
+        with self.captureOnCommitCallbacks(execute=True):
+            auction.apply_accepted_bid(place_bid(auction.pk, buyer, '12'))
+        self.assertEqual(self.client.get(url).json()['bid_count'], 1)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class CategoriesLastModifiedTests(TestCase):
+    def test_a_deletion_moves_last_modified_past_a_cache_flush(self):
+        Category.objects.create(name='kept')
+        doomed = Category.objects.create(name='doomed')
+        before = categories_last_modified(None)
+
+        doomed.delete()
+        cache.clear()  # evicted, or another process's cache
+        self.assertGreater(categories_last_modified(None), before)
+
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class ConditionalGetTests(TestCase):
+    """Product and category responses carry validators, and revalidate to 304 until something changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username='validated'), name='validated')
+        cls.category = Category.objects.create(name='lamps')
+        cls.product = Product.objects.create(
+            seller=seller, title='lamp', description='d', category=cls.category, is_approved=True, price=Decimal('5'),
+        )
+        cls.url = f'/Products/Get_Product_Id/{cls.product.pk}/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_a_product_revalidates_until_it_changes(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.product.title = 'brass lamp'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'brass lamp')
+
+    def test_a_renamed_category_changes_its_products_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.category.name = 'lights'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertNotEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_an_unlisted_product_has_no_validators(self):
+        Product.objects.filter(pk=self.product.pk).update(is_approved=False)
+        self.assertIsNone(product_last_modified(None, self.product.pk))
+
+    def test_the_category_list_revalidates_until_a_category_is_added(self):
+        url = '/Products/Get_All_Categories/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='rugs')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class ProductSearchTests(TestCase):
+    """Searches are Arabic-normalized, prefix-matched and never widened by an unsearchable query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username='searcher'), name='searcher')
+        cls.lamp = Product.objects.create(seller=seller, title='مِصْبَاح إضاءة', description='قديم', is_approved=True)
+        cls.phone = Product.objects.create(seller=seller, title='هاتف', description='مكتبة إلكترونية', is_approved=True)
+        cls.chair = Product.objects.create(seller=seller, title='Wooden chair', description='oak', is_approved=True)
+
+    def search(self, query, ranked=True):
+        return list(search_products(Product.objects.all(), query, ranked=ranked).values_list('pk', flat=True))
+
+    def test_normalization_folds_hamza_taa_marbuta_and_diacritics(self):
+        self.assertEqual(normalize_arabic('إضاءَةٌ'), 'اضاءه')
+        self.assertEqual(normalize_arabic('مـــكتبة'), 'مكتبه')
+        self.assertEqual(tokenize('Wooden, CHAIR!'), ['wooden', 'chair'])
+
+    def test_queries_match_normalized_prefixes(self):
+        self.assertEqual(self.search('اضاءه'), [self.lamp.pk])
+        self.assertEqual(self.search('مصب'), [self.lamp.pk])
+        self.assertEqual(self.search('مكتبه'), [self.phone.pk])
+        self.assertEqual(self.search('wood cha'), [self.chair.pk])
+        self.assertEqual(self.search('wood lamp'), [])  # every token has to match
+
+    def test_title_hits_rank_above_description_hits(self):
+        seller = self.lamp.seller
+        described = Product.objects.create(seller=seller, title='طاولة', description='هاتف', is_approved=True)
+        self.assertEqual(self.search('هاتف'), [self.phone.pk, described.pk])
+
+    def test_a_query_without_searchable_tokens_matches_nothing(self):
+        self.assertEqual(self.search('!!! ؟'), [])
+        self.assertEqual(len(self.search('')), 3)  # no query at all leaves the list alone
+
+        response = self.client.get('/Products/list/', {'title': '...'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_edits_and_deletions_reach_the_index(self):
+        self.chair.title = 'Metal stool'
+        self.chair.save()
+        self.assertEqual(self.search('chair'), [])
+        self.assertEqual(self.search('stool'), [self.chair.pk])
+        self.chair.delete()
+        self.assertEqual(self.search('stool'), [])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor walks a listing once, in order, even across rows sharing a sort key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = MarketUser.objects.create(profile=User.objects.create_user(username='pager'), name='pager')
+        listed = timezone.now() - timedelta(days=1)
+        Product.objects.bulk_create([
+            Product(
+                seller=seller, title=f'item {i}', description='d', is_approved=True, price=Decimal(10 + i % 3),
+                upload_date=listed + timedelta(minutes=i // 4),  # four products per upload time
+            )
+            for i in range(23)
+        ])
+
+    def walk(self, params):
+        seen, url, pages = [], '/Products/list/', 0
+        response = self.client.get(url, {'pagination': 'cursor', 'page_size': 5, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('count', body)
+            seen += [product['id'] for product in body['results']]
+            pages += 1
+            if not body['next']:
+                return seen, pages
+            response = self.client.get(body['next'])
+
+    def test_cursor_pages_follow_the_listing_order(self):
+        expected = list(Product.objects.order_by('-upload_date', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk({}), (expected, 5))
+
+        by_price = list(Product.objects.order_by('effective_price', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'price_order': 'Min'})[0], by_price)
+
+    def test_page_numbers_stay_the_default(self):
+        body = self.client.get('/Products/list/').json()
+        self.assertEqual(body['count'], 23)
+        self.assertEqual(len(body['results']), 10)
+
+    def test_a_malformed_cursor_is_not_found(self):
+        for cursor in ('not base64!', 'WzFd', 'WyJ4IiwgInkiXQ=='):
+            self.assertEqual(self.client.get('/Products/list/', {'cursor': cursor}).status_code, 404)
+
+
+def _chat_with(buyer, seller, product):
+    conversation = Conversation.objects.create(seller=seller, buyer=buyer, product=product)
+    return Message.objects.create(conversation=conversation, sender=seller, recipient=buyer, content='hello')
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class NotificationInboxTests(TestCase):
+    """Bid and chat notifications page as one newest-first list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, seller = [
+            MarketUser.objects.create(profile=User.objects.create_user(username=name), name=name, is_verified=True)
+            for name in ('reader', 'writer')
+        ]
+        message = _chat_with(cls.user, seller, Product.objects.create(seller=seller, title='p', description='d'))
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(7):
+            # Both tables share each timestamp, so pages have to break ties between them
+            created_at = start + timedelta(minutes=i)
+            bid = Notificationbid.objects.create(recipient=cls.user, message=f'bid {i}', is_read=i % 2 == 0)
+            chat = Notification.objects.create(user=cls.user, message=message, is_read=i % 3 == 0)
+            Notificationbid.objects.filter(pk=bid.pk).update(created_at=created_at)
+            Notification.objects.filter(pk=chat.pk).update(created_at=created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user.profile)
+
+    def expected(self, unread_only=False):
+        rows = [
+            (row.created_at, kind, row.id, row.is_read)
+            for kind, model in (('bids', Notificationbid), ('chat', Notification))
+            for row in model.objects.all()
+        ]
+        # Newest first, then kind ascending, then newest id: the inbox ordering
+        rows.sort(key=lambda row: row[2], reverse=True)
+        rows.sort(key=lambda row: row[1])
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [(kind, row_id) for _, kind, row_id, is_read in rows if not (unread_only and is_read)]
+
+    def walk(self, params=None):
+        seen = []
+        response = self.client.get('/chat/notifications/inbox/', {'page_size': 3, **(params or {})})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [(row['kind'], row['id']) for row in response.json()['results']]
+            if not response.json()['next']:
+                return seen
+            response = self.client.get(response.json()['next'])
+
+    def test_pages_merge_both_tables_in_order(self):
+        self.assertEqual(self.walk(), self.expected())
+        self.assertEqual(self.walk({'unread': 'true'}), self.expected(unread_only=True))
+
+    def test_kinds_filter_and_unknown_kinds(self):
+        self.assertEqual(self.walk({'kinds': 'chat'}), [row for row in self.expected() if row[0] == 'chat'])
+        response = self.client.get('/chat/notifications/inbox/', {'kinds': 'chat,mail'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_mark_read_is_ranged_by_creation_time(self):
+        middle = Notificationbid.objects.order_by('created_at')[3].created_at
+        with self.captureOnCommitCallbacks(execute=True):
+            marked = mark_read(self.user, up_to=middle)
+        self.assertEqual(marked, {'bids': 2, 'chat': 2})
+        self.assertFalse(Notificationbid.objects.filter(is_read=False, created_at__lte=middle).exists())
+        self.assertTrue(Notificationbid.objects.filter(is_read=False, created_at__gt=middle).exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class UnreadCounterTests(TestCase):
+    """The cached badges follow inserts, mark-reads and deletes once they commit, and heal from the table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MarketUser.objects.create(profile=User.objects.create_user(username='badged'), name='badged')
+
+    def setUp(self):
+        cache.clear()
+
+    def notify(self, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Notificationbid.objects.create(recipient=self.user, message='m') for _ in range(count)]
+
+    def test_a_missing_counter_is_seeded_from_the_table(self):
+        Notificationbid.objects.create(recipient=self.user, message='before any badge was read')
+        counts = unread.unread_counts(self.user.id)
+        self.assertEqual((counts['bids'], counts['total']), (1, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_counts(self.user.id)['bids'], 1)
+
+    def test_counters_follow_inserts_mark_read_and_deletes(self):
+        unread.unread_counts(self.user.id)  # seed
+        first, *_ = self.notify(3)
+        self.assertEqual(unread.unread_counts(self.user.id)['bids'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(unread.unread_counts(self.user.id)['bids'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_read(self.user), {'bids': 2, 'chat': 0})
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_counts(self.user.id)['bids'], 0)
+
+    def test_a_rolled_back_insert_does_not_move_the_badge(self):
+        unread.unread_counts(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Notificationbid.objects.create(recipient=self.user, message='m')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(unread.unread_counts(self.user.id)['bids'], 0)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        unread.unread_counts(self.user.id)
+        self.notify(2)
+        Notificationbid.objects.filter(recipient=self.user).update(is_read=True)  # no signals
+        self.assertEqual(unread.unread_counts(self.user.id)['bids'], 2)
+
+        self.assertEqual(unread.reconcile(['bids']), 1)
+        self.assertEqual(unread.unread_counts(self.user.id)['bids'], 0)
+        self.assertEqual(unread.reconcile(['bids']), 0)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class NotificationDigestTests(TestCase):
+    """Bursts on a topic are folded into one summary per window for users who chose digests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MarketUser.objects.create(
+            profile=User.objects.create_user(username='digested'), name='digested', notification_delivery='digest',
+        )
+
+    def setUp(self):
+        self.start = timezone.now()
+
+    def sent(self):
+        return list(Notificationbid.objects.filter(recipient=self.user).order_by('pk').values_list('message', flat=True))
+
+    def notify(self, seconds, *messages, user=None):
+        digests.notify([(user or self.user, 'auction 1', message, '{count} new bids') for message in messages],
+                       now=self.start + timedelta(seconds=seconds))
+
+    def test_a_window_rolls_over_into_the_next_notification(self):
+        self.notify(0, 'first')
+        self.notify(10, 'second', 'third')
+        self.notify(50, 'fourth')
+        self.assertEqual(self.sent(), ['first'])
+        self.assertEqual(NotificationDigest.objects.get().pending, 3)
+
+        # The window ended without a flush: its summary goes out ahead of the notification that opens the next one
+        self.notify(61, 'fifth')
+        self.assertEqual(self.sent(), ['first', '3 new bids', 'fifth'])
+        self.assertEqual(NotificationDigest.objects.get().pending, 0)
+
+    def test_flush_sends_only_ended_windows(self):
+        self.notify(0, 'first', 'second')
+        self.assertEqual(digests.flush_due(self.start + timedelta(seconds=59)), 0)
+        self.assertEqual(digests.flush_due(self.start + digests.DIGEST_WINDOW), 1)
+        self.assertEqual(self.sent(), ['first', '1 new bids'])
+        self.assertFalse(NotificationDigest.objects.exists())
+
+        self.notify(70, 'third')  # a fresh window starts with a notification sent at once
+        self.assertEqual(self.sent(), ['first', '1 new bids', 'third'])
+
+    def test_a_full_window_is_sent_without_waiting(self):
+        for i in range(digests.DIGEST_MAX + 3):
+            self.notify(i, f'bid {i}')
+        self.assertEqual(self.sent(), ['bid 0', f'{digests.DIGEST_MAX} new bids'])
+        self.assertEqual(NotificationDigest.objects.get().pending, 2)
+
+    def test_immediate_delivery_skips_the_digest(self):
+        other = MarketUser.objects.create(profile=User.objects.create_user(username='eager'), name='eager')
+        self.assertEqual(other.notification_delivery, 'immediate')
+        self.notify(0, 'first', 'second', user=other)
+        self.assertEqual(Notificationbid.objects.filter(recipient=other).count(), 2)
+        self.assertFalse(NotificationDigest.objects.exists())
@@ -0,0 +1,163 @@
+import logging
+from collections import Counter
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from Auth.models import MarketUser
+from Chats.models import ChatNotification, Notification
+from .models import Notificationbid
+
+logger = logging.getLogger(__name__)
+
+# Badge name -> (model, recipient field, what "unread" means for it)
+KINDS = {
+    'bids': (Notificationbid, 'recipient_id', {'is_read': False}),
+    'chat': (Notification, 'user_id', {'is_read': False}),
+    'messages': (ChatNotification, 'recipient_id', {'seen': False}),
+}
+# A counter nobody touched for this long is dropped and counted again on the next read
+COUNTER_TIMEOUT = 7 * 24 * 3600
+CHUNK_SIZE = 1000
+
+
+def _key(kind, user_id):
+    return f'unread:{kind}:{user_id}'
+
+
+def kind_of(model):
+    return next(kind for kind, (kind_model, _, _) in KINDS.items() if kind_model is model)
+
+
+def _db_counts(kind, user_ids):
+    model, recipient, unread = KINDS[kind]
+    counts = dict.fromkeys(user_ids, 0)
+    counts.update(
+        model.objects.filter(**{f'{recipient}__in': user_ids}, **unread)
+        .order_by().values_list(recipient).annotate(unread=Count('pk'))
+    )
+    return counts
+
+
+def unread_counts(user_id):
+    """
+    {kind: unread} for one user: one cache round trip. A missing counter is seeded
+    at 0 before the table is counted and the count is then added to it, so writers
+    that commit meanwhile increment the seeded key instead of missing it and being
+    overwritten by a stale count. (One committing between the seed and the COUNT is
+    counted twice until reconcile() runs; that window is a single query.)
+    """
+    keys = {kind: _key(kind, user_id) for kind in KINDS}
+    try:
+        cached = cache.get_many(keys.values())
+    except Exception:
+        logger.warning("⚠️ Cache unavailable, counting unread notifications of %s from the database", user_id)
+        cached = None
+
+    counts = {}
+    for kind, key in keys.items():
+        if cached is not None and key in cached:
+            counts[kind] = max(cached[key], 0)
+            continue
+        counts[kind] = _seed(kind, key, user_id) if cached is not None else _db_counts(kind, [user_id])[user_id]
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def _seed(kind, key, user_id):
+    try:
+        seeding = cache.add(key, 0, COUNTER_TIMEOUT)
+    except Exception:
+        seeding = False
+    count = _db_counts(kind, [user_id])[user_id]
+    if not seeding:
+        # Another reader is seeding it: answer from the table, leave the key to them
+        return count
+    try:
+        return max(cache.incr(key, count), 0)
+    except Exception:
+        return count
+
+
+def _apply(kind, deltas):
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        key = _key(kind, user_id)
+        try:
+            # A counter that is not there yet is left to the next read, which seeds it from the table
+            value = cache.incr(key, delta)
+        except ValueError:
+            continue
+        except Exception:
+            logger.warning("⚠️ Could not update the unread %s counter of %s", kind, user_id)
+            continue
+        if value < 0:
+            cache.delete(key)
+
+
+def changed(kind, deltas):
+    """
+    Move the `kind` counters by {user_id: delta} once the current transaction commits,
+    so a rolled-back insert or mark-read never shows up in a badge.
+    """
+    deltas = {user_id: delta for user_id, delta in Counter(deltas).items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply(kind, deltas), robust=True)
+
+
+def created(kind, recipient_ids):
+    changed(kind, Counter(recipient_ids))
+
+
+def marked_read(kind, user_id, rows):
+    changed(kind, {user_id: -rows})
+
+
+def forget(kind, user_ids):
+    """Drop counters whose change could not be followed; they are counted again when read."""
+    keys = [_key(kind, user_id) for user_id in set(user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
+
+
+def saved(instance, created):
+    """post_save of a tracked model; later saves may flip the unread flag, so recount."""
+    kind = kind_of(type(instance))
+    _, recipient, unread = KINDS[kind]
+    if not created:
+        forget(kind, [getattr(instance, recipient)])
+    elif all(getattr(instance, field) == value for field, value in unread.items()):
+        changed(kind, {getattr(instance, recipient): 1})
+
+
+def deleted(instance):
+    kind = kind_of(type(instance))
+    _, recipient, unread = KINDS[kind]
+    if all(getattr(instance, field) == value for field, value in unread.items()):
+        changed(kind, {getattr(instance, recipient): -1})
+
+
+def reconcile(kinds=None):
+    """
+    Compare every cached counter with the table and fix the ones that drifted (a
+    crashed worker between commit and increment, rows changed by hand). Missing
+    counters are left missing: the next read counts them. A change that races the
+    run can leave a counter one off, which the next run fixes. Returns the number fixed.
+    """
+    fixed = 0
+    user_ids = list(MarketUser.objects.order_by('pk').values_list('pk', flat=True))
+    for kind in kinds or KINDS:
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            chunk = user_ids[start:start + CHUNK_SIZE]
+            cached = cache.get_many([_key(kind, user_id) for user_id in chunk])
+            if not cached:
+                continue
+            actual = _db_counts(kind, chunk)
+            stale = {
+                _key(kind, user_id): actual[user_id]
+                for user_id in chunk
+                if _key(kind, user_id) in cached and cached[_key(kind, user_id)] != actual[user_id]
+            }
+            if stale:
+                cache.set_many(stale, COUNTER_TIMEOUT)
+                fixed += len(stale)
+    return fixed
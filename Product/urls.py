@@ -4,11 +4,17 @@ from . import views
 urlpatterns = [
     path('create_product/simple/', views.create_simple_product, name='create_product_simple'),
     path('create_product/bid/', views.create_bid_product, name='create_product_bid'),
+    path('import_products/', views.import_products, name='import_products'),
     path('<int:product_id>/delete/', views.delete_product, name='delete_product'),
     # path('<int:product_id>/update/', views.update_product, name='update_product'),
     path('seller/products/', views.get_seller_products, name='get_seller_products'),
+    path('seller/dashboard/', views.seller_dashboard, name='seller_dashboard'),
     path('list/', views.list_products, name='list_products'),
+    path('facets/', views.catalog_facets, name='catalog_facets'),
+    path('<int:product_id>/similar/', views.similar_products, name='similar_products'),
     path('<int:product_id>/bids/', views.get_product_bids, name='get_product_bids'),
+    path('<int:product_id>/bids/history/', views.product_bid_history, name='product_bid_history'),
+    path('<int:product_id>/bids/series/', views.auction_price_series, name='auction_price_series'),
     path('<int:product_id>/bid/', views.place_bid, name='place_bid'),
     path('<int:product_id>/<int:bid_id>/end_bid/', views.end_bid, name='end_bid'),
     path('<int:product_id>/Purchase/',views.purchase_product),
@@ -20,6 +26,7 @@ urlpatterns = [
     path('Get_All_Categories/',views.get_all_categories),
     path('Get_All_Products/',views.admin_list_products),
     path('History/',views.user_products_and_bids),
+    path('History/bids/', views.user_bids_history, name='user_bids_history'),
     path('Delete_category/<int:pk>/',views.delete_category),
     path('close_bid/<int:product_id>/',views.close_bid),
     path('Get_Auctions/',views.list_auction_products),
@@ -1,22 +1,44 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.db import transaction
+from Auth.models import MarketUser
 from .models import Notificationbid
 from Chats.models import Conversation
+from . import outbox, unread
+
+
+def admin_users():
+    return MarketUser.objects.filter(profile__groups__name="Admin")
+
+
 def send_real_time_notification(user, message):
-    notification = Notificationbid.objects.create(
-        recipient=user,
-        message=message,
-        bid=None
-    )
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user.id}",
-        {
-            "type": "send_notification",
-            "message": message,
-            "created_at": notification.created_at.strftime("%Y-%m-%d %H:%M:%S")  # ✅ Format timestamp
-        }
-    )
+    send_real_time_notifications([(user, message)])
+
+
+def send_real_time_notifications(notifications):
+    """
+    Save many (user, message) notifications with one bulk INSERT and queue their
+    WebSocket pushes in the outbox, in the caller's transaction; the dispatch_outbox
+    worker sends them once it has committed.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return
+    with transaction.atomic():
+        created = Notificationbid.objects.bulk_create(
+            Notificationbid(recipient=user, message=message, bid=None) for user, message in notifications
+        )
+        outbox.publish_many(
+            (
+                f"user_{notification.recipient_id}",
+                {
+                    "type": "send_notification",
+                    "message": notification.message,
+                    "created_at": notification.created_at.strftime("%Y-%m-%d %H:%M:%S")  # ✅ Format timestamp
+                },
+            )
+            for notification in created
+        )
+        # bulk_create sends no post_save
+        unread.created('bids', [notification.recipient_id for notification in created])
 
 
 def start_conversation(seller,buyer,product):
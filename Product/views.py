@@ -1,6 +1,7 @@
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -8,16 +9,28 @@ from rest_framework.pagination import PageNumberPagination
 from .models import Product, ProductPhoto, Bid,Notificationbid,Listing
 from .serializer import ProductSerializer, ProductPhotoSerializer, BidSerializer,CategorySerializer
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from decorators import verified_user_required ,not_banned_user_required
-from .utils import send_real_time_notification,start_conversation
-from datetime import timedelta  
+from .utils import admin_users, send_real_time_notification, send_real_time_notifications, start_conversation
+from .listing import with_listing_relations, serialize_listing
+from .search import search_products
+from .facets import catalog_facets as build_catalog_facets
+from . import bidding, importer, live, price_series, rollups, similar
+from .images import save_product_photos
+from .cache import (
+    cached_catalog_response, invalidate_product, ALL_SCOPE, CATEGORIES_SCOPE, SIMILAR_SCOPE, category_scope,
+    product_scope, similar_scope,
+    product_etag, product_last_modified, categories_etag, categories_last_modified,
+)
+from django.views.decorators.http import condition
+from datetime import date, timedelta  
 from django.utils import timezone  
 from .models import Category
 from django.db.models import Max
 from Auth.models import MarketUser
 from decorators import admin_required
+from pagination import KeysetPagination
 from django.db.models import Q, F, Value
-from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 
 
@@ -27,6 +40,13 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100  # Limit max items per page
 
+
+def listing_paginator(request, ordering=('-upload_date', '-id')):
+    """Keyset pagination when the client opts in with ?pagination=cursor, page numbers otherwise."""
+    if KeysetPagination.requested(request):
+        return KeysetPagination(ordering)
+    return CustomPagination()
+
 @swagger_auto_schema(
     method='post',
     operation_description="Create a new bid product",
@@ -87,9 +107,8 @@ def create_bid_product(request):
         product.bid_end_time = timezone.now() + timedelta(hours=int(data['duration']))
         product.save()
 
-        # Save uploaded photos
-        for photo in photos:
-            ProductPhoto.objects.create(product=product, photo=photo)
+        # Store the uploads as-is; the process_photos worker renders the resized variants
+        save_product_photos(product, photos)
 
         return Response(product_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -169,15 +188,59 @@ def create_simple_product(request):
     if product_serializer.is_valid():
         product = product_serializer.save(seller=seller)
 
-        # Save uploaded photos
-        for photo in photos:
-            ProductPhoto.objects.create(product=product, photo=photo)
+        # Store the uploads as-is; the process_photos worker renders the resized variants
+        save_product_photos(product, photos)
 
         return Response(product_serializer.data, status=status.HTTP_201_CREATED)
 
     return Response(product_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "استيراد عدة منتجات دفعة واحدة من ملف CSV أو NDJSON مع أرشيف zip للصور. "
+        "عمود `photos` يحتوي أسماء الصور داخل الأرشيف (مفصولة بـ | في CSV أو قائمة في NDJSON). "
+        "الصفوف غير الصالحة لا تمنع استيراد باقي الملف وتظهر في تقرير الأخطاء."
+    ),
+    manual_parameters=[
+        openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description="ملف CSV أو NDJSON"),
+        openapi.Parameter('photos', openapi.IN_FORM, type=openapi.TYPE_FILE, required=False, description="أرشيف zip للصور"),
+        openapi.Parameter('format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=list(importer.FORMATS), required=False),
+    ],
+    responses={
+        201: "تم استيراد منتج واحد على الأقل؛ التقرير يحتوي أرقام المنتجات والأخطاء لكل صف",
+        400: "الملف غير صالح أو لم يتم استيراد أي منتج",
+        401: "Unauthorized - User not authenticated",
+        403: "Forbidden - User not verified or banned",
+    }
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def import_products(request):
+    seller = request.user.marketuser
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({"error": "ملف المنتجات مطلوب."}, status=status.HTTP_400_BAD_REQUEST)
+
+    archive = None
+    try:
+        fmt = importer.detect_format(upload.name, request.data.get('format'))
+        if request.FILES.get('photos'):
+            archive = importer.PhotoArchive(request.FILES['photos'])
+        report = importer.import_products(seller, importer.read_rows(upload, fmt), archive)
+    except importer.ImportFileError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    finally:
+        if archive:
+            archive.close()
+
+    return Response(report, status=status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST)
+
+
 
 @swagger_auto_schema(
     method='post',
@@ -231,54 +294,12 @@ def create_simple_product(request):
 @verified_user_required
 @not_banned_user_required
 def place_bid(request, product_id):
-    # Get the product and ensure it’s a bid product
-    product = Product.objects.filter(id=product_id, sale_type='مزاد', is_approved=True).first()
-    if not product:
-        return Response({"error": "المنتج غير متاح للمزايدة."}, status=status.HTTP_404_NOT_FOUND)
-
-    # Prevent the seller from bidding on their own product
-    if product.seller == request.user.marketuser:
-        return Response({"error": "لا يمكنك المزايدة على منتجك الخاص."}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Check if bidding has ended
-    if product.closed or (product.bid_end_time and timezone.now() >= product.bid_end_time):
-        product.closed = True
-        product.save()
-        return Response({"error": "انتهت فترة المزايدة على هذا المنتج."}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Get the bid amount
-    bid_amount = request.data.get("amount")
-    if not bid_amount:
-        return Response({"error": "يجب تحديد قيمة المزايدة."}, status=status.HTTP_400_BAD_REQUEST)
-
-    bid_amount = float(bid_amount)
-
-    # Get the highest accepted bid (or starting price if no bids exist)
-    highest_bid = Bid.objects.filter(product=product, status="accepted").aggregate(Max('amount'))['amount__max'] or product.starting_price
-    if bid_amount <= highest_bid:
-        return Response({"error": f"يجب أن تكون المزايدة أعلى من {highest_bid} {product.currency}."}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Create the new bid with `pending` status (Admin will approve)
-    bid = Bid.objects.create(
-        product=product,
-        buyer=request.user.marketuser,
-        amount=bid_amount,
-        status="pending"  # Pending approval
-    )
-
-    # Notify the user that their bid is under review
-    send_real_time_notification(
-        request.user.marketuser,
-        f"تم تقديم مزايدتك بقيمة {bid_amount} {product.currency} على '{product.title}' وهي قيد المراجعة من قبل الإدارة."
-    )
-
-    # Notify admins for bid approval
-    admin_users = MarketUser.objects.filter(profile__groups__name="Admin")
-    for admin in admin_users:
-        send_real_time_notification(
-            admin,
-            f"تم تقديم مزايدة جديدة بقيمة {bid_amount} {product.currency} على '{product.title}'. يرجى مراجعتها والموافقة عليها."
-        )
+    # Validation, the highest-bid check and the insert happen in one conditional update
+    # on the auction row; notifications go out once the bid is committed
+    try:
+        bid = bidding.place_bid(product_id, request.user.marketuser, request.data.get("amount"))
+    except bidding.BidRejected as rejection:
+        return Response({"error": rejection.message}, status=rejection.status_code)
 
     return Response(
         {
@@ -370,35 +391,25 @@ def end_bid(request, product_id, bid_id):
     # تحديث حالة المنتج ليكون مبيعًا ومغلقًا
     product.sold = True
     product.closed = True
+    product.closed_at = timezone.now()
     product.save()
 
     # رفض جميع المزايدات الأخرى لهذا المنتج
-    Bid.objects.filter(product=product).exclude(id=selected_bid.id).update(status="rejected", winner=False)
-
-    # 🔔 إرسال إشعار للفائز
-    send_real_time_notification(
-        selected_bid.buyer, 
-        f"🎉 تهانينا! لقد فزت بالمزاد على '{product.title}' بمبلغ {selected_bid.amount} {product.currency}."
-    )
-
-    # 🔔 إرسال إشعار للبائع
-    send_real_time_notification(
-        product.seller, 
-        f"✅ لقد قمت ببيع '{product.title}' بنجاح بمبلغ {selected_bid.amount} {product.currency}."
-    )
+    Bid.objects.filter(product=product).exclude(id=selected_bid.id).update(status="rejected", winner=False, updated_at=timezone.now())
+    product.refresh_bid_summary()
+    invalidate_product(product.pk, product.category_id)  # update() skips the cache signals
+    live.publish_closed(product, selected_bid)
 
     # 💬 بدء محادثة بين البائع والفائز
     start_conversation(product.seller, selected_bid.buyer, product)
 
-    # 🔍 العثور على جميع المسؤولين الإداريين
-    admin_users = MarketUser.objects.filter(user__groups__name="Admin")
-
-    # 🔔 إشعار المسؤولين بانتهاء المزاد
-    for admin in admin_users:
-        send_real_time_notification(
-            admin, 
-            f"📢 انتهى المزاد على '{product.title}'. المزايدة الفائزة: {selected_bid.amount} {product.currency}."
-        )
+    # 🔔 إشعار الفائز والبائع وجميع المسؤولين الإداريين دفعة واحدة
+    admin_message = f"📢 انتهى المزاد على '{product.title}'. المزايدة الفائزة: {selected_bid.amount} {product.currency}."
+    send_real_time_notifications([
+        (selected_bid.buyer, f"🎉 تهانينا! لقد فزت بالمزاد على '{product.title}' بمبلغ {selected_bid.amount} {product.currency}."),
+        (product.seller, f"✅ لقد قمت ببيع '{product.title}' بنجاح بمبلغ {selected_bid.amount} {product.currency}."),
+        *((admin, admin_message) for admin in admin_users()),
+    ])
 
     return Response({
         "message": "تم إنهاء المزاد بنجاح.",
@@ -606,7 +617,9 @@ class ProductPagination(PageNumberPagination):
         openapi.Parameter('category', openapi.IN_QUERY, description="Category name to filter products", type=openapi.TYPE_STRING),
         openapi.Parameter('min_price', openapi.IN_QUERY, description="Minimum price to filter products", type=openapi.TYPE_NUMBER),
         openapi.Parameter('max_price', openapi.IN_QUERY, description="Maximum price to filter products", type=openapi.TYPE_NUMBER),
-        openapi.Parameter('title', openapi.IN_QUERY, description="Search for products by title (case-insensitive)", type=openapi.TYPE_STRING),
+        openapi.Parameter('title', openapi.IN_QUERY, description="Full-text search on title and description (Arabic-normalized, ranked)", type=openapi.TYPE_STRING),
+        openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to 'cursor' for keyset pagination (follow the returned 'next' link)", type=openapi.TYPE_STRING),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from a previous 'next' link", type=openapi.TYPE_STRING),
     ],
     responses={
         200: openapi.Response('Paginated list of products', ProductSerializer(many=True)),
@@ -614,11 +627,15 @@ class ProductPagination(PageNumberPagination):
 )
 
 @api_view(['GET'])
+@cached_catalog_response(
+    'list_products',
+    scopes=lambda request: [category_scope(request.query_params['category'])]
+    if request.query_params.get('category') else [ALL_SCOPE],
+)
 def list_products(request):
     """
     استرجاع قائمة المنتجات مع إمكانية التصفية والفرز حسب السعر
     وإضافة قائمة العروض (bids) إذا كان المنتج من نوع bid
-    مع التحقق من انتهاء المزادات وإغلاقها
     """
     sale_type = request.query_params.get('sale_type', None)
     category_id = request.query_params.get('category', None)
@@ -627,77 +644,76 @@ def list_products(request):
     price_order = request.query_params.get('price_order', None)  # 'asc' or 'desc'
     title = request.query_params.get('title', None)
 
+    # Expired auctions are closed by the `close_auctions` worker, so this stays read-only
     products = Product.objects.filter(is_approved=True, sold=False)
 
-    # Close expired bids
-    Product.objects.filter(
-        sale_type="مزاد",
-        closed=False,
-        bid_end_time__lte=now()
-    ).update(closed=True, closed_at=now())
-
     # Apply filters
     if sale_type:
         products = products.filter(sale_type=sale_type)
     if category_id:
         products = products.filter(category_id=category_id)
 
-    # Apply min price filtering (either price or starting_price)
+    # Price range on the stored effective_price (served by the listing indexes)
     if min_price:
-        products = products.filter(
-            Q(price__gte=min_price) | Q(starting_price__gte=min_price)
-        )
-
-    # Apply max price filtering (either price or starting_price)
+        products = products.filter(effective_price__gte=min_price)
     if max_price:
-        products = products.filter(
-            Q(price__lte=max_price) | Q(starting_price__lte=max_price)
-        )
+        products = products.filter(effective_price__lte=max_price)
 
     # Sorting by price (lowest available price)
+    ordering = ('-upload_date', '-id')
     if price_order == "Min":
-        products = products.annotate(
-            effective_price=Coalesce('price', 'starting_price')
-        ).order_by("effective_price")
+        ordering = ('effective_price', 'id')
+        products = products.order_by(*ordering)
     elif price_order == "Max":
-        products = products.annotate(
-            effective_price=Coalesce('price', 'starting_price')
-        ).order_by("-effective_price")
+        ordering = ('-effective_price', '-id')
+        products = products.order_by(*ordering)
 
+    # Full-text search on title and description, best match first unless sorting by price
     if title:
-        products = products.filter(title__icontains=title)
+        products = search_products(products, title, ranked=not price_order)
 
-    # Apply pagination
-    paginator = CustomPagination()
-    paginated_products = paginator.paginate_queryset(products, request)
+    # Apply pagination (?pagination=cursor switches to keyset pages)
+    paginator = listing_paginator(request, ordering)
+    paginated_products = paginator.paginate_queryset(with_listing_relations(products), request)
 
     # Serialize products with seller, category, and bids (if applicable)
-    serialized_products = []
-    for product in paginated_products:
-        serialized_product = ProductSerializer(product).data
-        seller = product.seller
-        category = product.category
-        
-        serialized_product["seller"] = {
-            "id": seller.id,
-            "name": seller.name,
-            "profile_picture": seller.profile_picture.url if seller.profile_picture else None,
-            "phone_number": seller.phone
-        }
-        
-        serialized_product["category"] = {
-            "id": category.pk if category else None,
-            "name": category.name if category else "No Category"
-        }
+    serialized_products = serialize_listing(paginated_products)
 
-        # If the product is a bid, include all bids for it
-        if product.sale_type == "مزاد":
-            bids = Bid.objects.filter(product=product).order_by("-amount")
-            serialized_product["bids"] = BidSerializer(bids, many=True).data
+    return paginator.get_paginated_response(serialized_products)
 
-        serialized_products.append(serialized_product)
 
-    return paginator.get_paginated_response(serialized_products)
+@swagger_auto_schema(
+    method='get',
+    operation_description="Facet counts (category, condition, sale type, price histogram) for the approved catalogue. Accepts the same filters as the product list; each facet ignores its own filter.",
+    manual_parameters=[
+        openapi.Parameter('sale_type', openapi.IN_QUERY, description="Sale type (simple/bid)", type=openapi.TYPE_STRING),
+        openapi.Parameter('category', openapi.IN_QUERY, description="Category id to filter products", type=openapi.TYPE_STRING),
+        openapi.Parameter('min_price', openapi.IN_QUERY, description="Minimum price to filter products", type=openapi.TYPE_NUMBER),
+        openapi.Parameter('max_price', openapi.IN_QUERY, description="Maximum price to filter products", type=openapi.TYPE_NUMBER),
+        openapi.Parameter('title', openapi.IN_QUERY, description="Full-text search on title and description", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response('Facet counts', examples={
+            "application/json": {
+                "total": 42,
+                "category": [{"id": 1, "name": "إلكترونيات", "count": 30}],
+                "condition": [{"value": "جديد", "count": 25}, {"value": "مستعمل", "count": 17}],
+                "sale_type": [{"value": "عادي", "count": 35}, {"value": "مزاد", "count": 7}],
+                "price": [{"min": 0, "max": 50, "count": 12}],
+            }
+        }),
+    }
+)
+@api_view(['GET'])
+@cached_catalog_response(
+    'catalog_facets',
+    scopes=lambda request: [ALL_SCOPE, CATEGORIES_SCOPE],
+)
+def catalog_facets(request):
+    """
+    عدد المنتجات لكل تصنيف وحالة ونوع بيع وشريحة سعر، بنفس فلاتر قائمة المنتجات
+    """
+    return Response(build_catalog_facets(request.query_params), status=status.HTTP_200_OK)
 
 
 
@@ -735,30 +751,30 @@ def admin_list_products(request):
         products = products.filter(is_approved=statuse)
 
     if min_price:
-        products = products.filter(
-            Q(price__gte=min_price) | Q(starting_price__gte=min_price)
-        )
-
+        products = products.filter(effective_price__gte=min_price)
     if max_price:
-        products = products.filter(
-            Q(price__lte=max_price) | Q(starting_price__lte=max_price)
-        )
+        products = products.filter(effective_price__lte=max_price)
 
+    ordering = ('-upload_date', '-id')
     if price_order == "asc":
-        products = products.annotate(
-            effective_price=Coalesce('price', 'starting_price')  
-        ).order_by("effective_price")
+        ordering = ('effective_price', 'id')
+        products = products.order_by(*ordering)
     elif price_order == "desc":
-        products = products.annotate(
-            effective_price=Coalesce('price', 'starting_price')
-        ).order_by("-effective_price")
+        ordering = ('-effective_price', '-id')
+        products = products.order_by(*ordering)
 
+    # Full-text search on title and description, best match first unless sorting by price
     if title:
-        products = products.filter(title__icontains=title)
+        products = search_products(products, title, ranked=not price_order)
+
+    # The full list is returned unless the client opts in to keyset pages
+    paginator = KeysetPagination(ordering) if KeysetPagination.requested(request) else None
+    products = with_listing_relations(products)
+    products = paginator.paginate_queryset(products, request) if paginator else list(products)
 
     serialized_products = []
-    for product in products:
-        serialized_product = ProductSerializer(product).data
+    serialized = ProductSerializer(products, many=True, context={'photo_size': 'thumb'}).data
+    for product, serialized_product in zip(products, serialized):
         seller = product.seller  # Assuming 'seller' is a MarketUser instance
         category = product.category  # Assuming 'category' is a Category instance
         
@@ -775,6 +791,8 @@ def admin_list_products(request):
         
         serialized_products.append(serialized_product)
 
+    if paginator:
+        return paginator.get_paginated_response(serialized_products)
     return Response(serialized_products, status=status.HTTP_200_OK)
 
 
@@ -901,6 +919,7 @@ def accept_related_listings(request, listing_id):
     if listing.product.seller != request.user.marketuser:
         return Response({"error": "You are not authorized to mark this listing as paid."}, status=status.HTTP_403_FORBIDDEN)
     listing.is_payed = True
+    listing.paid_at = timezone.now()
     listing.save()
     message = f"Your payment for '{listing.product.title}' has been confirmed by the seller."
     send_real_time_notification(listing.buyer, message)
@@ -934,6 +953,48 @@ def get_seller_listings(request):
     return Response({"seller_listings": listings_data}, status=status.HTTP_200_OK)
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "إحصاءات البائع لكل فترة مطلوبة: المنتجات المعروضة والمباعة، الإيرادات لكل عملة، المزادات المغلقة "
+        "ومتوسط المزايدات لكل مزاد، والمحادثات التي انتهت ببيع. تُحدَّث الأرقام دوريًا (`updated_until`)."
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'ranges', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+            description=f"فترات مفصولة بفواصل من: {', '.join(rollups.DASHBOARD_RANGES)} (الافتراضي {','.join(rollups.DEFAULT_RANGES)})",
+        ),
+        openapi.Parameter('from', openapi.IN_QUERY, description="بداية فترة مخصصة (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        openapi.Parameter('to', openapi.IN_QUERY, description="نهاية الفترة المخصصة (الافتراضي اليوم)", type=openapi.TYPE_STRING),
+    ],
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def seller_dashboard(request):
+    """Read from the daily SellerDailyStats rollup: one indexed query per range."""
+    names = [name for name in request.query_params.get('ranges', ','.join(rollups.DEFAULT_RANGES)).split(',') if name]
+    unknown = [name for name in names if name not in rollups.DASHBOARD_RANGES]
+    if unknown:
+        return Response({"error": f"فترات غير معروفة: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+    ranges = {name: rollups.named_range(name) for name in names}
+
+    if 'from' in request.query_params or 'to' in request.query_params:
+        try:
+            last_day = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+            first_day = date.fromisoformat(request.query_params['from']) if 'from' in request.query_params else None
+        except ValueError:
+            return Response({"error": "صيغة التاريخ يجب أن تكون YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if first_day and first_day > last_day:
+            return Response({"error": "بداية الفترة بعد نهايتها."}, status=status.HTTP_400_BAD_REQUEST)
+        ranges['custom'] = (first_day, last_day)
+
+    if not ranges:
+        return Response({"error": "لم يتم تحديد أي فترة."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(rollups.seller_dashboard(request.user.marketuser, ranges), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @verified_user_required
@@ -1044,7 +1105,9 @@ def create_category(request):
         ),
     }
 )
+@condition(etag_func=categories_etag, last_modified_func=categories_last_modified)
 @api_view(['GET'])
+@cached_catalog_response('get_all_categories', scopes=lambda request: [CATEGORIES_SCOPE])
 def get_all_categories(request):
     search_query = request.GET.get('search', '')  # Get search query from request parameters
     categories = Category.objects.filter(name__icontains=search_query) if search_query else Category.objects.all()
@@ -1071,15 +1134,7 @@ def user_products_and_bids(request):
     if sale_type:
         user_products = user_products.filter(sale_type=sale_type)
 
-    now = timezone.now()
-    expired_auctions = user_products.filter(
-        sale_type="مزاد", closed=True, is_in_history=False, closed_at__lte=now - timezone.timedelta(days=1)
-    )
-
-    for product in expired_auctions:
-        product.is_in_history = True
-        product.save()
-
+    # Read only: auctions are moved into history by the close_auctions worker (archive_closed_auctions)
     sold_products = user_products.filter(sale_type="عادي", is_approved=True)
     history_products = user_products.filter(sale_type="مزاد", is_in_history=True, is_approved=True)
 
@@ -1108,16 +1163,47 @@ def user_products_and_bids(request):
             },
         })
 
-    # Get user bids
-    user_bids = Bid.objects.filter(buyer=user)
-    bids_serializer = BidSerializer(user_bids, many=True)
+    # First page of the user's bids, at its own fixed size: page_size and cursor here belong
+    # to the products. `bids_next` continues on History/bids/
+    bids_paginator = user_bids_paginator()
+    user_bids = bids_paginator.paginate_first_page(user_bids_queryset(user), request)
 
     return paginator.get_paginated_response({
         'user_products': formatted_products,
-        'bids': bids_serializer.data,
+        'bids': BidSerializer(user_bids, many=True).data,
+        'bids_next': bids_paginator.get_next_link(request.build_absolute_uri(reverse('user_bids_history'))),
     })
 
 
+def user_bids_queryset(user):
+    # Walks bid_buyer_created_idx; the joins feed BidSerializer's buyer/product/seller names
+    return Bid.objects.filter(buyer=user).select_related('buyer', 'product__seller')
+
+
+def user_bids_paginator():
+    paginator = KeysetPagination(ordering=('-created_at', '-id'))
+    paginator.page_size = 20
+    return paginator
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="مزايدات المستخدم الحالي، الأحدث أولاً، بترقيم المؤشر (اتبع رابط `next`).",
+    manual_parameters=[
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="المؤشر من رابط `next` السابق", type=openapi.TYPE_STRING),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="عدد المزايدات في الصفحة (الحد الأقصى 100)", type=openapi.TYPE_INTEGER),
+    ],
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@verified_user_required
+@not_banned_user_required
+def user_bids_history(request):
+    paginator = user_bids_paginator()
+    bids = paginator.paginate_queryset(user_bids_queryset(request.user.marketuser), request)
+    return paginator.get_paginated_response(BidSerializer(bids, many=True).data)
+
+
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])  # Ensure only authenticated users can delete categories
@@ -1158,14 +1244,18 @@ def close_bid(request, product_id):
             highest_bid.save()
 
             # Notify seller & winner
-            send_real_time_notification(product.seller, f"المزاد على {product.title} قد انتهى! الفائز هو {highest_bid.buyer.name}.")
-            send_real_time_notification(highest_bid.buyer, f"لقد فزت بالمزاد على {product.title} بمبلغ {highest_bid.amount} {product.currency}.")
+            send_real_time_notifications([
+                (product.seller, f"المزاد على {product.title} قد انتهى! الفائز هو {highest_bid.buyer.name}."),
+                (highest_bid.buyer, f"لقد فزت بالمزاد على {product.title} بمبلغ {highest_bid.amount} {product.currency}."),
+            ])
 
             # Create a conversation between seller & winner
             start_conversation(product.seller, highest_bid.buyer, product)
         else:
             send_real_time_notification(product.seller, f"المزاد على {product.title} قد انتهى بدون عروض.")
 
+        live.publish_closed(product, highest_bid)
+
         return Response({"success": f"Bid closed for {product.title}."}, status=status.HTTP_200_OK)
 
     except Product.DoesNotExist:
@@ -1175,6 +1265,7 @@ def close_bid(request, product_id):
 
 
 @api_view(['GET'])
+@cached_catalog_response('list_auction_products', scopes=lambda request: [ALL_SCOPE])
 def list_auction_products(request):
     """
     استرجاع قائمة المنتجات من نوع "مزاد" فقط
@@ -1182,74 +1273,133 @@ def list_auction_products(request):
     # Filter only products that are auctions
     products = Product.objects.filter(is_approved=True, sold=False, sale_type="مزاد")
     
-    # Apply pagination
-    paginator = CustomPagination()
-    paginated_products = paginator.paginate_queryset(products, request)
+    # Apply pagination (?pagination=cursor switches to keyset pages)
+    paginator = listing_paginator(request)
+    paginated_products = paginator.paginate_queryset(with_listing_relations(products), request)
     
     # Serialize products with seller, category, and bids
-    serialized_products = []
-    for product in paginated_products:
-        serialized_product = ProductSerializer(product).data
-        seller = product.seller  # Assuming 'seller' is a MarketUser instance
-        category = product.category  # Assuming 'category' is a Category instance
-        
-        serialized_product["seller"] = {
-            "id": seller.id,
-            "name": seller.name,
-            "profile_picture": seller.profile_picture.url if seller.profile_picture else None,
-            "phone_number": seller.phone
-        }
-        
-        # Include category name in the response (handle None case)
-        serialized_product["category"] = {
-            "id": category.pk if category else None,
-            "name": category.name if category else "No Category"
-        }
-        
-        # Include all bids for the auction product
-        bids = Bid.objects.filter(product=product).order_by("-amount")  
-        serialized_product["bids"] = BidSerializer(bids, many=True).data
-        
-        serialized_products.append(serialized_product)
+    serialized_products = serialize_listing(paginated_products)
     
     return paginator.get_paginated_response(serialized_products)
 
 
 
+@condition(etag_func=product_etag, last_modified_func=product_last_modified)
 @api_view(['GET'])
+@cached_catalog_response('get_product', scopes=lambda request, product_id: [product_scope(product_id), CATEGORIES_SCOPE])
 def get_product(request, product_id):
     """
     استرجاع منتج واحد حسب معرفه وإضافة قائمة العروض (bids) إذا كان المنتج من نوع مزاد
     """
-    try:
-        product = Product.objects.get(id=product_id, is_approved=True, sold=False)
-    except Product.DoesNotExist:
+    product = with_listing_relations(Product.objects.filter(id=product_id, is_approved=True, sold=False)).first()
+    if not product:
         return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Serialize product with seller, category, and bids (if applicable)
-    serialized_product = ProductSerializer(product).data
-    seller = product.seller  # Assuming 'seller' is a MarketUser instance
-    category = product.category  # Assuming 'category' is a Category instance
-    
-    serialized_product["seller"] = {
-        "id": seller.id,
-        "name": seller.name,
-        "profile_picture": seller.profile_picture.url if seller.profile_picture else None,
-        "phone_number": seller.phone
-    }
-    
-    # Include category name in the response (handle None case)
-    serialized_product["category"] = {
-        "id": category.pk if category else None,
-        "name": category.name if category else "No Category"
+    # Serialize product with seller, category and, for auctions, the stored bid summary;
+    # the bids themselves are paged by `product_bid_history`
+    serialized_product = serialize_listing([product], photo_size='full')[0]
+
+    return Response(serialized_product)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="منتجات مشابهة لمنتج معين (نفس الفئة، سعر قريب، نفس الموقع، كلمات مشتركة في العنوان)، الأقرب أولاً.",
+    manual_parameters=[
+        openapi.Parameter('limit', openapi.IN_QUERY, description=f"عدد المنتجات (الحد الأقصى {similar.SIMILAR_COUNT})", type=openapi.TYPE_INTEGER),
+    ],
+)
+@api_view(['GET'])
+@cached_catalog_response(
+    'similar_products', scopes=lambda request, product_id: [ALL_SCOPE, SIMILAR_SCOPE, similar_scope(product_id)],
+)
+def similar_products(request, product_id):
+    """Served from the precomputed SimilarProduct lists: one indexed read, no scoring at request time."""
+    if not Product.objects.filter(id=product_id, is_approved=True, sold=False).exists():
+        return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', similar.SIMILAR_COUNT)), 1), similar.SIMILAR_COUNT)
+    except ValueError:
+        return Response({"error": "limit يجب أن يكون عددًا صحيحًا."}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = with_listing_relations(similar.similar_products(product_id, limit))
+    return Response({"product_id": product_id, "results": serialize_listing(products)})
+
+
+class BidHistoryPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Paginated bid history of an approved auction, highest bid first.",
+    manual_parameters=[
+        openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="Bids per page (max 100)", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to 'cursor' for keyset pagination (follow the returned 'next' link)", type=openapi.TYPE_STRING),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from a previous 'next' link", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response('Paginated list of bids', BidSerializer(many=True)),
+        404: "Product not found",
     }
+)
+@api_view(['GET'])
+def product_bid_history(request, product_id):
+    """
+    استرجاع سجل المزايدات لمنتج مزاد معين مقسمًا إلى صفحات (الأعلى أولاً)
+    """
+    if not Product.objects.filter(id=product_id, is_approved=True, sale_type="مزاد").exists():
+        return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # If the product is a bid, include all bids and a separate list of bid amounts
-    if product.sale_type == "مزاد":
-        bids = Bid.objects.filter(product=product).order_by("-amount")
-        serialized_product["bids"] = BidSerializer(bids, many=True).data
+    bids = Bid.objects.filter(product_id=product_id).select_related('buyer', 'product__seller')
 
-        # Extract bid amounts in descending order
-        serialized_product["price"] = [bid.amount for bid in bids]
+    ordering = ('-amount', '-id')
+    paginator = KeysetPagination(ordering) if KeysetPagination.requested(request) else BidHistoryPagination()
+    page = paginator.paginate_queryset(bids.order_by(*ordering), request)
 
-    return Response(serialized_product)
\ No newline at end of file
+    return paginator.get_paginated_response(BidSerializer(page, many=True).data)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "سلسلة أسعار المزاد للرسوم البيانية: لكل فترة زمنية فيها مزايدات مقبولة سعر الافتتاح والأعلى والأدنى "
+        "والإغلاق وعدد المزايدات، من الأقدم إلى الأحدث."
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'resolution', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+            description=f"طول الفترة: {', '.join(price_series.RESOLUTIONS)} أو auto (الافتراضي)",
+        ),
+    ],
+)
+@api_view(['GET'])
+def auction_price_series(request, product_id):
+    product = (
+        Product.objects.filter(id=product_id, is_approved=True, sale_type="مزاد")
+        .only('currency', 'upload_date', 'bid_end_time', 'closed', 'closed_at')
+        .first()
+    )
+    if product is None:
+        return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    resolution = request.query_params.get('resolution') or 'auto'
+    if resolution == 'auto':
+        resolution = price_series.auto_resolution(product)
+    elif resolution not in price_series.RESOLUTIONS:
+        return Response(
+            {"error": f"resolution يجب أن يكون أحد: {', '.join(price_series.RESOLUTIONS)}, auto"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return Response({
+        "product_id": product.pk,
+        "currency": product.currency,
+        "closed": product.closed,
+        "resolution": resolution,
+        "points": price_series.cached_price_series(product, resolution),
+    })
\ No newline at end of file
@@ -6,8 +6,8 @@ from .models import PredefinedMessage, Ticket
 from .serializers import PredefinedMessageSerializer, TicketSerializer
 from rest_framework import  permissions
 from Auth.models import MarketUser
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.db import transaction
+from Product import outbox
 from decorators import admin_required
 # ✅ Admin: Add predefined message
 # ✅ Admin: Add a predefined message (Max 3 messages)
@@ -88,20 +88,20 @@ class TicketCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         print(self.request.user)
         user = MarketUser.objects.get(profile=self.request.user)
-        ticket = serializer.save(user=user)
+        with transaction.atomic():
+            ticket = serializer.save(user=user)
 
-        # Broadcast the new ticket via WebSockets
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "admin_tickets",
-            {
-                "type": "ticket.created",  # Custom WebSocket event
-                "ticket": {
-                    "id": ticket.id,
-                    "subject": ticket.subject,
-                    "status": ticket.status,
-                    "user": ticket.user.profile.username,
-                    "created_at": ticket.created_at.strftime("%Y-%m-%d %H:%M"),
+            # Broadcast the new ticket via WebSockets (queued with it, sent by the outbox dispatcher)
+            outbox.publish(
+                "admin_tickets",
+                {
+                    "type": "ticket.created",  # Custom WebSocket event
+                    "ticket": {
+                        "id": ticket.id,
+                        "subject": ticket.subject,
+                        "status": ticket.status,
+                        "user": ticket.user.profile.username,
+                        "created_at": ticket.created_at.strftime("%Y-%m-%d %H:%M"),
+                    }
                 }
-            }
-        )
\ No newline at end of file
+            )
\ No newline at end of file
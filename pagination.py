@@ -0,0 +1,153 @@
+import base64
+import json
+from operator import attrgetter
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over a composite ordering such as ('-upload_date', '-id').
+
+    Each page is fetched with `WHERE (key) < (last key) ... LIMIT n`, so there is
+    no COUNT(*) and no OFFSET scan however deep the client scrolls. The last
+    ordering field must be unique (normally the primary key) and the ordering
+    fields must not be NULL.
+
+    Clients opt in with `?pagination=cursor` and then follow `next`.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-upload_date', '-id')):
+        self.ordering = tuple(ordering)
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return params.get(cls.mode_query_param) == 'cursor' or cls.cursor_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        # One extra row tells us whether there is a next page
+        results = self._rows(queryset, self.decode_cursor(request), page_size + 1)
+        return self._page(results, page_size)
+
+    def paginate_first_page(self, queryset, request):
+        """
+        The first `page_size` rows, whatever the request's own paging parameters say:
+        for a page embedded in a response that pages something else with them.
+        """
+        self.request = request
+        return self._page(self._rows(queryset, None, self.page_size + 1), self.page_size)
+
+    def _rows(self, queryset, position, limit):
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position))
+            except (DjangoValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return list(queryset[:limit])
+
+    def _page(self, results, page_size):
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.next_position = self._position(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self, url=None):
+        """`url` lets a page embedded in another response point at the endpoint that serves the rest."""
+        if self.next_position is None:
+            return None
+        url = url or self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    # -- cursor helpers -----------------------------------------------------
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _position(self, obj):
+        return [str(getattr(obj, field)) for field, _ in self._fields()]
+
+    def _after(self, position):
+        """Build `(f1, f2, ...) > (v1, v2, ...)` respecting each field's direction."""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self._fields(), position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    Keyset pages over several querysets read as one list, e.g. two notification
+    tables. Each queryset must have every ordering field (annotate the missing
+    ones); a constant annotation such as the source's name breaks ties between
+    rows of different querysets that share the other keys. At most one page is
+    read from each queryset.
+    """
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        results = [row for queryset in querysets for row in self._rows(queryset, position, page_size + 1)]
+        # Stable sorts, least significant field first, give the combined ordering
+        for field, descending in reversed(self._fields()):
+            results.sort(key=attrgetter(field), reverse=descending)
+        return self._page(results[:page_size + 1], page_size)
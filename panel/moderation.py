@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.utils import timezone
+from Product import digests, live
+from Product.cache import invalidate_product
+from Product.models import Bid
+from Product.utils import send_real_time_notifications, start_conversation
+from .signals import send_marketplace_statistics_update
+
+ACCEPT = "accept"
+REJECT = "reject"
+MAX_BULK_DECISIONS = 500
+
+
+def moderate_bids(decisions):
+    """
+    Apply many accept/reject decisions in one transaction.
+
+    `decisions` is a list of (bid_id, action) pairs. Bids are locked and
+    updated with a single `bulk_update`. Each affected auction has its summary
+    recomputed once, and the buy-now rule is applied to it once. Notifications,
+    live deltas and the dashboard refresh are queued in the outbox as one batch.
+    Returns one result dict per decision, in input order.
+    """
+    results = []
+    wanted = {}
+    for bid_id, action in decisions:
+        result = {"bid_id": bid_id, "action": action}
+        if action not in (ACCEPT, REJECT):
+            result["result"] = "invalid_action"
+        elif bid_id in wanted:
+            result["result"] = "duplicate"
+        else:
+            wanted[bid_id] = result
+        results.append(result)
+
+    now = timezone.now()
+    notifications = []
+    coalesced = []  # (user, topic, message, summary) for Product.digests
+
+    with transaction.atomic():
+        bids = Bid.objects.select_for_update().select_related('product__seller', 'buyer').filter(pk__in=list(wanted))
+        bids = {bid.pk: bid for bid in bids}
+
+        changed = []
+        products = {}  # product_id -> (product, bids accepted in this batch)
+        for bid_id, result in wanted.items():
+            bid = bids.get(bid_id)
+            if bid is None:
+                result["result"] = "not_found"
+                continue
+
+            target = "accepted" if result["action"] == ACCEPT else "rejected"
+            if bid.status == target:
+                result["result"] = f"already_{target}"
+                continue
+
+            bid.status = target
+            bid.updated_at = now
+            changed.append(bid)
+            result["result"] = target
+
+            product, accepted = products.setdefault(bid.product_id, (bid.product, []))
+            bid.product = product  # one instance per auction
+            if target == "accepted":
+                accepted.append(bid)
+            else:
+                notifications.append((bid.buyer, f"عذرًا، تم رفض مزايدتك على '{product.title}' بقيمة {bid.amount}."))
+
+        Bid.objects.bulk_update(changed, ['status', 'updated_at'])
+
+        for product, accepted in products.values():
+            product.refresh_bid_summary(publish=False)
+            settled, settled_coalesced, sold_bid = _settle_accepted(product, accepted, now)
+            notifications.extend(settled)
+            coalesced.extend(settled_coalesced)
+            if sold_bid:
+                wanted[sold_bid.pk]["result"] = "sold"
+            invalidate_product(product.pk, product.category_id)  # bulk_update skips the cache signals
+
+        # Queued in the outbox with the decisions: nothing is sent if they roll back
+        send_real_time_notifications(notifications)
+        digests.notify(coalesced)
+        send_marketplace_statistics_update()
+
+    return results
+
+
+def _settle_accepted(product, accepted, now):
+    """
+    Buy-now check, live delta and notifications for one auction; returns
+    (notifications, coalesced notifications, sold bid).
+    """
+    if not accepted:
+        live.publish_price(product)
+        return [], [], None
+
+    notifications, coalesced = [], []
+    top = max(accepted, key=lambda bid: bid.amount)
+    sold = bool(product.buy_now_price) and top.amount >= product.buy_now_price and not product.closed
+    if sold:
+        product.closed = True
+        product.closed_at = now
+        product.bid_end_time = now
+        product.save()
+        start_conversation(product.seller, top.buyer, product)
+        notifications.append((product.seller, f"تم بيع منتجك '{product.title}' بمبلغ {top.amount} {product.currency}."))
+        notifications.append((top.buyer, f"تهانينا! لقد فزت بالمزاد على '{product.title}' بمبلغ {top.amount} {product.currency}."))
+
+    live.publish_bid_accepted(product, top)
+    if sold:
+        live.publish_closed(product, top)
+
+    for bid in accepted:
+        if sold and bid is top:
+            continue
+        coalesced.append(accepted_bid_notification(product, bid))
+        notifications.append((bid.buyer, f"تهانينا! تم قبول مزايدتك على '{product.title}' بقيمة {bid.amount}."))
+    return notifications, coalesced, top if sold else None
+
+
+def accepted_bid_notification(product, bid):
+    """The seller's notice of an accepted bid, summed up with the others of a busy auction (Product/digests.py)."""
+    return (
+        product.seller,
+        f"bids_accepted:{product.pk}",
+        f"تم قبول المزايدة بقيمة {bid.amount} على منتجك: {product.title}.",
+        f"تم قبول {{count}} مزايدات جديدة على منتجك: {product.title}.",
+    )
@@ -1,16 +1,14 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .consumers import MarketplaceStatsConsumer
 from Auth.models import MarketUser
+from Product import outbox
 from Product.models import Product, Bid
+from Product.signals import products_imported
 from django.utils.timezone import now
 
-def send_marketplace_statistics_update():
-    """Fetch latest statistics and send updates to WebSocket clients."""
-    channel_layer = get_channel_layer()
-    stats = {
+def marketplace_statistics():
+    """Latest dashboard statistics for the WebSocket clients."""
+    return {
         "active_users": MarketUser.objects.filter(profile__is_active=True).count(),
         "accepted_bids": Bid.objects.filter(status="accepted").count(),
         "active_products": Product.objects.filter(is_approved=True, sold=False).count(),
@@ -20,10 +18,15 @@ def send_marketplace_statistics_update():
         "users_today": MarketUser.objects.filter(profile__date_joined__date=now().date()).count(),
         "rejected_bids": Bid.objects.filter(status="rejected").count(),
     }
-    
-    async_to_sync(channel_layer.group_send)(
-        "marketplace_stats", {"type": "send_statistics_update", "data": stats}
-    )
+
+
+def send_marketplace_statistics_update():
+    """Queue a statistics update; the dispatcher counts the numbers when it goes out (once per batch)."""
+    outbox.publish("marketplace_stats", {"type": "send_statistics_update"})
+
+
+outbox.register_builder("send_statistics_update", lambda: {"data": marketplace_statistics()})
+
 
 # Connect signals to relevant models
 @receiver(post_save, sender=MarketUser)
@@ -32,6 +35,7 @@ def send_marketplace_statistics_update():
 @receiver(post_delete, sender=MarketUser)
 @receiver(post_delete, sender=Product)
 @receiver(post_delete, sender=Bid)
-def update_statistics(sender, instance, **kwargs):
-    """Trigger a WebSocket update when relevant data changes."""
+@receiver(products_imported)
+def update_statistics(sender, **kwargs):
+    """Queue a WebSocket update with the change that triggered it."""
     send_marketplace_statistics_update()
@@ -1,3 +1,64 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from Auth.models import MarketUser
+from Product.models import Bid, Product
 
-# Create your tests here.
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, CACHES=LOCAL_CACHES)
+class GetBidsTests(TestCase):
+    """Pending bids come first, as a plain list or through ?pagination=cursor pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller, buyer = [
+            MarketUser.objects.create(profile=User.objects.create_user(username=name), name=name)
+            for name in ('seller', 'buyer')
+        ]
+        cls.viewer = seller.profile
+        product = Product.objects.create(seller=seller, title='auction', description='d', sale_type='مزاد')
+        placed = timezone.now() - timedelta(hours=1)
+        Bid.objects.bulk_create([
+            Bid(
+                product=product, buyer=buyer, amount=Decimal(100 + i),
+                status=('pending', 'accepted', 'rejected')[i % 3],
+                created_at=placed + timedelta(minutes=i // 2),  # two bids per minute
+            )
+            for i in range(17)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def expected(self, newest_first=True):
+        bids = sorted(Bid.objects.all(), key=lambda bid: (bid.created_at, bid.id), reverse=newest_first)
+        return [bid.id for bid in bids if bid.status == 'pending'] + [bid.id for bid in bids if bid.status != 'pending']
+
+    def walk(self, params):
+        seen = []
+        response = self.client.get('/panel/Get_bids/', {'pagination': 'cursor', 'page_size': 4, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [bid['id'] for bid in response.json()['results']]
+            if not response.json()['next']:
+                return seen
+            response = self.client.get(response.json()['next'])
+
+    def test_the_plain_list_keeps_pending_bids_first(self):
+        response = self.client.get('/panel/Get_bids/')
+        self.assertEqual([bid['id'] for bid in response.json()], self.expected())
+
+    def test_cursor_pages_keep_the_same_order(self):
+        self.assertEqual(self.walk({}), self.expected())
+        self.assertEqual(self.walk({'date_order': 'asc'}), self.expected(newest_first=False))
+
+    def test_a_status_filter_pages_that_status_only(self):
+        accepted = [bid_id for bid_id in self.expected() if Bid.objects.get(pk=bid_id).status == 'accepted']
+        self.assertEqual(self.walk({'status': 'accepted'}), accepted)
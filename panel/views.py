@@ -11,14 +11,28 @@ from Auth.serializer import UserSerializer
 from decorators import admin_required
 from Product.models import Product
 from rest_framework import status
-from Product.utils import send_real_time_notification,start_conversation
+from Product.utils import send_real_time_notification, send_real_time_notifications, start_conversation
 from Product.serializer import BidSerializer
+from Product import digests, live
 from django.utils import timezone
+from django.db.models import Case, IntegerField, Value, When
+from pagination import KeysetPagination
+from .moderation import accepted_bid_notification, moderate_bids, MAX_BULK_DECISIONS
+from Product.outbox import outbox_stats
 
 class UserNotificationsView(ListAPIView):
     serializer_class = NotificationBidSerializer
     permission_classes = [IsAuthenticated]
 
+    @property
+    def paginator(self):
+        """Keyset pages on ?pagination=cursor, the full list otherwise."""
+        if not hasattr(self, '_paginator'):
+            self._paginator = None
+            if KeysetPagination.requested(self.request):
+                self._paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        return self._paginator
+
     def get_queryset(self):
         return Notificationbid.objects.filter(recipient=self.request.user.marketuser).order_by("-created_at")
 
@@ -36,8 +50,9 @@ def manage_bid(request, bid_id):
     product = bid.product
 
     if action == "accept":
-        bid.status = "accepted"
-        bid.save()
+        # Accept and fold the bid into the product's summary (highest bid, count, listed price)
+        if not product.apply_accepted_bid(bid):
+            return Response({"message": "تم قبول هذه المزايدة مسبقًا"})
 
         # Check if the bid amount meets or exceeds the buy now price
         if product.buy_now_price and bid.amount >= product.buy_now_price:
@@ -45,31 +60,33 @@ def manage_bid(request, bid_id):
             product.closed_at = timezone.now()
             product.bid_end_time = timezone.now()
             product.save()
+            live.publish_closed(product, bid)
 
             # Start a conversation between buyer and seller
             start_conversation(seller, buyer, product)
 
             # Send notifications
-            send_real_time_notification(
-                seller, f"تم بيع منتجك '{product.title}' بمبلغ {bid.amount} {product.currency}."
-            )
-            send_real_time_notification(
-                buyer, f"تهانينا! لقد فزت بالمزاد على '{product.title}' بمبلغ {bid.amount} {product.currency}."
-            )
+            send_real_time_notifications([
+                (seller, f"تم بيع منتجك '{product.title}' بمبلغ {bid.amount} {product.currency}."),
+                (buyer, f"تهانينا! لقد فزت بالمزاد على '{product.title}' بمبلغ {bid.amount} {product.currency}."),
+            ])
 
         else:
             # Send normal acceptance notifications
-            send_real_time_notification(
-                seller, f"تم قبول المزايدة بقيمة {bid.amount} على منتجك: {product.title}."
-            )
-            send_real_time_notification(
-                buyer, f"تهانينا! تم قبول مزايدتك على '{product.title}' بقيمة {bid.amount}."
-            )
+            send_real_time_notifications([
+                (buyer, f"تهانينا! تم قبول مزايدتك على '{product.title}' بقيمة {bid.amount}."),
+            ])
+            digests.notify([accepted_bid_notification(product, bid)])
 
     elif action == "reject":
+        was_standing = bid.status in ("pending", "accepted")
         bid.status = "rejected"
         bid.save()
 
+        # Withdrawing a standing bid can lower the highest bid and the amount to beat
+        if was_standing:
+            product.refresh_bid_summary()
+
         # Send rejection notification
         send_real_time_notification(
             buyer, f"عذرًا، تم رفض مزايدتك على '{product.title}' بقيمة {bid.amount}."
@@ -81,6 +98,34 @@ def manage_bid(request, bid_id):
     return Response({"message": f"تم { 'قبول' if action == 'accept' else 'رفض' } المزايدة بنجاح"})
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@admin_required
+def manage_bids(request):
+    """
+    قبول أو رفض عدة مزايدات دفعة واحدة
+    Body: {"decisions": [{"bid_id": 1, "action": "accept"}, {"bid_id": 2, "action": "reject"}]}
+    """
+    decisions = request.data.get("decisions")
+    if not isinstance(decisions, list) or not decisions:
+        return Response({"error": "يجب إرسال قائمة القرارات (decisions)."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(decisions) > MAX_BULK_DECISIONS:
+        return Response(
+            {"error": f"الحد الأقصى هو {MAX_BULK_DECISIONS} مزايدة في الطلب الواحد."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    parsed = []
+    for decision in decisions:
+        try:
+            parsed.append((int(decision["bid_id"]), decision.get("action")))
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "كل قرار يجب أن يحتوي على bid_id صحيح و action."}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = moderate_bids(parsed)
+    return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 @admin_required
@@ -166,8 +211,8 @@ def get_bids(request):
     status_filter = request.GET.get("status", "").strip().lower()
     date_order = request.GET.get("date_order", "desc").strip().lower()  # Default: newest to oldest
 
-    # Base query
-    bids = Bid.objects.all()
+    # Base query, with everything BidSerializer reads joined in
+    bids = Bid.objects.select_related("buyer", "product__seller")
 
     # Filter by buyer name (case-insensitive search)
     if buyer_name:
@@ -183,16 +228,36 @@ def get_bids(request):
 
     # Sorting by date (default: newest to oldest)
     if date_order == "asc":
-        bids = bids.order_by("created_at")  # Oldest to newest
+        ordering = ("created_at", "id")  # Oldest to newest
     else:
-        bids = bids.order_by("-created_at")  # Newest to oldest (default)
+        ordering = ("-created_at", "-id")  # Newest to oldest (default)
+
+    # Always keep "pending" bids at the top, in SQL; with a status filter the (status, created_at)
+    # index already returns rows in order
+    if status_filter not in ["pending", "accepted", "rejected"]:
+        bids = bids.annotate(
+            pending_last=Case(When(status="pending", then=Value(0)), default=Value(1), output_field=IntegerField())
+        )
+        ordering = ("pending_last",) + ordering
+
+    # Keyset pages on ?pagination=cursor: each request reads one LIMIT-ed slice however large the table grows
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering)
+        page = paginator.paginate_queryset(bids, request)
+        return paginator.get_paginated_response(BidSerializer(page, many=True).data)
+
+    # The plain list existing clients expect, already in order from SQL
+    return Response(BidSerializer(bids.order_by(*ordering), many=True).data, status=status.HTTP_200_OK)
 
-    # Always keep "pending" bids at the top
-    bids = sorted(bids, key=lambda x: x.status != "pending")
 
-    # Serialize and return the response
-    serializer = BidSerializer(bids, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@admin_required
+def outbox_metrics(request):
+    """
+    حالة صندوق الأحداث الصادرة: عدد الأحداث المنتظرة، عمر أقدمها، وتأخير آخر دفعة
+    """
+    return Response(outbox_stats(), status=status.HTTP_200_OK)